@@ -0,0 +1,59 @@
+#!/bin/bash
+# Construye la imagen y deja métricas de tamaño y tiempo de pull.
+#
+#   docker/build.sh                                   # build local + tamaño por capa
+#   IMAGE=usuario/blender-render:v3 PUSH=1 docker/build.sh
+#   PUSH=1 MEASURE_PULL=1 docker/build.sh --build-arg CUDA_ARCHS="sm_86 sm_89"
+#
+# Cada ejecución añade una línea JSON a METRICS_FILE para comparar versiones.
+# El pull se mide borrando la imagen local: en una máquina limpia (como un host
+# de Vast.ai) también se descargaría la base de CUDA, así que es una cota inferior.
+set -e
+set -o pipefail
+
+IMAGE="${IMAGE:-danicol/blender-render:v2}"
+PUSH="${PUSH:-0}"
+MEASURE_PULL="${MEASURE_PULL:-0}"
+METRICS_FILE="${METRICS_FILE:-build_metrics.jsonl}"
+
+cd "$(dirname "$0")/.."
+
+echo "[INFO] Construyendo $IMAGE..."
+start=$SECONDS
+DOCKER_BUILDKIT=1 docker build -t "$IMAGE" "$@" .
+build_seconds=$((SECONDS - start))
+
+size_bytes=$(docker image inspect -f '{{.Size}}' "$IMAGE")
+echo "[INFO] Tamaño sin comprimir: $((size_bytes / 1000000)) MB (build ${build_seconds}s)"
+echo "[INFO] Capas más pesadas:"
+docker history --format '{{.Size}}\t{{.CreatedBy}}' "$IMAGE" | sort -hr | head -8 | cut -c1-120
+
+compressed_bytes=null
+pull_seconds=null
+if [ "$PUSH" = "1" ]; then
+  docker push "$IMAGE"
+  # Lo que descarga un host: suma de las capas comprimidas del manifiesto amd64
+  compressed_bytes=$(docker buildx imagetools inspect --raw "$IMAGE" | python3 -c '
+import json, subprocess, sys
+data = json.load(sys.stdin)
+if "manifests" in data:
+    digest = next(m["digest"] for m in data["manifests"]
+                  if m.get("platform", {}).get("architecture") == "amd64")
+    ref = sys.argv[1].rsplit(":", 1)[0] + "@" + digest
+    data = json.loads(subprocess.check_output(["docker", "buildx", "imagetools", "inspect", "--raw", ref]))
+print(sum(layer["size"] for layer in data["layers"]))
+' "$IMAGE" || echo null)
+  [ "$compressed_bytes" != "null" ] && echo "[INFO] Tamaño comprimido (pull): $((compressed_bytes / 1000000)) MB"
+
+  if [ "$MEASURE_PULL" = "1" ]; then
+    docker image rm "$IMAGE" > /dev/null
+    start=$SECONDS
+    docker pull -q "$IMAGE" > /dev/null
+    pull_seconds=$((SECONDS - start))
+    echo "[INFO] Tiempo de pull: ${pull_seconds}s"
+  fi
+fi
+
+printf '{"time": %s, "image": "%s", "build_seconds": %s, "size_bytes": %s, "compressed_bytes": %s, "pull_seconds": %s}\n' \
+  "$(date +%s)" "$IMAGE" "$build_seconds" "$size_bytes" "$compressed_bytes" "$pull_seconds" >> "$METRICS_FILE"
+echo "[INFO] Métricas añadidas a $METRICS_FILE"
@@ -0,0 +1,47 @@
+#!/bin/bash
+# Recorta una instalación de Blender para render en GPUs NVIDIA (se usa en el Dockerfile).
+#   strip_blender.sh DIR "CUDA_ARCHS" "KEEP_ADDONS" STRIP_LOCALES
+set -e
+
+BLENDER_DIR="$1"
+CUDA_ARCHS="$2"
+KEEP_ADDONS="$3"
+STRIP_LOCALES="${4:-1}"
+
+before=$(du -sm "$BLENDER_DIR" | cut -f1)
+
+# Kernels de otras plataformas: HIP (AMD), oneAPI/SYCL (Intel), Metal no viene en Linux
+find "$BLENDER_DIR" \( -name "kernel_gfx*" -o -name "*hiprt*" -o -name "kernel_*.hip*" \
+  -o -name "libcycles_kernel_oneapi*" -o -name "libsycl*" -o -name "libpi_*" \
+  -o -name "libze_*" \) -print -delete
+
+# Cubins CUDA de arquitecturas no listadas (el PTX compute_* queda para JIT)
+for cubin in $(find "$BLENDER_DIR" -name "kernel_sm_*.cubin*"); do
+  arch=$(basename "$cubin" | sed -E 's/^kernel_(sm_[0-9]+)\..*/\1/')
+  case " $CUDA_ARCHS " in
+    *" $arch "*) ;;
+    *) echo "$cubin"; rm -f "$cubin" ;;
+  esac
+done
+
+# Add-ons incluidos de serie que el render no usa
+for addons in "$BLENDER_DIR"/*/scripts/addons_core; do
+  [ -d "$addons" ] || continue
+  for addon in "$addons"/*; do
+    name=$(basename "$addon")
+    case " $KEEP_ADDONS " in
+      *" $name "*) ;;
+      *) rm -rf "$addon" ;;
+    esac
+  done
+done
+
+# Traducciones, tests de Python y cachés de bytecode
+if [ "$STRIP_LOCALES" = "1" ]; then
+  rm -rf "$BLENDER_DIR"/*/datafiles/locale
+fi
+rm -rf "$BLENDER_DIR"/*/python/lib/python3*/test
+find "$BLENDER_DIR" -name "__pycache__" -type d -prune -exec rm -rf {} +
+
+after=$(du -sm "$BLENDER_DIR" | cut -f1)
+echo "[INFO] Blender recortado: ${before} MB -> ${after} MB"
@@ -1,5 +1,6 @@
 #!/bin/bash
 set -e
+set -o pipefail
 
 echo "[INFO] Generating rclone.conf from RCLONE_CONF_B64..."
 mkdir -p /root/.config/rclone
@@ -11,31 +12,492 @@ SCENE_FILE="${SCENE_FILE:-escena.blend}"                     # .blend file
 OUTPUT_REMOTE="${OUTPUT_REMOTE:-drive:renders/test}"        # folder in Drive for renders
 START_FRAME="${START_FRAME:-1}"                              # start frame
 END_FRAME="${END_FRAME:-250}"                                # end frame
+COORDINATOR_URL="${COORDINATOR_URL:-}"                       # frame coordinator (empty = static range)
+COORDINATOR_JOB="${COORDINATOR_JOB:-default}"                # job name on the coordinator
+FRAME_CHUNK="${FRAME_CHUNK:-5}"                              # frames per claim
+FRAME_LEASE_SECONDS="${FRAME_LEASE_SECONDS:-900}"            # lease before a chunk is reassigned
+TELEMETRY_URL="${TELEMETRY_URL:-$COORDINATOR_URL}"           # progress collector (empty = no telemetry)
+AUTO_DESTROY="${AUTO_DESTROY:-0}"                            # destroy this instance once the upload is verified
+AUTO_DESTROY_GRACE="${AUTO_DESTROY_GRACE:-300}"              # seconds to wait (touch $KEEP_ALIVE_FLAG to cancel)
+VAST_API_URL="${VAST_API_URL:-https://console.vast.ai/api/v0}"
+
+STREAM_UPLOAD="${STREAM_UPLOAD:-1}"                          # upload frames while rendering
+DELETE_AFTER_UPLOAD="${DELETE_AFTER_UPLOAD:-0}"              # remove local frames once uploaded
+SCENE_CACHE="${SCENE_CACHE:-}"                               # content-addressed scene cache on a persistent volume (empty = plain copy)
+RCLONE_PROFILE_SCENE="${RCLONE_PROFILE_SCENE:-small-files}"  # default | small-files | large-files
+RCLONE_PROFILE_OUTPUT="${RCLONE_PROFILE_OUTPUT:-large-files}"
+CYCLES_DEVICE="${CYCLES_DEVICE:-CUDA}"                       # CUDA | OPTIX
+GPU_COUNT="${GPU_COUNT:-}"                                   # empty = detect with nvidia-smi
+GPU_SPLIT="${GPU_SPLIT:-interleave}"                         # interleave | chunk
+PERSISTENT_WORKER="${PERSISTENT_WORKER:-auto}"               # 1 | 0 | auto (on with a coordinator)
+KERNEL_CACHE_DIR="${KERNEL_CACHE_DIR:-/mnt/data/kernel_cache}" # CUDA JIT + OptiX caches (persistent volume if any)
+KERNEL_CACHE_BUNDLE="${KERNEL_CACHE_BUNDLE:-/opt/kernel_cache}" # caches baked into the image (see docker/kernel_cache)
+WARMUP="${WARMUP:-1}"                                        # load/compile kernels while the scene downloads
+OUTPUT_PROFILE="${OUTPUT_PROFILE:-scene}"                    # scene | exr-dwaa | exr-zip | multilayer-zip | png ...
+OUTPUT_PASSES="${OUTPUT_PASSES:-}"                           # passes kept in multilayer EXR (empty = as in the .blend)
+TILE_COUNT="${TILE_COUNT:-1}"                                # >1 = each node renders one region of every frame
+TILE_INDEX="${TILE_INDEX:-0}"                                # this node's region (0 = top)
+TILE_COLS="${TILE_COLS:-1}"                                  # regions per row (1 = horizontal strips)
+TILE_MARGIN="${TILE_MARGIN:-32}"                             # extra pixels rendered around each region (denoiser)
+TILE_MERGE="${TILE_MERGE:-auto}"                             # 1 | 0 | auto (tile 0 merges the full frames)
+TILE_MERGE_TIMEOUT="${TILE_MERGE_TIMEOUT:-43200}"            # seconds tile 0 waits for the other tiles
+TILE_MERGE_INTERVAL="${TILE_MERGE_INTERVAL:-60}"
+PREVIEW="${PREVIEW:-0}"                                      # 1 = this node renders the preview pass first
+PREVIEW_EVERY="${PREVIEW_EVERY:-10}"                         # preview every Nth frame of the range
+PREVIEW_START="${PREVIEW_START:-$START_FRAME}"               # whole job range (this node may only have a part)
+PREVIEW_END="${PREVIEW_END:-$END_FRAME}"
+PREVIEW_GATE="${PREVIEW_GATE:-0}"                            # 1 = wait for go/no-go before the full render
+PREVIEW_GATE_TIMEOUT="${PREVIEW_GATE_TIMEOUT:-3600}"         # no decision by then = no-go
+
+RENDER_TOOLS="${RENDER_TOOLS:-/opt/render}"
+RCLONE_FLAGS="${RCLONE_FLAGS:---drive-team-drive=0ANBdOnuvcZHsUk9PVA}"
+export RCLONE_FLAGS
+export COORDINATOR_URL COORDINATOR_JOB FRAME_CHUNK FRAME_LEASE_SECONDS START_FRAME END_FRAME TELEMETRY_URL
+export OUTPUT_PROFILE OUTPUT_PASSES OUTPUT_EXR_CODEC OUTPUT_COLOR_DEPTH
+export TILE_COUNT TILE_INDEX TILE_COLS TILE_MARGIN
+export PREVIEW_GATE PREVIEW_SAMPLES PREVIEW_SCALE
+
+BASE_OUTPUT_REMOTE="$OUTPUT_REMOTE"
+if [ "$TILE_COUNT" -gt 1 ]; then
+  # Each node uploads its own region; tile 0 merges them into the base folder
+  OUTPUT_REMOTE="$BASE_OUTPUT_REMOTE/tiles/tile_$TILE_INDEX"
+  # One node per region and the whole range each: no chunks to hand out.
+  # The coordinator is still the telemetry collector (TELEMETRY_URL)
+  COORDINATOR_URL=""
+  [ "$TILE_MERGE" = "auto" ] && { [ "$TILE_INDEX" = "0" ] && TILE_MERGE=1 || TILE_MERGE=0; }
+else
+  TILE_MERGE=0
+fi
 
 LOCAL_SCENE_DIR="/mnt/data/scene"
 LOCAL_OUTPUT_DIR="/mnt/data/output"
+MANIFEST="$LOCAL_OUTPUT_DIR/.render_manifest.json"
+RENDER_DONE_FLAG="$LOCAL_OUTPUT_DIR/.render_done"
+REMOTE_LIST="/mnt/data/.remote_frames.txt"
+TELEMETRY_EVENTS="$LOCAL_OUTPUT_DIR/.telemetry_events.jsonl"
+KEEP_ALIVE_FLAG="/mnt/data/.keep_alive"
 
 echo "[INFO] SCENE_REMOTE = $SCENE_REMOTE"
 echo "[INFO] SCENE_FILE   = $SCENE_FILE"
 echo "[INFO] OUTPUT_REMOTE= $OUTPUT_REMOTE"
 echo "[INFO] START_FRAME  = $START_FRAME"
 echo "[INFO] END_FRAME    = $END_FRAME"
+echo "[INFO] COORDINATOR  = ${COORDINATOR_URL:-<static range>}"
+echo "[INFO] RCLONE       = scene:$RCLONE_PROFILE_SCENE output:$RCLONE_PROFILE_OUTPUT"
+echo "[INFO] OUTPUT       = $OUTPUT_PROFILE ${OUTPUT_PASSES:+(passes: $OUTPUT_PASSES)}"
+[ "$TILE_COUNT" -gt 1 ] && echo "[INFO] TILE         = $((TILE_INDEX + 1))/$TILE_COUNT (merge: $TILE_MERGE)"
+
+rclone_profile() {
+  python3 "$RENDER_TOOLS/rclone_tuning.py" flags "$1"
+}
+
+# $(rclone_profile ...) inside a command line does not trip set -e: check the names now
+for PROFILE in "$RCLONE_PROFILE_SCENE" "$RCLONE_PROFILE_OUTPUT"; do
+  rclone_profile "$PROFILE" >/dev/null || exit 1
+done
+
+# Bytes under a local folder (du) or a remote path (rclone size)
+dest_bytes() {
+  if [[ "$1" == /* ]]; then
+    du -sb "$1" 2>/dev/null | cut -f1
+  else
+    rclone size --json "$1" $RCLONE_FLAGS 2>/dev/null \
+      | python3 -c 'import json, sys; print(json.load(sys.stdin)["bytes"])' 2>/dev/null
+  fi
+}
+
+# Plain rclone copy with the profile flags; logs MB/s for the run
+timed_copy() {
+  local STAGE=$1 PROFILE=$2 SRC=$3 DST=$4
+  shift 4
+  local T0=$SECONDS BEFORE AFTER
+  BEFORE=$(dest_bytes "$DST" || echo 0)
+  rclone copy "$SRC" "$DST" -P $RCLONE_FLAGS $(rclone_profile "$PROFILE") "$@"
+  AFTER=$(dest_bytes "$DST" || echo 0)
+  python3 "$RENDER_TOOLS/rclone_tuning.py" record --stage "$STAGE" --profile "$PROFILE" \
+    --bytes $(( ${AFTER:-0} - ${BEFORE:-0} )) --seconds $(( SECONDS - T0 ))
+}
+
+# One Blender process per GPU, each pinned with CUDA_VISIBLE_DEVICES
+if [ -z "$GPU_COUNT" ]; then
+  GPU_COUNT=$(nvidia-smi -L 2>/dev/null | grep -c "^GPU" || true)
+fi
+[ "${GPU_COUNT:-0}" -ge 1 ] 2>/dev/null || GPU_COUNT=1
+echo "[INFO] GPUs detected: $GPU_COUNT (split: $GPU_SPLIT, device: $CYCLES_DEVICE)"
+
+# Kernel caches: driver JIT (CUDA) and OptiX pipelines survive across renders
+mkdir -p "$KERNEL_CACHE_DIR/cuda" "$KERNEL_CACHE_DIR/optix" /root/.cache/NVIDIA
+export CUDA_CACHE_PATH="$KERNEL_CACHE_DIR/cuda"
+export CUDA_CACHE_MAXSIZE=4294967296
+ln -sfn "$KERNEL_CACHE_DIR/optix" /root/.cache/NVIDIA/OptixCache
+python3 "$RENDER_TOOLS/kernel_cache.py" install --bundle "$KERNEL_CACHE_BUNDLE" --cache-dir "$KERNEL_CACHE_DIR" || true
+if [ -f /opt/blender/kernel_manifest.json ]; then
+  python3 "$RENDER_TOOLS/kernel_cache.py" check-gpu --manifest /opt/blender/kernel_manifest.json || true
+fi
+
+# Warm-up render per GPU, overlapped with the scene download
+WARMUP_PIDS=()
+if [ "$WARMUP" = "1" ]; then
+  for (( GPU = 0; GPU < GPU_COUNT; GPU++ )); do
+    # Blender itself in the background (not a pipeline) so wait gets its exit status
+    CUDA_VISIBLE_DEVICES="$GPU" /usr/local/bin/blender -b --factory-startup --python-exit-code 1 \
+      --python "$RENDER_TOOLS/warmup.py" -- --device "$CYCLES_DEVICE" > "/tmp/warmup_$GPU.log" 2>&1 &
+    WARMUP_PIDS+=($!)
+  done
+fi
 
 echo "[INFO] Downloading scene from Drive..."
 mkdir -p "$LOCAL_SCENE_DIR"
-rclone copy "$SCENE_REMOTE" "$LOCAL_SCENE_DIR" -P --drive-team-drive=0ANBdOnuvcZHsUk9PVA
+if [ -n "$SCENE_CACHE" ] && RCLONE_PROFILE="$RCLONE_PROFILE_SCENE" python3 "$RENDER_TOOLS/scene_cache.py" fetch \
+    --remote "$SCENE_REMOTE" --dest "$LOCAL_SCENE_DIR" --cache "$SCENE_CACHE"; then
+  echo "[INFO] Scene restored through cache $SCENE_CACHE"
+else
+  # No cache configured, or the backend could not be listed with hashes
+  timed_copy scene "$RCLONE_PROFILE_SCENE" "$SCENE_REMOTE" "$LOCAL_SCENE_DIR"
+fi
 
 echo "[INFO] Contents in $LOCAL_SCENE_DIR:"
 ls -la "$LOCAL_SCENE_DIR"
 
+if [ "${#WARMUP_PIDS[@]}" -gt 0 ]; then
+  echo "[INFO] Waiting for kernel warm-up..."
+  for GPU in "${!WARMUP_PIDS[@]}"; do
+    RC=0
+    wait "${WARMUP_PIDS[$GPU]}" || RC=$?
+    grep "WARMUP\|Error" "/tmp/warmup_$GPU.log" | sed "s/^/[GPU$GPU] /" || true
+    [ "$RC" -eq 0 ] || echo "[WARN] Warm-up failed on GPU $GPU (exit code $RC); kernels will load on the first frame"
+  done
+fi
+
+coordinator() {
+  python3 "$RENDER_TOOLS/frame_coordinator.py" "$@"
+}
+
+# Preview pass: low samples + denoiser on every PREVIEW_EVERY-th frame, small JPEGs
+if [ "$PREVIEW" = "1" ]; then
+  PREVIEW_DIR=/mnt/data/preview
+  PREVIEW_REMOTE="$BASE_OUTPUT_REMOTE/preview"
+  echo "[INFO] Rendering preview pass (every $PREVIEW_EVERY frames)..."
+  mkdir -p "$PREVIEW_DIR"
+  if CUDA_VISIBLE_DEVICES=0 /usr/local/bin/blender -b "$LOCAL_SCENE_DIR/$SCENE_FILE" \
+      --python-exit-code 1 --python "$RENDER_TOOLS/preview.py" -o "$PREVIEW_DIR/frame_####" \
+      -s "$PREVIEW_START" -e "$PREVIEW_END" -j "$PREVIEW_EVERY" -a -- --cycles-device "$CYCLES_DEVICE"; then
+    rclone copy "$PREVIEW_DIR" "$PREVIEW_REMOTE" $RCLONE_FLAGS $(rclone_profile "$RCLONE_PROFILE_OUTPUT")
+    echo "[INFO] Preview uploaded to $PREVIEW_REMOTE"
+    if [ -n "$TELEMETRY_URL" ]; then
+      coordinator preview --url "$TELEMETRY_URL" --remote "$PREVIEW_REMOTE" \
+        --frames "$(seq "$PREVIEW_START" "$PREVIEW_EVERY" "$PREVIEW_END" | tr '\n' ' ')" \
+        || echo "[WARN] Could not post the preview checkpoint"
+    fi
+  else
+    echo "[WARN] Preview render failed; check the scene before approving the job"
+    # The GUI still needs a checkpoint to offer the go/no-go decision
+    if [ -n "$TELEMETRY_URL" ]; then
+      coordinator preview --url "$TELEMETRY_URL" --failed 1 \
+        || echo "[WARN] Could not post the preview checkpoint"
+    fi
+  fi
+fi
+
+# Go/no-go: every node waits here until the preview is approved from the GUI
+wait_for_gate() {
+  local DEADLINE=$(( SECONDS + PREVIEW_GATE_TIMEOUT )) RC
+  echo "[INFO] Waiting for go/no-go on the preview..."
+  while true; do
+    set +e
+    coordinator gate --url "$TELEMETRY_URL"
+    RC=$?
+    set -e
+    case "$RC" in
+      0) echo "[INFO] Preview approved, starting the full render"; return 0 ;;
+      3) echo "[WARN] Preview rejected: skipping the render"; return 1 ;;
+      5) ;;
+      *) echo "[WARN] Gate unreachable, retrying..." ;;
+    esac
+    if [ "$SECONDS" -ge "$DEADLINE" ]; then
+      echo "[WARN] No decision after ${PREVIEW_GATE_TIMEOUT}s: treating it as no-go"
+      return 1
+    fi
+    sleep 30
+  done
+}
+
+NO_GO=0
+if [ "$PREVIEW_GATE" = "1" ]; then
+  if [ -n "$TELEMETRY_URL" ]; then
+    wait_for_gate || NO_GO=1
+  else
+    echo "[WARN] PREVIEW_GATE needs a coordinator or TELEMETRY_URL; rendering without waiting"
+  fi
+fi
+[ "$NO_GO" = "1" ] && TILE_MERGE=0
+
 echo "[INFO] Starting render with Blender..."
 mkdir -p "$LOCAL_OUTPUT_DIR"
 
-/usr/local/bin/blender -b "$LOCAL_SCENE_DIR/$SCENE_FILE" \
-  -o "$LOCAL_OUTPUT_DIR/frame_####" \
-  -s "$START_FRAME" -e "$END_FRAME" -a
+# Frames already uploaded by a previous run (or another node) are not rendered again
+echo "[INFO] Checking frames already in $OUTPUT_REMOTE..."
+rclone lsf "$OUTPUT_REMOTE" --files-only $RCLONE_FLAGS > "$REMOTE_LIST" 2>/dev/null || : > "$REMOTE_LIST"
+
+# Background uploader: pushes each frame as soon as it is in the manifest
+rm -f "$RENDER_DONE_FLAG"
+UPLOADER_PID=""
+if [ "$STREAM_UPLOAD" = "1" ]; then
+  UPLOAD_ARGS=()
+  [ "$DELETE_AFTER_UPLOAD" = "1" ] && UPLOAD_ARGS+=(--delete)
+  RCLONE_PROFILE="$RCLONE_PROFILE_OUTPUT" python3 "$RENDER_TOOLS/stream_uploader.py" --dir "$LOCAL_OUTPUT_DIR" --remote "$OUTPUT_REMOTE" \
+    --manifest "$MANIFEST" --stop-file "$RENDER_DONE_FLAG" "${UPLOAD_ARGS[@]}" &
+  UPLOADER_PID=$!
+fi
+# If the render aborts, still let the uploader drain what is finished, and
+# stop renewing the claimed chunk so the coordinator can hand it to another node
+RENEW_PID=""
+trap 'touch "$RENDER_DONE_FLAG"; [ -n "$RENEW_PID" ] && kill "$RENEW_PID" 2>/dev/null' EXIT
+
+# Progress snapshots (frames, s/frame, samples/s, VRAM, upload backlog) for the GUI
+TELEMETRY_PID=""
+if [ -n "$TELEMETRY_URL" ]; then
+  TELEMETRY_ARGS=()
+  # With a coordinator the node has no fixed range; the collector computes the ETA
+  [ -z "$COORDINATOR_URL" ] && TELEMETRY_ARGS+=(--start "$START_FRAME" --end "$END_FRAME")
+  mkdir -p "$LOCAL_OUTPUT_DIR"
+  python3 "$RENDER_TOOLS/telemetry.py" agent --dir "$LOCAL_OUTPUT_DIR" --manifest "$MANIFEST" \
+    --stop-file "$RENDER_DONE_FLAG" "${TELEMETRY_ARGS[@]}" &
+  TELEMETRY_PID=$!
+fi
+
+render_range() {
+  # Only the sub-ranges missing from the local manifest and the remote listing
+  mapfile -t RANGES < <(python3 "$RENDER_TOOLS/frame_manifest.py" missing \
+    --manifest "$MANIFEST" --remote-list "$REMOTE_LIST" --start "$1" --end "$2")
+
+  if [ "${#RANGES[@]}" -eq 0 ]; then
+    echo "[INFO] Frames $1-$2 already rendered, skipping."
+    return 0
+  fi
+
+  for RANGE in "${RANGES[@]}"; do
+    read -r FROM TO <<< "$RANGE"
+    echo "[INFO] Rendering frames $FROM-$TO"
+    # Explicit: render_range runs inside "if !", where set -e does not apply
+    render_on_gpus "$FROM" "$TO" || return 1
+  done
+}
+
+# Persistent worker per GPU: the scene is loaded once and kept in memory
+# between chunks instead of relaunching Blender for every claim
+declare -A WORKER_PIDS
+worker_socket() {
+  echo "/tmp/blender_worker_$1.sock"
+}
+
+start_worker() {
+  [ -n "${WORKER_PIDS[$1]:-}" ] && return 0
+  echo "[INFO] Starting persistent Blender worker on GPU $1"
+  CUDA_VISIBLE_DEVICES="$1" /usr/local/bin/blender -b "$LOCAL_SCENE_DIR/$SCENE_FILE" \
+    --python-exit-code 1 --python "$RENDER_TOOLS/blender_worker.py" -- serve \
+    --socket "$(worker_socket "$1")" --output "$LOCAL_OUTPUT_DIR/frame_####" \
+    --device "$CYCLES_DEVICE" > "/tmp/blender_worker_$1.log" 2>&1 &
+  WORKER_PIDS[$1]=$!
+}
+
+stop_workers() {
+  local GPU
+  for GPU in "${!WORKER_PIDS[@]}"; do
+    python3 "$RENDER_TOOLS/blender_worker.py" stop --socket "$(worker_socket "$GPU")" > /dev/null \
+      || kill "${WORKER_PIDS[$GPU]}" 2>/dev/null || true
+  done
+}
+
+# Blender on one GPU: render_on_gpu GPU START END STEP
+render_on_gpu() {
+  # Each frame Blender reports as saved is checkpointed in the manifest
+  if [ "$PERSISTENT_WORKER" = "1" ]; then
+    python3 "$RENDER_TOOLS/blender_worker.py" render --socket "$(worker_socket "$1")" \
+      --pid "${WORKER_PIDS[$1]}" --start "$2" --end "$3" --step "$4"
+  else
+    # The output profile is applied before -o/-a; a bad profile aborts Blender
+    CUDA_VISIBLE_DEVICES="$1" /usr/local/bin/blender -b "$LOCAL_SCENE_DIR/$SCENE_FILE" \
+      --python-exit-code 1 --python "$RENDER_TOOLS/output_profile.py" --python "$RENDER_TOOLS/tiles.py" \
+      -o "$LOCAL_OUTPUT_DIR/frame_####" \
+      -s "$2" -e "$3" -j "$4" -a -- --cycles-device "$CYCLES_DEVICE"
+  fi | sed -u "s/^/[GPU$1] /" \
+    | python3 "$RENDER_TOOLS/frame_manifest.py" record --manifest "$MANIFEST" --events "$TELEMETRY_EVENTS"
+}
+
+render_on_gpus() {
+  local FROM=$1 TO=$2 COUNT=$(( $2 - $1 + 1 ))
+  local GPUS=$(( GPU_COUNT < COUNT ? GPU_COUNT : COUNT ))
+  if [ "$GPUS" -le 1 ]; then
+    [ "$PERSISTENT_WORKER" = "1" ] && start_worker 0
+    render_on_gpu 0 "$FROM" "$TO" 1
+    return
+  fi
+
+  local PIDS=() GPU FAILED=0
+  if [ "$PERSISTENT_WORKER" = "1" ]; then
+    # Started here, in the main shell, so they outlive this chunk
+    for (( GPU = 0; GPU < GPUS; GPU++ )); do start_worker "$GPU"; done
+  fi
+  for (( GPU = 0; GPU < GPUS; GPU++ )); do
+    if [ "$GPU_SPLIT" = "chunk" ]; then
+      # Contiguous blocks; the first ones take the remainder
+      local SIZE=$(( COUNT / GPUS )) EXTRA=$(( COUNT % GPUS ))
+      local S=$(( FROM + GPU * SIZE + (GPU < EXTRA ? GPU : EXTRA) ))
+      local E=$(( S + SIZE - 1 + (GPU < EXTRA ? 1 : 0) ))
+      render_on_gpu "$GPU" "$S" "$E" 1 &
+    else
+      # Interleaved: GPU i renders FROM+i, FROM+i+N, ... so all finish together
+      render_on_gpu "$GPU" $(( FROM + GPU )) "$TO" "$GPUS" &
+    fi
+    PIDS+=($!)
+  done
+  for PID in "${PIDS[@]}"; do
+    wait "$PID" || FAILED=1
+  done
+  return $FAILED
+}
+
+if [ "$PERSISTENT_WORKER" = "auto" ]; then
+  # A single "-a" over a static range already loads the scene once
+  [ -n "$COORDINATOR_URL" ] && PERSISTENT_WORKER=1 || PERSISTENT_WORKER=0
+fi
+
+if [ "$NO_GO" = "1" ]; then
+  echo "[INFO] Job rejected at the preview gate; nothing to render."
+elif [ -z "$COORDINATOR_URL" ]; then
+  render_range "$START_FRAME" "$END_FRAME"
+else
+  # Pull chunks until the coordinator says the job is finished. The preview
+  # gate, if any, was already passed above
+  while true; do
+    set +e
+    CLAIM=$(coordinator claim)
+    RC=$?
+    set -e
+    if [ "$RC" -eq 3 ]; then
+      echo "[INFO] Coordinator: no frames left."
+      break
+    elif [ "$RC" -eq 4 ]; then
+      # Everything left is leased to other nodes; one may still be abandoned
+      sleep 30
+      continue
+    elif [ "$RC" -ne 0 ]; then
+      echo "[WARN] Coordinator unreachable, retrying..."
+      sleep 15
+      continue
+    fi
+
+    read -r CHUNK_START CHUNK_END LEASE <<< "$CLAIM"
+    echo "[INFO] Claimed frames $CHUNK_START-$CHUNK_END (lease $LEASE)"
+
+    # Keep the lease alive while Blender works on the chunk
+    RENEW_EVERY=$(( FRAME_LEASE_SECONDS / 3 > 1 ? FRAME_LEASE_SECONDS / 3 : 1 ))
+    ( while sleep "$RENEW_EVERY"; do coordinator renew --lease "$LEASE" || true; done ) &
+    RENEW_PID=$!
+
+    if ! render_range "$CHUNK_START" "$CHUNK_END"; then
+      # The lease then expires and the chunk goes back to the queue
+      echo "[ERROR] Render of frames $CHUNK_START-$CHUNK_END failed; releasing the lease"
+      kill "$RENEW_PID" 2>/dev/null || true
+      exit 1
+    fi
+
+    kill "$RENEW_PID" 2>/dev/null || true
+    RENEW_PID=""
+    coordinator complete --lease "$LEASE" || echo "[WARN] Could not report lease $LEASE"
+  done
+fi
+
+stop_workers
+touch "$RENDER_DONE_FLAG"
+if [ -n "$UPLOADER_PID" ]; then
+  echo "[INFO] Render finished. Waiting for the stream uploader to drain..."
+  wait "$UPLOADER_PID" || echo "[WARN] Stream uploader exited with an error"
+fi
+[ -n "$TELEMETRY_PID" ] && { wait "$TELEMETRY_PID" || true; }
+
+# Safety net: anything the stream uploader missed (or everything if it is disabled)
+echo "[INFO] Uploading remaining files to Drive..."
+timed_copy output "$RCLONE_PROFILE_OUTPUT" "$LOCAL_OUTPUT_DIR" "$OUTPUT_REMOTE" --exclude ".*"
+
+# Completion handshake: every local frame must be on the remote (size/hash) before
+# anyone is allowed to destroy this machine
+VERIFIED=0
+if rclone check "$LOCAL_OUTPUT_DIR" "$OUTPUT_REMOTE" --one-way --exclude ".*" $RCLONE_FLAGS; then
+  VERIFIED=1
+  echo "[INFO] Upload verified against $OUTPUT_REMOTE"
+else
+  echo "[WARN] rclone check found differences; the instance will not be destroyed"
+fi
+
+# Region split: tile 0 keeps pulling the other tiles and uploads full frames
+merge_tiles() {
+  local TILES_DIR=/mnt/data/tiles MERGED_DIR=/mnt/data/merged
+  local DEADLINE=$(( SECONDS + TILE_MERGE_TIMEOUT )) T RC
+  while true; do
+    for (( T = 0; T < TILE_COUNT; T++ )); do
+      rclone copy "$BASE_OUTPUT_REMOTE/tiles/tile_$T" "$TILES_DIR/tile_$T" --exclude ".*" \
+        $RCLONE_FLAGS $(rclone_profile "$RCLONE_PROFILE_OUTPUT") || true
+    done
+    # Without --python-exit-code a traceback in tiles.py still exits with 0
+    set +e
+    /usr/local/bin/blender -b --factory-startup --python-exit-code 1 --python "$RENDER_TOOLS/tiles.py" -- merge \
+      --tiles "$TILES_DIR" --count "$TILE_COUNT" --cols "$TILE_COLS" --out "$MERGED_DIR" --start "$START_FRAME" --end "$END_FRAME"
+    RC=$?
+    set -e
+    rclone copy "$MERGED_DIR" "$BASE_OUTPUT_REMOTE" --exclude ".*" --exclude "*.part" \
+      $RCLONE_FLAGS $(rclone_profile "$RCLONE_PROFILE_OUTPUT")
+    if [ "$RC" -eq 0 ]; then
+      echo "[INFO] All tiles merged into $BASE_OUTPUT_REMOTE"
+      return 0
+    elif [ "$RC" -ne 2 ]; then
+      # 2 means tiles still missing; anything else is a crash of the merge itself
+      echo "[ERROR] Tile merge failed (exit code $RC)"
+      return 1
+    elif [ "$SECONDS" -ge "$DEADLINE" ]; then
+      echo "[WARN] Tile merge incomplete after ${TILE_MERGE_TIMEOUT}s; merge the rest with tiles.py merge"
+      return 1
+    fi
+    echo "[INFO] Waiting for the other tiles..."
+    sleep "$TILE_MERGE_INTERVAL"
+  done
+}
+
+if [ "$TILE_MERGE" = "1" ]; then
+  # The instance must outlive the merge, so an unfinished merge counts as not verified
+  merge_tiles || VERIFIED=0
+fi
+
+# Completion handshake for the GUI; keep_alive stops its auto-destroy watcher too
+report_complete() {
+  [ -n "$TELEMETRY_URL" ] || return 0
+  local COMPLETE_ARGS=() KEEP=0
+  [ -z "$COORDINATOR_URL" ] && COMPLETE_ARGS+=(--start "$START_FRAME" --end "$END_FRAME")
+  [ -e "$KEEP_ALIVE_FLAG" ] && KEEP=1
+  python3 "$RENDER_TOOLS/telemetry.py" complete --dir "$LOCAL_OUTPUT_DIR" --manifest "$MANIFEST" \
+    --verified "$VERIFIED" --keep-alive "$KEEP" "${COMPLETE_ARGS[@]}" || true
+}
+report_complete
 
-echo "[INFO] Render finished. Uploading to Drive..."
-rclone copy "$LOCAL_OUTPUT_DIR" "$OUTPUT_REMOTE" -P --drive-team-drive=0ANBdOnuvcZHsUk9PVA
+echo "[INFO] Done. Files in $OUTPUT_REMOTE"
 
-echo "[INFO] Done. Files in $OUTPUT_REMOTE"
\ No newline at end of file
+if [ "$AUTO_DESTROY" = "1" ]; then
+  if [ "$VERIFIED" != "1" ]; then
+    echo "[WARN] AUTO_DESTROY skipped: upload not verified"
+  elif [ -z "$CONTAINER_ID" ] || [ -z "$CONTAINER_API_KEY" ]; then
+    echo "[WARN] AUTO_DESTROY skipped: CONTAINER_ID/CONTAINER_API_KEY not available"
+  else
+    echo "[INFO] Destroying instance $CONTAINER_ID in ${AUTO_DESTROY_GRACE}s (touch $KEEP_ALIVE_FLAG to cancel)"
+    sleep "$AUTO_DESTROY_GRACE"
+    if [ -e "$KEEP_ALIVE_FLAG" ]; then
+      echo "[INFO] $KEEP_ALIVE_FLAG found, keeping the instance"
+      # Touched during the grace period: the GUI only saw the first report
+      report_complete
+    else
+      curl -fsS -X DELETE -H "Authorization: Bearer $CONTAINER_API_KEY" \
+        "$VAST_API_URL/instances/$CONTAINER_ID/" \
+        || echo "[WARN] Self-destroy request failed; destroy it from the GUI"
+    fi
+  fi
+fi
\ No newline at end of file
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Long-lived Blender process that renders frames on request.
+
+A fresh `blender -b` per chunk pays start-up, .blend load and BVH/kernel
+setup every time. The worker loads the scene once, enables persistent data and
+then renders whatever frames it is sent over a local Unix socket, so only the
+first request pays that cost.
+
+Worker (inside Blender, one per GPU):
+
+    CUDA_VISIBLE_DEVICES=0 blender -b scene.blend --python blender_worker.py -- \\
+        serve --socket /tmp/blender_worker_0.sock --output /out/frame_#### --device CUDA
+
+Client (plain python3; prints Blender-style "Saved: '...'" lines so the output
+can be piped into frame_manifest.py record):
+
+    python3 blender_worker.py render --socket /tmp/blender_worker_0.sock \\
+        --start 1 --end 20 [--step 2] [--pid WORKER_PID]
+    python3 blender_worker.py stop --socket /tmp/blender_worker_0.sock
+
+The output format follows OUTPUT_PROFILE / OUTPUT_PASSES (output_profile.py)
+and, with TILE_COUNT > 1, only this node's region is rendered (tiles.py).
+
+Protocol: one JSON request per line ({"start", "end", "step"} or {"stop"}),
+answered by one JSON line per frame and a final {"done": true} or {"error"}.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+
+# Time a client waits for the worker to finish loading the scene
+DEFAULT_START_TIMEOUT = 900
+
+
+# --- Worker side (runs inside Blender) ------------------------------------
+
+def setup_scene(output, device):
+    import bpy
+
+    scene = bpy.context.scene
+    scene.render.filepath = output
+    # Keep BVH, textures and compiled kernels alive between frames
+    scene.render.use_persistent_data = True
+
+    if device and device != "CPU":
+        prefs = bpy.context.preferences.addons["cycles"].preferences
+        prefs.compute_device_type = device
+        prefs.get_devices()
+        for dev in prefs.devices:
+            dev.use = dev.type == device
+        scene.cycles.device = "GPU"
+    return scene
+
+
+def render_frame(scene, frame):
+    import bpy
+
+    scene.frame_set(frame)
+    path = scene.render.frame_path(frame=frame)
+    # render.render writes to scene.render.filepath; point it at this frame's file
+    pattern = scene.render.filepath
+    scene.render.filepath = path
+    try:
+        bpy.ops.render.render(write_still=True)
+    finally:
+        scene.render.filepath = pattern
+    return path
+
+
+def handle(conn, scene):
+    """Serve one client connection. Returns False when asked to stop."""
+    reader = conn.makefile("r")
+    writer = conn.makefile("w")
+
+    def reply(payload):
+        writer.write(json.dumps(payload) + "\n")
+        writer.flush()
+
+    for line in reader:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            reply({"error": "invalid request"})
+            continue
+        if request.get("stop"):
+            reply({"done": True})
+            return False
+        try:
+            step = max(1, int(request.get("step", 1)))
+            for frame in range(int(request["start"]), int(request["end"]) + 1, step):
+                started = time.monotonic()
+                path = render_frame(scene, frame)
+                reply({"frame": frame, "path": path, "seconds": round(time.monotonic() - started, 3)})
+            reply({"done": True})
+        except Exception as e:
+            reply({"error": str(e)})
+    return True
+
+
+def serve(socket_path, output, device):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from output_profile import apply_from_env
+    from tiles import apply_region_from_env
+
+    scene = apply_region_from_env(apply_from_env(setup_scene(output, device)))
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    print(f"[WORKER] Scene loaded, listening on {socket_path}", flush=True)
+    try:
+        running = True
+        while running:
+            conn, _ = server.accept()
+            with conn:
+                running = handle(conn, scene)
+    finally:
+        server.close()
+        os.remove(socket_path)
+    return 0
+
+
+# --- Client side (plain python3) ------------------------------------------
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def connect(socket_path, timeout=DEFAULT_START_TIMEOUT, pid=None):
+    """Connect to the worker, waiting while it is still loading the scene."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.connect(socket_path)
+            return conn
+        except OSError:
+            conn.close()
+            if pid and not process_alive(pid):
+                raise RuntimeError("worker exited before accepting requests")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"worker not ready after {timeout}s")
+            time.sleep(1)
+
+
+def request(socket_path, payload, timeout=DEFAULT_START_TIMEOUT, pid=None, out=sys.stdout):
+    with connect(socket_path, timeout, pid) as conn:
+        conn.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        for line in conn.makefile("r"):
+            message = json.loads(line)
+            if "frame" in message:
+                # Same line Blender prints for -a, so frame_manifest.py can record it
+                out.write(f"Saved: '{message['path']}'\n")
+                out.write(f"[WORKER] Frame {message['frame']}: {message['seconds']:.2f}s\n")
+                out.flush()
+            elif "error" in message:
+                print(f"[ERROR] Worker: {message['error']}", file=sys.stderr)
+                return 1
+            elif message.get("done"):
+                return 0
+    print("[ERROR] Worker closed the connection", file=sys.stderr)
+    return 1
+
+
+def main(argv=None):
+    if argv is None:
+        # Inside Blender our arguments come after "--"
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description="Persistent Blender render worker")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    srv = sub.add_parser("serve")
+    srv.add_argument("--socket", required=True)
+    srv.add_argument("--output", required=True, help="output pattern, e.g. /out/frame_####")
+    srv.add_argument("--device", default=os.environ.get("CYCLES_DEVICE", "CUDA"))
+
+    ren = sub.add_parser("render")
+    ren.add_argument("--socket", required=True)
+    ren.add_argument("--start", type=int, required=True)
+    ren.add_argument("--end", type=int, required=True)
+    ren.add_argument("--step", type=int, default=1)
+    ren.add_argument("--pid", type=int, help="worker PID, to stop waiting if it dies")
+    ren.add_argument("--timeout", type=int, default=DEFAULT_START_TIMEOUT)
+
+    stop = sub.add_parser("stop")
+    stop.add_argument("--socket", required=True)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        return serve(args.socket, args.output, args.device)
+    try:
+        if args.command == "render":
+            return request(args.socket, {"start": args.start, "end": args.end, "step": args.step},
+                           args.timeout, args.pid)
+        return request(args.socket, {"stop": True}, timeout=5)
+    except RuntimeError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    code = main()
+    if code:
+        sys.exit(code)
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""Pull-based frame dispatcher for distributed renders.
+
+Instead of a fixed START_FRAME/END_FRAME per node, every instance asks the
+coordinator for the next chunk of frames. Claims are leases: if a node dies or
+stops renewing, its chunk goes back to the queue and another node takes it.
+Fast nodes simply come back sooner and end up rendering more.
+
+Server (on any reachable host, or 127.0.0.1 as a local stand-in for tests):
+
+    python3 frame_coordinator.py serve --port 8765 [--state state.json]
+
+Client side (used by onstart.sh on each instance):
+
+    python3 frame_coordinator.py claim --job JOB --node NODE --start 1 --end 250
+        -> prints "START END LEASE" (exit 0), exit 3 when the job is finished,
+           exit 4 when everything left is leased to other nodes (retry later)
+    python3 frame_coordinator.py renew --job JOB --lease LEASE
+    python3 frame_coordinator.py complete --job JOB --lease LEASE
+
+It is also the telemetry collector: nodes POST progress snapshots to
+/jobs/<job>/telemetry (see telemetry.py) and the GUI polls GET on the same
+path for per-node speed and the job ETA.
+
+Go/no-go gate: when the job runs a preview pass first (PREVIEW_GATE=1), every
+node polls the gate before claiming anything; it starts "held" until the GUI
+decides. Claims do not look at the gate:
+
+    python3 frame_coordinator.py preview --job JOB --frames "1 11 21" --remote drive:out/preview
+    python3 frame_coordinator.py preview --job JOB --failed 1   (preview render failed)
+    python3 frame_coordinator.py gate --job JOB
+        -> exit 0 released, 5 still held, 3 rejected (stop without rendering)
+    POST /jobs/<job>/gate {"go": true|false}   (GUI decision)
+
+Only the standard library is used so it runs with the image's python3.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_PORT = 8765
+DEFAULT_CHUNK = 5
+DEFAULT_LEASE_SECONDS = 900
+# An expired lease still accepts a late "complete" for this many lease periods
+EXPIRED_KEEP_LEASES = 4
+
+EXIT_DONE = 3
+EXIT_WAIT = 4
+EXIT_HELD = 5
+
+# post() status when the server could not be reached at all
+UNREACHABLE = 0
+
+GATE_HELD = "held"
+GATE_GO = "go"
+GATE_NO_GO = "no-go"
+
+# Nodes silent for longer than this no longer count towards the job speed
+TELEMETRY_STALE_SECONDS = 300
+# A node is flagged slow when its seconds/frame per GPU exceeds the median by this factor
+SLOW_FACTOR = 1.5
+
+
+class FrameJob:
+    """Chunks of one frame range plus the leases currently held on them."""
+
+    def __init__(self, name, start, end, chunk=DEFAULT_CHUNK, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.name = name
+        self.start = int(start)
+        self.end = int(end)
+        self.chunk = max(1, int(chunk))
+        self.lease_seconds = int(lease_seconds)
+        self.chunks = [(s, min(s + self.chunk - 1, self.end))
+                       for s in range(self.start, self.end + 1, self.chunk)]
+        self.pending = list(range(len(self.chunks)))
+        self.leases = {}    # lease_id -> {"chunk", "node", "expires"}
+        self.expired = {}   # lease_id -> lease, so a late "complete" still counts (see prune_expired)
+        self.done = set()
+        self.frames_by_node = {}
+
+    def expire_leases(self, now):
+        for lease_id, lease in list(self.leases.items()):
+            if lease["expires"] <= now:
+                del self.leases[lease_id]
+                if lease["chunk"] not in self.done:
+                    self.expired[lease_id] = lease
+                    # Abandoned: put it first so it is picked up right away
+                    self.pending.insert(0, lease["chunk"])
+        self.prune_expired(now)
+
+    def prune_expired(self, now):
+        """Forget expired leases whose chunk is done or that expired long ago."""
+        keep = EXPIRED_KEEP_LEASES * self.lease_seconds
+        for lease_id, lease in list(self.expired.items()):
+            if lease["chunk"] in self.done or now - lease["expires"] > keep:
+                del self.expired[lease_id]
+
+    def claim(self, node, now):
+        self.expire_leases(now)
+        while self.pending:
+            index = self.pending.pop(0)
+            if index in self.done:
+                continue
+            lease_id = uuid.uuid4().hex
+            self.leases[lease_id] = {"chunk": index, "node": node, "expires": now + self.lease_seconds}
+            start, end = self.chunks[index]
+            return {"start": start, "end": end, "lease": lease_id, "lease_seconds": self.lease_seconds}
+        return None
+
+    def renew(self, lease_id, now):
+        lease = self.leases.get(lease_id)
+        if lease is None:
+            return False
+        lease["expires"] = now + self.lease_seconds
+        return True
+
+    def complete(self, lease_id):
+        lease = self.leases.pop(lease_id, None) or self.expired.pop(lease_id, None)
+        if lease is None:
+            return False
+        index = lease["chunk"]
+        if index in self.pending:
+            self.pending.remove(index)
+        if index not in self.done:
+            self.done.add(index)
+            start, end = self.chunks[index]
+            node = lease["node"]
+            self.frames_by_node[node] = self.frames_by_node.get(node, 0) + end - start + 1
+            # Other expired leases on this chunk have nothing left to report
+            for other_id in [i for i, other in self.expired.items() if other["chunk"] == index]:
+                del self.expired[other_id]
+        return True
+
+    @property
+    def finished(self):
+        return len(self.done) == len(self.chunks)
+
+    def status(self):
+        return {
+            "job": self.name,
+            "start": self.start,
+            "end": self.end,
+            "chunk": self.chunk,
+            "chunks_total": len(self.chunks),
+            "chunks_done": len(self.done),
+            "chunks_leased": len(self.leases),
+            "chunks_pending": len([i for i in self.pending if i not in self.done]),
+            "finished": self.finished,
+            "frames_by_node": self.frames_by_node,
+        }
+
+    def to_dict(self):
+        data = self.status()
+        data.update({
+            "lease_seconds": self.lease_seconds,
+            "done": sorted(self.done),
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data["job"], data["start"], data["end"], data["chunk"], data["lease_seconds"])
+        job.done = set(data.get("done", []))
+        job.pending = [i for i in job.pending if i not in job.done]
+        job.frames_by_node = data.get("frames_by_node", {})
+        return job
+
+
+class Coordinator:
+    """Thread-safe registry of jobs. Usable in-process as a stand-in for the server."""
+
+    def __init__(self, state_path=None, clock=time.time):
+        self.jobs = {}
+        self.telemetry = {}  # job -> {node: last snapshot}; not persisted
+        self.gates = {}      # job -> {"state", "preview", "note", "updated"}
+        self.lock = threading.Lock()
+        self.state_path = state_path
+        self.clock = clock
+        self.load()
+
+    def load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        with open(self.state_path) as f:
+            state = json.load(f)
+        # Older state files are a bare list of jobs
+        if isinstance(state, list):
+            state = {"jobs": state}
+        for data in state.get("jobs", []):
+            job = FrameJob.from_dict(data)
+            self.jobs[job.name] = job
+        self.gates = state.get("gates", {})
+
+    def save(self):
+        # Leases are not persisted: after a restart in-flight chunks are simply handed out again
+        if not self.state_path:
+            return
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"jobs": [job.to_dict() for job in self.jobs.values()], "gates": self.gates}, f)
+        os.replace(tmp, self.state_path)
+
+    def get_or_create(self, name, params):
+        job = self.jobs.get(name)
+        if job is None:
+            if "start" not in params or "end" not in params:
+                raise KeyError(name)
+            job = FrameJob(name, params["start"], params["end"],
+                           params.get("chunk", DEFAULT_CHUNK),
+                           params.get("lease_seconds", DEFAULT_LEASE_SECONDS))
+            self.jobs[name] = job
+        return job
+
+    def get_gate(self, name):
+        gate = self.gates.get(name)
+        if gate is None:
+            gate = self.gates[name] = {"state": GATE_HELD, "preview": None, "note": None,
+                                       "updated": self.clock()}
+        return gate
+
+    def claim(self, name, node, params=None):
+        with self.lock:
+            params = params or {}
+            job = self.get_or_create(name, params)
+            lease = job.claim(node, self.clock())
+            self.save()
+            if lease is not None:
+                return "lease", lease
+            return ("done", job.status()) if job.finished else ("wait", job.status())
+
+    def renew(self, name, lease_id):
+        with self.lock:
+            return name in self.jobs and self.jobs[name].renew(lease_id, self.clock())
+
+    def complete(self, name, lease_id):
+        with self.lock:
+            ok = name in self.jobs and self.jobs[name].complete(lease_id)
+            self.save()
+            return ok
+
+    def gate(self, name, decision=None, note=None):
+        """Gate of a job, created held; decision True/False releases or rejects it."""
+        with self.lock:
+            gate = self.get_gate(name)
+            if decision is not None:
+                gate.update(state=GATE_GO if decision else GATE_NO_GO, note=note, updated=self.clock())
+            self.save()
+            return dict(gate)
+
+    def gate_state(self, name):
+        with self.lock:
+            return dict(self.gates.get(name) or {"state": None})
+
+    def preview(self, name, node, data):
+        """Checkpoint from the preview node: frames rendered and where they were uploaded."""
+        with self.lock:
+            gate = self.get_gate(name)
+            gate["preview"] = dict(data, node=node, received=self.clock())
+            gate["updated"] = self.clock()
+            self.save()
+            return dict(gate)
+
+    def report(self, name, node, data):
+        with self.lock:
+            self.telemetry.setdefault(name, {})[node] = dict(data, node=node, received=self.clock())
+
+    def telemetry_summary(self, name):
+        """Last snapshot per node plus job totals and ETA."""
+        with self.lock:
+            now = self.clock()
+            nodes = [dict(data, age=round(now - data["received"], 1))
+                     for data in self.telemetry.get(name, {}).values()]
+            live = [n for n in nodes if not n.get("finished") and n["age"] < TELEMETRY_STALE_SECONDS
+                    and n.get("seconds_per_frame")]
+
+            per_gpu = sorted(n["seconds_per_frame"] * (n.get("gpus") or 1) for n in live)
+            median = per_gpu[(len(per_gpu) - 1) // 2] if per_gpu else None
+            for n in nodes:
+                n["slow"] = bool(len(live) > 1 and n in live
+                                 and n["seconds_per_frame"] * (n.get("gpus") or 1) > SLOW_FACTOR * median)
+
+            fps = sum(1.0 / n["seconds_per_frame"] for n in live)
+            job = self.jobs.get(name)
+            if job is not None:
+                # Coordinator job: remaining work is whatever chunks are not done yet
+                job.expire_leases(now)
+                remaining = sum(e - s + 1 for i, (s, e) in enumerate(job.chunks) if i not in job.done)
+                eta = remaining / fps if fps and remaining else (0 if not remaining else None)
+                finished = job.finished
+            else:
+                # Fixed ranges: the job ends when the slowest node does
+                remaining = sum(max(0, n["frames_total"] - n["frames_done"]) for n in nodes if n.get("frames_total"))
+                etas = [n["eta_seconds"] for n in live if n.get("eta_seconds") is not None]
+                eta = max(etas) if etas else (0 if nodes and not remaining else None)
+                finished = bool(nodes) and all(n.get("finished") for n in nodes)
+
+            return {
+                "job": name,
+                "nodes": nodes,
+                "frames_done": sum(n.get("frames_done", 0) for n in nodes),
+                "frames_remaining": remaining,
+                "frames_per_second": round(fps, 4),
+                "eta_seconds": round(eta) if eta is not None else None,
+                "finished": finished,
+                # Every node sent its completion handshake (telemetry.py complete)
+                "complete": bool(nodes) and all(n.get("complete") for n in nodes),
+                "gate": dict(self.gates[name]) if name in self.gates else None,
+            }
+
+    def status(self, name=None):
+        with self.lock:
+            if name is None:
+                return [job.status() for job in self.jobs.values()]
+            self.jobs[name].expire_leases(self.clock())
+            return self.jobs[name].status()
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    coordinator = None
+    token = None
+
+    def send_json(self, status, payload=None):
+        body = json.dumps(payload if payload is not None else {}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def authorized(self):
+        if self.token and self.headers.get("X-Coordinator-Token") != self.token:
+            self.send_json(401, {"error": "invalid token"})
+            return False
+        return True
+
+    def route(self):
+        # /jobs, /jobs/<name>, /jobs/<name>/<action>
+        parts = [p for p in self.path.split("?", 1)[0].split("/") if p]
+        if not parts or parts[0] != "jobs":
+            return None, None
+        name = parts[1] if len(parts) > 1 else None
+        action = parts[2] if len(parts) > 2 else None
+        return name, action
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        name, action = self.route()
+        try:
+            if action == "telemetry":
+                self.send_json(200, self.coordinator.telemetry_summary(name))
+                return
+            if action == "gate":
+                self.send_json(200, self.coordinator.gate_state(name))
+                return
+            self.send_json(200, self.coordinator.status(name))
+        except KeyError:
+            self.send_json(404, {"error": f"unknown job {name}"})
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        name, action = self.route()
+        body = self.read_json()
+        try:
+            if action == "claim":
+                result, payload = self.coordinator.claim(name, body.get("node", "?"), body)
+                # state tells the client what to do: lease / wait / done
+                self.send_json(200, dict(payload, state=result))
+            elif action == "renew":
+                ok = self.coordinator.renew(name, body.get("lease"))
+                self.send_json(200 if ok else 410, {"ok": ok})
+            elif action == "telemetry":
+                self.coordinator.report(name, body.get("node", "?"), body)
+                self.send_json(200, {"ok": True})
+            elif action == "complete":
+                ok = self.coordinator.complete(name, body.get("lease"))
+                self.send_json(200 if ok else 410, {"ok": ok})
+            elif action == "gate":
+                # Without "go" it only registers the gate (held) and returns its state
+                self.send_json(200, self.coordinator.gate(name, body.get("go"), body.get("note")))
+            elif action == "preview":
+                self.send_json(200, self.coordinator.preview(name, body.get("node", "?"), body))
+            else:
+                self.send_json(404, {"error": "unknown action"})
+        except KeyError:
+            self.send_json(404, {"error": f"unknown job {name}"})
+
+    def log_message(self, fmt, *args):
+        sys.stderr.write("[COORD] " + (fmt % args) + "\n")
+
+
+def make_server(host, port, coordinator, token=None):
+    handler = type("Handler", (CoordinatorHandler,), {"coordinator": coordinator, "token": token})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# --- Client helpers -------------------------------------------------------
+
+def post(url, token, path, payload, timeout=30):
+    """(HTTP status, JSON body). UNREACHABLE when there was no answer (refused, timeout)."""
+    data = json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url.rstrip("/") + path, data=data, method="POST",
+                                     headers={"Content-Type": "application/json"})
+    if token:
+        request.add_header("X-Coordinator-Token", token)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, {}
+    except (urllib.error.URLError, http.client.HTTPException, OSError):
+        # Callers retry: a coordinator restart must not print a traceback per call
+        return UNREACHABLE, {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--state", help="JSON file to persist finished chunks")
+
+    for name in ("claim", "renew", "complete", "gate", "preview"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--url", default=os.environ.get("COORDINATOR_URL"))
+        cmd.add_argument("--token", default=os.environ.get("COORDINATOR_TOKEN"))
+        cmd.add_argument("--job", default=os.environ.get("COORDINATOR_JOB", "default"))
+        if name == "claim":
+            cmd.add_argument("--node", default=os.environ.get("CONTAINER_ID") or os.uname().nodename)
+            cmd.add_argument("--start", type=int, default=int(os.environ.get("START_FRAME", 1)))
+            cmd.add_argument("--end", type=int, default=int(os.environ.get("END_FRAME", 250)))
+            cmd.add_argument("--chunk", type=int, default=int(os.environ.get("FRAME_CHUNK", DEFAULT_CHUNK)))
+            cmd.add_argument("--lease-seconds", type=int,
+                             default=int(os.environ.get("FRAME_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)))
+        elif name == "preview":
+            cmd.add_argument("--node", default=os.environ.get("CONTAINER_ID") or os.uname().nodename)
+            cmd.add_argument("--frames", default="", help="preview frames, space separated")
+            cmd.add_argument("--remote", help="where the previews were uploaded")
+            cmd.add_argument("--failed", type=int, default=0, help="1 if the preview render failed")
+        elif name != "gate":
+            cmd.add_argument("--lease", required=True)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = make_server(args.host, args.port, Coordinator(args.state), os.environ.get("COORDINATOR_TOKEN"))
+        print(f"[INFO] Frame coordinator listening on {args.host}:{server.server_port}", flush=True)
+        server.serve_forever()
+        return 0
+
+    if not args.url:
+        print("[ERROR] COORDINATOR_URL is not set", file=sys.stderr)
+        return 2
+
+    if args.command == "claim":
+        status, data = post(args.url, args.token, f"/jobs/{args.job}/claim", {
+            "node": args.node, "start": args.start, "end": args.end,
+            "chunk": args.chunk, "lease_seconds": args.lease_seconds,
+        })
+        state = data.get("state")
+        if status == 200 and state == "lease":
+            print(f"{data['start']} {data['end']} {data['lease']}")
+            return 0
+        if state == "done":
+            return EXIT_DONE
+        if state == "wait":
+            return EXIT_WAIT
+        if status != UNREACHABLE:
+            print(f"[ERROR] claim failed (HTTP {status})", file=sys.stderr)
+        return 1
+
+    if args.command == "gate":
+        status, data = post(args.url, args.token, f"/jobs/{args.job}/gate", {})
+        if status != 200:
+            if status != UNREACHABLE:
+                print(f"[ERROR] gate failed (HTTP {status})", file=sys.stderr)
+            return 1
+        if data.get("state") == GATE_NO_GO and data.get("note"):
+            print(data["note"])
+        return {GATE_GO: 0, GATE_NO_GO: EXIT_DONE}.get(data.get("state"), EXIT_HELD)
+
+    if args.command == "preview":
+        frames = [int(f) for f in args.frames.split()]
+        status, _ = post(args.url, args.token, f"/jobs/{args.job}/preview",
+                         {"node": args.node, "frames": frames, "remote": args.remote, "failed": bool(args.failed)})
+        return 0 if status == 200 else 1
+
+    status, data = post(args.url, args.token, f"/jobs/{args.job}/{args.command}", {"lease": args.lease})
+    return 0 if status == 200 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
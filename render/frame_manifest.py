@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Frame-level checkpoint for the render pipeline.
+
+A small JSON manifest next to the output lists the frames Blender has finished
+writing. A restarted instance skips those, plus anything already uploaded to
+OUTPUT_REMOTE, and only renders what is still missing.
+
+    # Pipe Blender through it to record frames as they are saved
+    blender -b scene.blend -o /out/frame_#### -s 1 -e 250 -a \\
+        | python3 frame_manifest.py record --manifest /out/.render_manifest.json
+
+    # Ranges still to render ("START END" per line)
+    python3 frame_manifest.py missing --manifest /out/.render_manifest.json \\
+        --start 1 --end 250 [--remote-list remote_files.txt]
+
+Frames that exist locally but are not in the manifest are rendered again: the
+instance may have been preempted while Blender was writing them. Several
+recorders (one per GPU) can share a manifest; updates are merged under a lock.
+"""
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import argparse
+
+FRAME_RE = re.compile(r"frame_(\d+)\.[A-Za-z0-9]+$")
+SAVED_RE = re.compile(r"Saved: '([^']+)'")
+
+
+def frame_number(path):
+    match = FRAME_RE.search(os.path.basename(path.strip()))
+    return int(match.group(1)) if match else None
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return set(json.load(f).get("done", []))
+    except (OSError, ValueError):
+        return set()
+
+
+def save_manifest(path, done):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"done": sorted(done), "updated": time.time()}, f)
+    os.replace(tmp, path)
+
+
+def add_to_manifest(path, frames):
+    """Merge frames into the manifest on disk (safe with concurrent writers)."""
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        done = load_manifest(path) | set(frames)
+        save_manifest(path, done)
+    return done
+
+
+def read_remote_list(path):
+    frames = set()
+    if not path:
+        return frames
+    try:
+        with open(path) as f:
+            for line in f:
+                number = frame_number(line)
+                if number is not None:
+                    frames.add(number)
+    except OSError:
+        pass
+    return frames
+
+
+def missing_ranges(start, end, done):
+    """Contiguous (start, end) ranges within [start, end] not present in done."""
+    ranges = []
+    current = None
+    for frame in range(start, end + 1):
+        if frame in done:
+            if current:
+                ranges.append(tuple(current))
+                current = None
+        elif current:
+            current[1] = frame
+        else:
+            current = [frame, frame]
+    if current:
+        ranges.append(tuple(current))
+    return ranges
+
+
+def record(manifest_path, stream=sys.stdin, echo=sys.stdout, events_path=None):
+    """Echo Blender's output and add every "Saved: '...frame_N...'" to the manifest.
+
+    With events_path, a telemetry event per saved frame is appended there too.
+    """
+    timer = None
+    if events_path:
+        from telemetry import FrameTimer, append_event
+        timer = FrameTimer()
+    done = load_manifest(manifest_path)
+    for line in stream:
+        echo.write(line)
+        echo.flush()
+        if timer:
+            timer.feed(line)
+        match = SAVED_RE.search(line)
+        if match:
+            number = frame_number(match.group(1))
+            if number is not None and number not in done:
+                done = add_to_manifest(manifest_path, [number])
+                if timer:
+                    append_event(events_path, timer.frame_saved(number, match.group(1)))
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Frame checkpoint manifest")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record")
+    rec.add_argument("--manifest", required=True)
+    rec.add_argument("--events", help="append per-frame telemetry events (JSON lines) here")
+
+    miss = sub.add_parser("missing")
+    miss.add_argument("--manifest", required=True)
+    miss.add_argument("--start", type=int, required=True)
+    miss.add_argument("--end", type=int, required=True)
+    miss.add_argument("--remote-list", help="output of `rclone lsf OUTPUT_REMOTE`")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        record(args.manifest, events_path=args.events)
+        return 0
+
+    done = load_manifest(args.manifest) | read_remote_list(args.remote_list)
+    for start, end in missing_ranges(args.start, args.end, done):
+        print(f"{start} {end}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
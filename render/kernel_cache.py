@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Cycles kernel files and GPU compile caches: manifest, checks and bundle.
+
+Release Blender builds ship CUDA kernels precompiled per architecture
+(kernel_sm_XX.cubin) plus PTX. GPUs without a matching cubin JIT the PTX in
+the driver, and OptiX always builds its pipeline on the device. Both results
+land in driver caches (CUDA ComputeCache, OptiX cache) that need a real GPU to
+fill. So the work is split:
+
+  build (CPU-only CI)   manifest + verify: checksums of the shipped kernels
+                        and which architectures have a cubin
+  GPU host (once)       export: pack the CUDA/OptiX caches filled by a warm-up
+                        render, tagged with the driver version and GPUs
+  image build           verify the bundle checksums (docker/kernel_cache/)
+  instance start        install: copy the bundle into KERNEL_CACHE_DIR if the
+                        driver matches; check-gpu: warn when a GPU will JIT
+
+    python3 kernel_cache.py manifest --blender-dir /opt/blender --archs "sm_86 sm_89" \\
+        --out /opt/blender/kernel_manifest.json
+    python3 kernel_cache.py verify --manifest /opt/blender/kernel_manifest.json
+    python3 kernel_cache.py export --cache-dir /mnt/data/kernel_cache --out kernel_cache/
+    python3 kernel_cache.py install --bundle /opt/kernel_cache --cache-dir /mnt/data/kernel_cache
+    python3 kernel_cache.py check-gpu --manifest /opt/blender/kernel_manifest.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import subprocess
+
+MANIFEST_NAME = "manifest.json"
+KERNEL_RE = re.compile(r"^kernel(_\w+)?\.(cubin|ptx|fatbin)(\.zst)?$")
+CUBIN_ARCH_RE = re.compile(r"^kernel_(sm_\d+)\.cubin")
+CHUNK = 1024 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_tree(root, match=None):
+    """{relative path: {"size", "sha256"}} for the files under root"""
+    files = {}
+    for base, _, names in os.walk(root):
+        for name in names:
+            if match and not match(name):
+                continue
+            path = os.path.join(base, name)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            if rel == MANIFEST_NAME:
+                continue
+            files[rel] = {"size": os.path.getsize(path), "sha256": file_sha256(path)}
+    return files
+
+
+def check_files(root, files):
+    """Problems found comparing root against a {path: {"size", "sha256"}} listing"""
+    problems = []
+    for rel, entry in sorted(files.items()):
+        path = os.path.join(root, rel)
+        if not os.path.exists(path):
+            problems.append(f"missing {rel}")
+        elif os.path.getsize(path) != entry["size"] or file_sha256(path) != entry["sha256"]:
+            problems.append(f"checksum mismatch {rel}")
+    return problems
+
+
+def kernel_manifest(blender_dir, archs):
+    files = hash_tree(blender_dir, KERNEL_RE.match)
+    cubins = sorted({CUBIN_ARCH_RE.match(os.path.basename(p)).group(1)
+                     for p in files if CUBIN_ARCH_RE.match(os.path.basename(p))})
+    return {
+        "created": time.time(),
+        "blender_dir": blender_dir,
+        "archs_expected": sorted(archs),
+        "archs_cubin": cubins,
+        "ptx": any(".ptx" in p for p in files),
+        "files": files,
+    }
+
+
+def verify_kernels(manifest):
+    """(problems, warnings): problems mean the kernels cannot be trusted"""
+    problems = check_files(manifest["blender_dir"], manifest["files"])
+    if not manifest["ptx"]:
+        problems.append("no PTX kernels: GPUs newer than the cubins cannot run")
+    warnings = []
+    missing = sorted(set(manifest["archs_expected"]) - set(manifest["archs_cubin"]))
+    if missing:
+        warnings.append(f"no cubin for {' '.join(missing)} (those GPUs will JIT from PTX)")
+    return problems, warnings
+
+
+def gpu_info():
+    """[(name, compute capability as sm_XX, driver version)] from nvidia-smi"""
+    try:
+        output = subprocess.check_output(
+            ["nvidia-smi", "--query-gpu=name,compute_cap,driver_version", "--format=csv,noheader"],
+            stderr=subprocess.DEVNULL, timeout=10).decode()
+    except (OSError, subprocess.SubprocessError):
+        return []
+    gpus = []
+    for line in output.strip().splitlines():
+        name, cap, driver = [part.strip() for part in line.split(",")]
+        gpus.append((name, "sm_" + cap.replace(".", ""), driver))
+    return gpus
+
+
+def export_bundle(cache_dir, out):
+    """Copy a filled cache directory to out, with a manifest tagged for this driver."""
+    gpus = gpu_info()
+    if not gpus:
+        raise RuntimeError("export needs nvidia-smi: run it on the GPU host after a warm-up render")
+    if os.path.exists(out):
+        shutil.rmtree(out)
+    shutil.copytree(cache_dir, out)
+    manifest = {
+        "created": time.time(),
+        "driver": gpus[0][2],
+        "gpus": sorted({name for name, _, _ in gpus}),
+        "archs": sorted({arch for _, arch, _ in gpus}),
+        "files": hash_tree(out),
+    }
+    with open(os.path.join(out, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_bundle(bundle):
+    try:
+        with open(os.path.join(bundle, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def install_bundle(bundle, cache_dir, log=print):
+    manifest = load_bundle(bundle)
+    if manifest is None:
+        log("[INFO] No kernel cache bundle in the image")
+        return False
+    gpus = gpu_info()
+    driver = gpus[0][2] if gpus else None
+    # The driver's caches are only valid for the driver version that wrote them
+    if driver != manifest["driver"]:
+        log(f"[INFO] Kernel cache bundle is for driver {manifest['driver']}, host has {driver}; not used")
+        return False
+    problems = check_files(bundle, manifest["files"])
+    if problems:
+        log(f"[WARN] Kernel cache bundle is inconsistent ({problems[0]}...); not used")
+        return False
+    for rel in manifest["files"]:
+        target = os.path.join(cache_dir, rel)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(bundle, rel), target)
+    log(f"[INFO] Kernel cache bundle installed ({len(manifest['files'])} files, "
+        f"{', '.join(manifest['gpus'])})")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cycles kernel cache tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    man = sub.add_parser("manifest")
+    man.add_argument("--blender-dir", required=True)
+    man.add_argument("--archs", default="", help="architectures expected to have a cubin, e.g. 'sm_86 sm_89'")
+    man.add_argument("--out", required=True)
+
+    ver = sub.add_parser("verify")
+    ver.add_argument("--manifest", help="kernel manifest written by 'manifest'")
+    ver.add_argument("--bundle", help="directory written by 'export'")
+
+    exp = sub.add_parser("export")
+    exp.add_argument("--cache-dir", required=True)
+    exp.add_argument("--out", required=True)
+
+    ins = sub.add_parser("install")
+    ins.add_argument("--bundle", required=True)
+    ins.add_argument("--cache-dir", required=True)
+
+    chk = sub.add_parser("check-gpu")
+    chk.add_argument("--manifest", required=True)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "manifest":
+        manifest = kernel_manifest(args.blender_dir, args.archs.split())
+        with open(args.out, "w") as f:
+            json.dump(manifest, f, indent=2)
+        print(f"[INFO] {len(manifest['files'])} kernel files, cubins for {' '.join(manifest['archs_cubin'])}")
+        return 0
+
+    if args.command == "verify":
+        problems = []
+        if args.manifest:
+            with open(args.manifest) as f:
+                found, warnings = verify_kernels(json.load(f))
+            problems += found
+            for warning in warnings:
+                print(f"[WARN] {warning}")
+        if args.bundle:
+            manifest = load_bundle(args.bundle)
+            if manifest is not None:
+                problems += check_files(args.bundle, manifest["files"])
+        for problem in problems:
+            print(f"[ERROR] {problem}", file=sys.stderr)
+        if not problems:
+            print("[INFO] Kernel caches consistent")
+        return 1 if problems else 0
+
+    if args.command == "export":
+        try:
+            manifest = export_bundle(args.cache_dir, args.out)
+        except RuntimeError as e:
+            print(f"[ERROR] {e}", file=sys.stderr)
+            return 1
+        print(f"[INFO] Exported {len(manifest['files'])} files for driver {manifest['driver']}")
+        return 0
+
+    if args.command == "install":
+        install_bundle(args.bundle, args.cache_dir, log=lambda msg: print(msg, flush=True))
+        return 0
+
+    with open(args.manifest) as f:
+        cubins = set(json.load(f)["archs_cubin"])
+    for name, arch, _ in gpu_info():
+        if arch not in cubins:
+            print(f"[WARN] {name} ({arch}) has no precompiled cubin: the first render JITs the PTX")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Output format override applied inside Blender before rendering.
+
+The .blend decides the output format, and a 32-bit uncompressed EXR or a
+16-bit PNG per frame makes the upload the slowest part of a job. This script
+overrides the format from the environment without touching the scene file:
+
+    OUTPUT_PROFILE=exr-dwaa blender -b scene.blend --python output_profile.py \\
+        -o /out/frame_#### -a
+
+    OUTPUT_PROFILE   scene (default, keep the .blend settings) or a PROFILES key
+    OUTPUT_PASSES    comma list of render passes to keep, e.g. "z,normal,denoising"
+                     (combined is always kept; only multilayer EXR writes passes)
+    OUTPUT_EXR_CODEC / OUTPUT_COLOR_DEPTH   override the profile's codec / depth
+
+blender_worker.py applies the same override when the worker starts. DWAA is
+lossy (visually lossless on beauty); use a zip profile for data passes that
+are composited later (depth, normals, cryptomatte).
+"""
+import os
+
+PROFILES = {
+    "scene": {},
+    "exr-dwaa": {"file_format": "OPEN_EXR", "exr_codec": "DWAA", "color_depth": "16"},
+    "exr-zip": {"file_format": "OPEN_EXR", "exr_codec": "ZIP", "color_depth": "16"},
+    "exr-zip-float": {"file_format": "OPEN_EXR", "exr_codec": "ZIP", "color_depth": "32"},
+    "multilayer-dwaa": {"file_format": "OPEN_EXR_MULTILAYER", "exr_codec": "DWAA", "color_depth": "16"},
+    "multilayer-zip": {"file_format": "OPEN_EXR_MULTILAYER", "exr_codec": "ZIP", "color_depth": "16"},
+    "png": {"file_format": "PNG", "color_depth": "8", "compression": 90},
+}
+EXR_FORMATS = ("OPEN_EXR", "OPEN_EXR_MULTILAYER")
+# Compositor sockets that are not passes
+BASE_SOCKETS = ("Image", "Alpha")
+
+
+def resolve_profile(name=None, codec=None, depth=None):
+    """Image settings for a profile name plus the codec/depth overrides."""
+    name = name or "scene"
+    if name not in PROFILES:
+        raise ValueError(f"unknown OUTPUT_PROFILE {name!r} (options: {', '.join(PROFILES)})")
+    settings = dict(PROFILES[name])
+    if codec:
+        settings["exr_codec"] = codec.upper()
+    if depth:
+        settings["color_depth"] = str(depth)
+    return settings
+
+
+def apply_image_settings(scene, settings):
+    image = scene.render.image_settings
+    # The format first: it decides which codecs and depths are valid
+    if "file_format" in settings:
+        image.file_format = settings["file_format"]
+    if "color_depth" in settings:
+        image.color_depth = settings["color_depth"]
+    if "exr_codec" in settings and image.file_format in EXR_FORMATS:
+        image.exr_codec = settings["exr_codec"]
+    if "compression" in settings and image.file_format == "PNG":
+        image.compression = settings["compression"]
+
+
+def pass_switches(view_layer):
+    """(owner, property, pass name) for every render pass toggle of a view layer."""
+    owners = [view_layer]
+    if getattr(view_layer, "cycles", None) is not None:
+        owners.append(view_layer.cycles)
+    for owner in owners:
+        for prop in owner.bl_rna.properties:
+            if prop.type != "BOOLEAN" or prop.is_readonly:
+                continue
+            if prop.identifier.startswith("use_pass_"):
+                yield owner, prop.identifier, prop.identifier[len("use_pass_"):]
+            elif prop.identifier == "denoising_store_passes":
+                yield owner, prop.identifier, "denoising"
+
+
+def compositor_passes(scene):
+    """Render Layers outputs wired in the compositor (other than the image)."""
+    if not scene.use_nodes or scene.node_tree is None:
+        return []
+    return [out.name for node in scene.node_tree.nodes if node.type == "R_LAYERS"
+            for out in node.outputs if out.is_linked and out.name not in BASE_SOCKETS]
+
+
+def keep_passes(scene, passes):
+    """Turn off every pass not in passes. Returns the names turned off."""
+    used = compositor_passes(scene)
+    if used:
+        # Dropping a pass the compositor reads would change the final image
+        print(f"[OUTPUT] Compositor uses {', '.join(sorted(set(used)))}; OUTPUT_PASSES ignored", flush=True)
+        return []
+    keep = {"combined"} | set(passes)
+    disabled = set()
+    for view_layer in scene.view_layers:
+        for owner, prop, name in pass_switches(view_layer):
+            if getattr(owner, prop) and name not in keep:
+                setattr(owner, prop, False)
+                disabled.add(name)
+    return sorted(disabled)
+
+
+def apply_from_env(scene=None, environ=os.environ):
+    import bpy
+
+    scene = scene or bpy.context.scene
+    name = environ.get("OUTPUT_PROFILE") or "scene"
+    settings = resolve_profile(name, environ.get("OUTPUT_EXR_CODEC"), environ.get("OUTPUT_COLOR_DEPTH"))
+    apply_image_settings(scene, settings)
+    passes = [p.strip().lower() for p in environ.get("OUTPUT_PASSES", "").split(",") if p.strip()]
+    disabled = keep_passes(scene, passes) if passes else []
+
+    image = scene.render.image_settings
+    text = f"[OUTPUT] Profile {name}: {image.file_format} {image.color_depth}-bit"
+    if image.file_format in EXR_FORMATS:
+        text += f" {image.exr_codec}"
+    if disabled:
+        text += f", passes off: {', '.join(disabled)}"
+    print(text, flush=True)
+    return scene
+
+
+if __name__ == "__main__":
+    apply_from_env()
@@ -0,0 +1,46 @@
+"""Preview pass settings, applied inside Blender before rendering.
+
+Low samples plus the denoiser, at a reduced resolution, written as small
+JPEGs. It is enough to catch a wrong camera, a missing texture or a broken
+light before the farm spends hours on the real render:
+
+    blender -b scene.blend --python preview.py -o /mnt/data/preview/frame_#### \\
+        -s 1 -e 250 -j 10 -a -- --cycles-device CUDA
+
+    PREVIEW_SAMPLES  Cycles samples (default 16)
+    PREVIEW_SCALE    resolution percentage (default 50)
+
+The .blend is not modified; onstart.sh runs this on the first node before the
+go/no-go gate (frame_coordinator.py gate).
+"""
+import os
+
+DEFAULT_SAMPLES = 16
+DEFAULT_SCALE = 50
+
+
+def apply_preview(scene=None, samples=None, scale=None):
+    import bpy
+
+    scene = scene or bpy.context.scene
+    samples = int(samples or os.environ.get("PREVIEW_SAMPLES") or DEFAULT_SAMPLES)
+    scale = int(scale or os.environ.get("PREVIEW_SCALE") or DEFAULT_SCALE)
+
+    render = scene.render
+    render.resolution_percentage = max(1, min(100, scale))
+    render.use_border = False
+    render.image_settings.file_format = "JPEG"
+    render.image_settings.color_mode = "RGB"
+    render.image_settings.quality = 85
+    if render.engine == "CYCLES":
+        scene.cycles.samples = samples
+        scene.cycles.use_adaptive_sampling = True
+        scene.cycles.use_denoising = True
+        # OIDN runs on any device; the OptiX denoiser needs an OptiX GPU
+        scene.cycles.denoiser = "OPENIMAGEDENOISE"
+    print(f"[PREVIEW] {render.engine}: {samples} samples, {render.resolution_percentage}% resolution", flush=True)
+    return scene
+
+
+if __name__ == "__main__":
+    apply_preview()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Transfer profiles for rclone and per-run throughput stats.
+
+Profiles bundle the parallelism and chunking flags that suit a workload:
+
+    small-files  hundreds/thousands of textures or frames: many parallel
+                 transfers and checkers, fast listing
+    large-files  a few huge files (big .blend, caches, heavy EXRs): fewer
+                 transfers, each split into multi-thread streams / big chunks
+    default      rclone's own defaults
+
+    python3 rclone_tuning.py flags small-files
+    python3 rclone_tuning.py record --stage scene --profile small-files \\
+        --bytes 123456 --seconds 4.2 --files 300
+
+Every run is appended as one JSON line to TRANSFER_STATS
+(default /mnt/data/transfer_stats.jsonl) so profiles can be compared per
+backend and per node.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+
+PROFILES = {
+    "default": [],
+    "small-files": [
+        "--transfers", "32",
+        "--checkers", "64",
+        "--fast-list",
+        "--buffer-size", "16M",
+    ],
+    "large-files": [
+        "--transfers", "8",
+        "--checkers", "16",
+        "--multi-thread-streams", "8",
+        "--multi-thread-cutoff", "128M",
+        "--drive-chunk-size", "128M",
+        "--s3-chunk-size", "64M",
+        "--s3-upload-concurrency", "8",
+        "--buffer-size", "64M",
+    ],
+}
+
+STATS_FILE = os.environ.get("TRANSFER_STATS", "/mnt/data/transfer_stats.jsonl")
+
+
+def profile_flags(name):
+    if name not in PROFILES:
+        raise KeyError(f"unknown rclone profile '{name}' (use one of: {', '.join(PROFILES)})")
+    return list(PROFILES[name])
+
+
+def record_stats(stage, profile, size, seconds, files=None, path=STATS_FILE):
+    """Append one transfer measurement and return the summary line."""
+    seconds = max(seconds, 1e-6)
+    entry = {
+        "time": time.time(),
+        "node": os.environ.get("CONTAINER_ID") or socket.gethostname(),
+        "stage": stage,
+        "profile": profile,
+        "bytes": int(size),
+        "files": files,
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(size / 1e6 / seconds, 2),
+    }
+    try:
+        with open(path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError:
+        pass
+    return (f"[STATS] {stage} ({profile}): {size / 1e6:.1f} MB"
+            + (f", {files} files" if files is not None else "")
+            + f" in {seconds:.1f}s -> {entry['mb_per_s']:.1f} MB/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="rclone transfer profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    flags = sub.add_parser("flags")
+    flags.add_argument("profile")
+
+    rec = sub.add_parser("record")
+    rec.add_argument("--stage", required=True)
+    rec.add_argument("--profile", default="default")
+    rec.add_argument("--bytes", type=int, required=True)
+    rec.add_argument("--seconds", type=float, required=True)
+    rec.add_argument("--files", type=int)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "flags":
+        try:
+            print(" ".join(profile_flags(args.profile)))
+        except KeyError as e:
+            print(f"[ERROR] {e.args[0]}", file=sys.stderr)
+            return 1
+        return 0
+
+    print(record_stats(args.stage, args.profile, args.bytes, args.seconds, args.files))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
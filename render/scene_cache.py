@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Content-addressed cache for the scene directory (.blend plus textures/caches).
+
+The remote scene is listed once with `rclone lsjson -R --hash`, which asks the
+backend for file hashes without downloading anything. Every file is stored in
+the cache under its hash, so only files whose content changed since any earlier
+job are downloaded; the rest are hard-linked into the working directory.
+
+The cache only pays off on a persistent volume (or a mounted local mirror)
+shared across rentals: an instance's own disk starts empty, so a cache there
+is just a plain copy with extra steps. onstart.sh leaves SCENE_CACHE empty by
+default. A manifest per scene hash is kept next to the objects.
+
+    python3 scene_cache.py fetch --remote drive:escenas/test \\
+        --dest /mnt/data/scene --cache /workspace/scene_cache
+    python3 scene_cache.py manifest --dir /mnt/data/scene
+
+Extra rclone flags are read from RCLONE_FLAGS and the transfer profile from
+RCLONE_PROFILE (see rclone_tuning.py).
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import shutil
+import hashlib
+import argparse
+import subprocess
+
+from rclone_tuning import profile_flags, record_stats
+
+# rclone hash names in order of preference, mapped to their hashlib name
+HASH_PREFERENCE = [("md5", "md5"), ("sha1", "sha1"), ("sha256", "sha256")]
+CHUNK = 1024 * 1024
+
+
+def rclone_profile():
+    return os.environ.get("RCLONE_PROFILE", "default")
+
+
+def rclone_flags():
+    return shlex.split(os.environ.get("RCLONE_FLAGS", "")) + profile_flags(rclone_profile())
+
+
+def file_hash(path, algo):
+    digest = hashlib.new(algo)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_remote(remote):
+    output = subprocess.check_output(
+        ["rclone", "lsjson", "-R", "--files-only", "--hash", remote] + rclone_flags())
+    return json.loads(output)
+
+
+def build_manifest(entries):
+    """{path: {"size", "key", "algo"}} from rclone lsjson entries.
+
+    key is the content hash when the backend provides one; otherwise the path,
+    size and modification time stand in (not verifiable, but still stable across
+    jobs). The path is part of that key: textures copied in one batch often share
+    size and mtime, and must not share a cache object.
+    """
+    manifest = {}
+    for entry in entries:
+        hashes = {k.lower(): v for k, v in (entry.get("Hashes") or {}).items() if v}
+        algo, key = None, None
+        for rclone_name, hashlib_name in HASH_PREFERENCE:
+            if rclone_name in hashes:
+                algo, key = hashlib_name, hashes[rclone_name].lower()
+                break
+        if key is None:
+            identity = f"{entry['Path']}\0{entry['Size']}\0{entry.get('ModTime', '')}"
+            key = hashlib.sha256(identity.encode("utf-8")).hexdigest()
+        manifest[entry["Path"]] = {"size": entry["Size"], "key": key, "algo": algo}
+    return manifest
+
+
+def scene_hash(manifest):
+    payload = json.dumps(sorted((p, e["key"]) for p, e in manifest.items()))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SceneCache:
+    def __init__(self, root, log=print):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.manifests = os.path.join(root, "manifests")
+        self.log = log
+        os.makedirs(self.objects, exist_ok=True)
+        os.makedirs(self.manifests, exist_ok=True)
+
+    def object_path(self, entry):
+        return os.path.join(self.objects, entry["algo"] or "meta", entry["key"][:2], entry["key"])
+
+    def has(self, entry):
+        path = self.object_path(entry)
+        return os.path.exists(path) and os.path.getsize(path) == entry["size"]
+
+    def download(self, remote, manifest, paths):
+        staging = os.path.join(self.root, "staging")
+        os.makedirs(staging, exist_ok=True)
+        list_path = os.path.join(self.root, "fetch_list.txt")
+        with open(list_path, "w") as f:
+            f.write("\n".join(paths) + "\n")
+        started = time.monotonic()
+        subprocess.check_call(["rclone", "copy", remote, staging, "--files-from", list_path,
+                               "--no-traverse", "-P"] + rclone_flags())
+        os.remove(list_path)
+        size = sum(manifest[p]["size"] for p in paths)
+        self.log(record_stats("scene", rclone_profile(), size, time.monotonic() - started, len(paths)))
+
+        for path in paths:
+            entry = manifest[path]
+            staged = os.path.join(staging, path)
+            if entry["algo"] and file_hash(staged, entry["algo"]) != entry["key"]:
+                raise RuntimeError(f"hash mismatch for {path}")
+            target = self.object_path(entry)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(staged, target)
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def materialize(self, manifest, dest):
+        for path, entry in manifest.items():
+            target = os.path.join(dest, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            source = self.object_path(entry)
+            if os.path.exists(target):
+                if os.path.samefile(source, target):
+                    continue
+                os.remove(target)
+            try:
+                os.link(source, target)
+            except OSError:
+                # Cache on another filesystem (e.g. a mounted volume): fall back to a copy
+                shutil.copy2(source, target)
+
+    def fetch(self, remote, dest):
+        started = time.monotonic()
+        manifest = build_manifest(list_remote(remote))
+        digest = scene_hash(manifest)
+
+        missing = [p for p, e in manifest.items() if not self.has(e)]
+        reused = len(manifest) - len(missing)
+        missing_bytes = sum(manifest[p]["size"] for p in missing)
+        reused_bytes = sum(e["size"] for e in manifest.values()) - missing_bytes
+        self.log(f"[INFO] Scene {digest[:12]}: {len(manifest)} files, "
+                 f"{reused} cached ({reused_bytes / 1e6:.1f} MB), "
+                 f"{len(missing)} to download ({missing_bytes / 1e6:.1f} MB)")
+
+        if missing:
+            self.download(remote, manifest, missing)
+        self.materialize(manifest, dest)
+
+        with open(os.path.join(self.manifests, f"{digest}.json"), "w") as f:
+            json.dump(manifest, f)
+        self.log(f"[INFO] Scene ready in {dest} ({time.monotonic() - started:.1f}s)")
+        return digest
+
+
+def local_manifest(directory, algo="md5"):
+    manifest = {}
+    for base, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(base, name)
+            rel = os.path.relpath(path, directory).replace(os.sep, "/")
+            manifest[rel] = {"size": os.path.getsize(path), "key": file_hash(path, algo), "algo": algo}
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Content-addressed scene cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    fetch = sub.add_parser("fetch")
+    fetch.add_argument("--remote", required=True)
+    fetch.add_argument("--dest", required=True)
+    fetch.add_argument("--cache", required=True)
+
+    man = sub.add_parser("manifest")
+    man.add_argument("--dir", required=True)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "fetch":
+        SceneCache(args.cache, log=lambda msg: print(msg, flush=True)).fetch(args.remote, args.dest)
+        return 0
+
+    manifest = local_manifest(args.dir)
+    print(json.dumps({"scene_hash": scene_hash(manifest), "files": manifest}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
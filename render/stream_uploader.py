@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Upload frames while Blender is still rendering.
+
+Polls the frame manifest written by frame_manifest.py (so only frames Blender
+has finished saving are picked up) and pushes each new batch to the remote with
+`rclone copy --files-from`. With --delete the batch is sent with `rclone move`
+instead, which removes local files only after rclone has verified the transfer,
+keeping local disk usage bounded by the upload backlog.
+
+    python3 stream_uploader.py --dir /mnt/data/output --remote drive:renders/x \\
+        --manifest /mnt/data/output/.render_manifest.json \\
+        --stop-file /mnt/data/output/.render_done [--delete]
+
+The uploader exits after the stop file appears and the backlog is empty.
+Extra rclone flags are read from RCLONE_FLAGS and the transfer profile from
+RCLONE_PROFILE (see rclone_tuning.py).
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import argparse
+import subprocess
+
+from frame_manifest import FRAME_RE, load_manifest
+from rclone_tuning import profile_flags, record_stats
+
+POLL_SECONDS = 5
+# Failed batches retried after the render finished before giving up
+MAX_FINAL_RETRIES = 5
+STATE_NAME = ".upload_state.json"
+
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return set(json.load(f).get("uploaded", []))
+    except (OSError, ValueError):
+        return set()
+
+
+def save_state(path, uploaded):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"uploaded": sorted(uploaded), "updated": time.time()}, f)
+    os.replace(tmp, path)
+
+
+def frame_files(directory):
+    """{frame_number: file_name} for the frames present in directory"""
+    files = {}
+    for name in os.listdir(directory):
+        match = FRAME_RE.search(name)
+        if match:
+            files[int(match.group(1))] = name
+    return files
+
+
+class StreamUploader:
+    def __init__(self, directory, remote, manifest, delete=False, rclone_flags=None, log=print,
+                 profile="default"):
+        self.directory = directory
+        self.remote = remote
+        self.manifest = manifest
+        self.delete = delete
+        self.rclone_flags = (rclone_flags or []) + profile_flags(profile)
+        self.profile = profile
+        self.log = log
+        self.state_path = os.path.join(directory, STATE_NAME)
+        self.uploaded = load_state(self.state_path)
+        self.bytes_uploaded = 0
+
+    def backlog(self):
+        """Finished frames still waiting to be uploaded: [(frame, file_name)]"""
+        done = load_manifest(self.manifest)
+        files = frame_files(self.directory)
+        return sorted((frame, files[frame]) for frame in done - self.uploaded if frame in files)
+
+    def upload(self, batch):
+        list_path = os.path.join(self.directory, ".upload_batch.txt")
+        with open(list_path, "w") as f:
+            f.write("\n".join(name for _, name in batch) + "\n")
+        size = sum(os.path.getsize(os.path.join(self.directory, name)) for _, name in batch)
+
+        verb = "move" if self.delete else "copy"
+        cmd = ["rclone", verb, self.directory, self.remote,
+               "--files-from", list_path, "--no-traverse"] + self.rclone_flags
+        started = time.monotonic()
+        result = subprocess.run(cmd)
+        os.remove(list_path)
+        if result.returncode != 0:
+            self.log(f"[WARN] rclone {verb} failed for {len(batch)} frame(s); will retry")
+            return False
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.uploaded.update(frame for frame, _ in batch)
+        self.bytes_uploaded += size
+        save_state(self.state_path, self.uploaded)
+        self.log(record_stats("output", self.profile, size, elapsed, len(batch)))
+        return True
+
+    def run(self, stop_file, poll=POLL_SECONDS):
+        final_failures = 0
+        while True:
+            stopping = os.path.exists(stop_file)
+            batch = self.backlog()
+            if batch:
+                if self.upload(batch):
+                    continue
+                if stopping:
+                    final_failures += 1
+                    if final_failures >= MAX_FINAL_RETRIES:
+                        self.log(f"[WARN] Giving up on {len(batch)} frame(s) after {final_failures} retries")
+                        break
+                time.sleep(poll)
+            elif stopping:
+                break
+            else:
+                time.sleep(poll)
+        self.log(f"[INFO] Stream upload finished: {len(self.uploaded)} frame(s), "
+                 f"{self.bytes_uploaded / 1e6:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upload finished frames while rendering")
+    parser.add_argument("--dir", required=True)
+    parser.add_argument("--remote", required=True)
+    parser.add_argument("--manifest", required=True)
+    parser.add_argument("--stop-file", required=True)
+    parser.add_argument("--delete", action="store_true", help="remove local frames once uploaded")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS)
+    args = parser.parse_args(argv)
+
+    flags = shlex.split(os.environ.get("RCLONE_FLAGS", ""))
+    uploader = StreamUploader(args.dir, args.remote, args.manifest, args.delete, flags,
+                              log=lambda msg: print(msg, flush=True),
+                              profile=os.environ.get("RCLONE_PROFILE", "default"))
+    uploader.run(args.stop_file, args.poll)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Render progress telemetry sent from each instance to the collector.
+
+frame_manifest.py record --events appends one JSON line per saved frame (wall
+time since the previous frame on that GPU, samples/s from Cycles' status
+lines). The agent turns the events, the manifest, the upload state and
+nvidia-smi into a snapshot and POSTs it to the collector every interval:
+
+    python3 telemetry.py agent --url http://host:8765 --job JOB --node NODE \\
+        --dir /mnt/data/output --manifest /mnt/data/output/.render_manifest.json \\
+        --start 1 --end 250 --stop-file /mnt/data/output/.render_done
+
+Once the output upload is verified, onstart.sh sends the completion
+handshake the GUI waits for before destroying the instance:
+
+    python3 telemetry.py complete --dir ... --manifest ... --verified 1 [--keep-alive 1]
+
+--keep-alive 1 tells the GUI the node was asked to stay up ($KEEP_ALIVE_FLAG).
+The collector is frame_coordinator.py serve (POST/GET /jobs/<job>/telemetry).
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from frame_manifest import load_manifest
+from frame_coordinator import post, UNREACHABLE
+from stream_uploader import STATE_NAME, load_state
+
+EVENTS_NAME = ".telemetry_events.jsonl"
+INTERVAL_SECONDS = 15
+# Frames used for the moving speed estimate
+WINDOW_FRAMES = 20
+
+SAMPLE_RE = re.compile(r"\bSample (\d+)/(\d+)")
+ELAPSED_RE = re.compile(r"\bTime:\s*(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)")
+
+
+def parse_elapsed(line):
+    match = ELAPSED_RE.search(line)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+class FrameTimer:
+    """Follows one Blender output stream and builds a per-frame event."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.last_saved = clock()
+        self.samples_per_sec = None
+
+    def feed(self, line):
+        # Cycles status line: "... | Time:00:03.21 | ... | Sample 32/128"
+        sample = SAMPLE_RE.search(line)
+        elapsed = parse_elapsed(line) if sample else None
+        if sample and elapsed:
+            self.samples_per_sec = int(sample.group(1)) / elapsed
+
+    def frame_saved(self, frame, path=None):
+        now = self.clock()
+        event = {"frame": frame, "time": now, "seconds": round(now - self.last_saved, 3),
+                 "samples_per_sec": round(self.samples_per_sec, 2) if self.samples_per_sec else None}
+        if path and os.path.exists(path):
+            # Bytes the uploader will push for this frame (OUTPUT_PROFILE)
+            event["bytes"] = os.path.getsize(path)
+        self.last_saved = now
+        self.samples_per_sec = None
+        return event
+
+
+def append_event(path, event):
+    # One short line per write with O_APPEND: safe with one recorder per GPU
+    with open(path, "a") as f:
+        f.write(json.dumps(event) + "\n")
+
+
+def load_events(path, limit=WINDOW_FRAMES):
+    try:
+        with open(path) as f:
+            lines = f.readlines()[-limit:]
+    except OSError:
+        return []
+    events = []
+    for line in lines:
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            pass
+    return events
+
+
+def vram_used_mb():
+    """Memory in use per GPU (MB) according to nvidia-smi, [] if unavailable."""
+    try:
+        output = subprocess.check_output(
+            ["nvidia-smi", "--query-gpu=memory.used", "--format=csv,noheader,nounits"],
+            stderr=subprocess.DEVNULL, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return []
+    return [float(v) for v in output.decode().split() if v.replace(".", "", 1).isdigit()]
+
+
+def node_speed(events):
+    """Seconds per frame for the whole node (all GPUs) over the recent events."""
+    if len(events) >= 2:
+        times = sorted(e["time"] for e in events)
+        span = times[-1] - times[0]
+        if span > 0:
+            return span / (len(times) - 1)
+    if events:
+        return events[-1]["seconds"]
+    return None
+
+
+def snapshot(node, manifest, directory, start=None, end=None, events_path=None, vram_peak=None, gpus=None):
+    done = load_manifest(manifest)
+    uploaded = load_state(os.path.join(directory, STATE_NAME))
+    events = load_events(events_path or os.path.join(directory, EVENTS_NAME))
+    spf = node_speed(events)
+    rates = [e["samples_per_sec"] for e in events if e.get("samples_per_sec")]
+    sizes = [e["bytes"] for e in events if e.get("bytes")]
+
+    data = {
+        "node": node,
+        "time": time.time(),
+        "frames_done": len(done),
+        "frames_total": end - start + 1 if start is not None and end is not None else None,
+        "seconds_per_frame": round(spf, 2) if spf else None,
+        "frame_seconds": round(sum(e["seconds"] for e in events) / len(events), 2) if events else None,
+        "samples_per_sec": round(sum(rates) / len(rates), 1) if rates else None,
+        "vram_peak_mb": vram_peak,
+        "frame_mb": round(sum(sizes) / len(sizes) / 1e6, 2) if sizes else None,
+        "upload_backlog": len(done - uploaded),
+        "gpus": gpus,
+        "eta_seconds": None,
+    }
+    if data["frames_total"] and spf:
+        data["eta_seconds"] = round(max(0, data["frames_total"] - data["frames_done"]) * spf)
+    return data
+
+
+def run_agent(args, log=print):
+    vram_peak = None
+    while True:
+        stopping = os.path.exists(args.stop_file) if args.stop_file else False
+        used = vram_used_mb()
+        if used:
+            vram_peak = max([vram_peak or 0] + used)
+        data = snapshot(args.node, args.manifest, args.dir, args.start, args.end,
+                        vram_peak=vram_peak, gpus=len(used) or None)
+        data["finished"] = stopping
+        status, _ = post(args.url, args.token, f"/jobs/{args.job}/telemetry", data, timeout=10)
+        if status == UNREACHABLE:
+            log(f"[WARN] Telemetry collector unreachable at {args.url}")
+        elif status != 200:
+            log(f"[WARN] Telemetry rejected (HTTP {status})")
+        if stopping:
+            return 0
+        time.sleep(args.interval)
+
+
+def report_complete(args, log=print):
+    """Final snapshot: render finished and the upload checked (or not) against the remote."""
+    data = snapshot(args.node, args.manifest, args.dir, args.start, args.end)
+    data.update({"finished": True, "complete": True, "verified": bool(args.verified),
+                 "keep_alive": bool(args.keep_alive)})
+    status, _ = post(args.url, args.token, f"/jobs/{args.job}/telemetry", data, timeout=10)
+    if status == UNREACHABLE:
+        log(f"[WARN] Could not report completion: collector unreachable at {args.url}")
+    return 0 if status == 200 else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render telemetry agent")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("agent", "complete"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--url", default=os.environ.get("TELEMETRY_URL") or os.environ.get("COORDINATOR_URL"))
+        cmd.add_argument("--token", default=os.environ.get("COORDINATOR_TOKEN"))
+        cmd.add_argument("--job", default=os.environ.get("COORDINATOR_JOB", "default"))
+        cmd.add_argument("--node", default=os.environ.get("CONTAINER_ID") or os.uname().nodename)
+        cmd.add_argument("--dir", required=True)
+        cmd.add_argument("--manifest", required=True)
+        cmd.add_argument("--start", type=int)
+        cmd.add_argument("--end", type=int)
+        if name == "agent":
+            cmd.add_argument("--stop-file")
+            cmd.add_argument("--interval", type=float, default=INTERVAL_SECONDS)
+        else:
+            cmd.add_argument("--verified", type=int, default=0, help="1 if the upload passed rclone check")
+            cmd.add_argument("--keep-alive", type=int, default=0, help="1 if the node must not be destroyed")
+
+    show = sub.add_parser("snapshot")
+    show.add_argument("--dir", required=True)
+    show.add_argument("--manifest", required=True)
+    show.add_argument("--start", type=int)
+    show.add_argument("--end", type=int)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "snapshot":
+        print(json.dumps(snapshot(os.uname().nodename, args.manifest, args.dir, args.start, args.end), indent=2))
+        return 0
+
+    if not args.url:
+        print("[ERROR] TELEMETRY_URL is not set", file=sys.stderr)
+        return 2
+    log = lambda msg: print(msg, flush=True)
+    if args.command == "complete":
+        return report_complete(args, log)
+    return run_agent(args, log)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
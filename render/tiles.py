@@ -0,0 +1,241 @@
+"""Region split of each frame across nodes, and the merge back into full frames.
+
+With TILE_COUNT > 1 every node renders the whole frame range, but only its
+own region of the image (a border render). TILE_COLS picks the grid: 1
+(default) gives horizontal strips, which balance well for most shots.
+The region is applied inside Blender before rendering:
+
+    TILE_INDEX=2 TILE_COUNT=4 blender -b scene.blend --python tiles.py -o /out/frame_#### -a
+
+Border renders are not cropped, so each tile is a full-size image left empty
+(zero RGBA) outside its border. The border is the tile's region grown by
+TILE_MARGIN pixels (default 32) on each side, so the denoiser sees the same
+neighbourhood at a tile edge as in a full render; the merge then copies only
+the region itself from each tile. Compositor filters that spread pixels further
+(glare, blur, defocus...) still leave seams: the node prints a warning for them.
+
+    blender -b --factory-startup --python-exit-code 1 --python tiles.py -- merge \\
+        --tiles /mnt/data/tiles --count 4 --cols 1 --out /mnt/data/merged --start 1 --end 250
+
+--tiles holds one folder per tile (tile_0, tile_1, ...) with the usual
+frame_NNNN files. Frames that already exist in --out are skipped. The merge
+exits with 0 when every frame of the range is merged, and with 2 while some
+tiles are still missing or a frame could not be merged; run it with
+--python-exit-code 1 so any other error is not reported as success.
+Multilayer EXR is not supported: Blender only loads one pass of it as an image.
+Merged frames are written with the same OUTPUT_PROFILE (and OUTPUT_EXR_CODEC /
+OUTPUT_COLOR_DEPTH) as the tiles; see output_profile.py.
+"""
+import os
+import re
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from output_profile import EXR_FORMATS, resolve_profile, apply_image_settings  # noqa: E402
+
+FRAME_RE = re.compile(r"^frame_(\d+)\.[A-Za-z0-9]+$")
+MERGE_PENDING = 2
+DEFAULT_MARGIN = 32
+# Compositor nodes that read pixels further away than any sensible margin
+SPREADING_NODES = {"BLUR", "BOKEHBLUR", "DEFOCUS", "GLARE", "VECBLUR", "BILATERALBLUR",
+                   "DILATEERODE", "DENOISE", "LENSDIST"}
+
+
+def tile_grid(count, cols=1):
+    if count < 1 or cols < 1 or count % cols:
+        raise ValueError(f"TILE_COUNT={count} is not a multiple of TILE_COLS={cols}")
+    return cols, count // cols
+
+
+def tile_region(index, count, cols=1):
+    """(min_x, max_x, min_y, max_y) of a tile as fractions of the frame.
+
+    Tile 0 is the top-left one; Blender's y axis points up.
+    """
+    cols, rows = tile_grid(count, cols)
+    if not 0 <= index < count:
+        raise ValueError(f"TILE_INDEX={index} out of range for {count} tiles")
+    col, row = index % cols, index // cols
+    return (col / cols, (col + 1) / cols, 1 - (row + 1) / rows, 1 - row / rows)
+
+
+def padded_region(region, width, height, margin):
+    """region grown by margin pixels on each side, clamped to the frame"""
+    min_x, max_x, min_y, max_y = region
+    dx, dy = margin / width, margin / height
+    return (max(0.0, min_x - dx), min(1.0, max_x + dx), max(0.0, min_y - dy), min(1.0, max_y + dy))
+
+
+def region_pixels(region, width, height):
+    """(x0, x1, y0, y1) pixel bounds of a region; neighbouring tiles share their edges."""
+    min_x, max_x, min_y, max_y = region
+    return round(min_x * width), round(max_x * width), round(min_y * height), round(max_y * height)
+
+
+def tile_dir(root, index):
+    return os.path.join(root, f"tile_{index}")
+
+
+# --- Render side (inside Blender) -------------------------------------------
+
+def apply_region_from_env(scene=None, environ=os.environ):
+    """Border-render this node's tile plus its margin; no-op unless TILE_COUNT > 1."""
+    count = int(environ.get("TILE_COUNT") or 1)
+    if count <= 1:
+        return scene
+    import bpy
+
+    scene = scene or bpy.context.scene
+    index = int(environ.get("TILE_INDEX") or 0)
+    cols = int(environ.get("TILE_COLS") or 1)
+    margin = max(0, int(environ.get("TILE_MARGIN") or DEFAULT_MARGIN))
+    render = scene.render
+    width = max(1, render.resolution_x * render.resolution_percentage // 100)
+    height = max(1, render.resolution_y * render.resolution_percentage // 100)
+    min_x, max_x, min_y, max_y = padded_region(tile_region(index, count, cols), width, height, margin)
+    render.use_border = True
+    render.use_crop_to_border = False
+    render.border_min_x, render.border_max_x = min_x, max_x
+    render.border_min_y, render.border_max_y = min_y, max_y
+    print(f"[TILES] Tile {index + 1}/{count}: x {min_x:.3f}-{max_x:.3f}, y {min_y:.3f}-{max_y:.3f} "
+          f"({margin}px margin)", flush=True)
+
+    if scene.use_nodes and scene.node_tree is not None:
+        spreading = sorted({node.type for node in scene.node_tree.nodes
+                            if node.type in SPREADING_NODES and not node.mute})
+        if spreading:
+            print(f"[WARN] Compositor uses {', '.join(spreading)}: expect seams between tiles; "
+                  f"render without TILE_SPLIT or composite after the merge", flush=True)
+    return scene
+
+
+# --- Merge side ---------------------------------------------------------------
+
+def frame_files(directory):
+    """{frame number: file name} of the frames in a tile folder"""
+    frames = {}
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            match = FRAME_RE.match(name)
+            if match:
+                frames[int(match.group(1))] = name
+    return frames
+
+
+def merge_plan(tiles_root, count, out_dir, start=None, end=None):
+    """(ready, pending): ready is [(frame, [tile paths], output path)] to merge now."""
+    per_tile = [frame_files(tile_dir(tiles_root, i)) for i in range(count)]
+    merged = frame_files(out_dir)
+    if start is not None and end is not None:
+        wanted = range(start, end + 1)
+    else:
+        wanted = sorted(set().union(*per_tile))
+    ready, pending = [], []
+    for frame in wanted:
+        if frame in merged:
+            continue
+        names = [tiles.get(frame) for tiles in per_tile]
+        if None in names:
+            pending.append(frame)
+        else:
+            paths = [os.path.join(tile_dir(tiles_root, i), name) for i, name in enumerate(names)]
+            ready.append((frame, paths, os.path.join(out_dir, names[0])))
+    return ready, pending
+
+
+def merge_settings(file_format, settings):
+    """Image settings of a merged frame: the tile file's format under the profile's settings."""
+    merged = {"file_format": file_format}
+    if file_format in EXR_FORMATS:
+        # With the "scene" profile the .blend's depth and codec are unknown here
+        # (--factory-startup), so the merge stays lossless
+        merged.update(color_depth="32", exr_codec="ZIP")
+    merged.update(settings)
+    return merged
+
+
+def merge_frame(paths, output, cols=1, settings=None):
+    """Copy each tile's own region (paths in tile order) into one frame; margins are dropped."""
+    import bpy
+    import numpy as np
+
+    total = None
+    size = None
+    for index, path in enumerate(paths):
+        image = bpy.data.images.load(path)
+        try:
+            if image.type == "MULTILAYER":
+                raise ValueError(f"{os.path.basename(path)} is a multilayer EXR (not supported)")
+            if size is None:
+                size = tuple(image.size)
+                total = np.zeros((size[1], size[0], 4), dtype=np.float32)
+            elif tuple(image.size) != size:
+                raise ValueError(f"{os.path.basename(path)} is {image.size[0]}x{image.size[1]}, expected {size[0]}x{size[1]}")
+            pixels = np.empty(size[0] * size[1] * 4, dtype=np.float32)
+            image.pixels.foreach_get(pixels)
+            # Rows start at the bottom of the image, like Blender's border y
+            x0, x1, y0, y1 = region_pixels(tile_region(index, len(paths), cols), size[0], size[1])
+            total[y0:y1, x0:x1] = pixels.reshape(size[1], size[0], 4)[y0:y1, x0:x1]
+            file_format = image.file_format
+        finally:
+            bpy.data.images.remove(image)
+
+    result = bpy.data.images.new(os.path.basename(output), size[0], size[1], alpha=True,
+                                 float_buffer=file_format.startswith("OPEN_EXR"))
+    result.pixels.foreach_set(total.ravel())
+    scene = bpy.context.scene
+    # Pixels are already final: write them back without a view transform on top
+    scene.view_settings.view_transform = "Standard"
+    scene.view_settings.look = "None"
+    apply_image_settings(scene, merge_settings(file_format, settings or {}))
+    scene.render.image_settings.color_mode = "RGBA"
+    tmp = output + ".part"
+    result.save_render(tmp, scene=scene)
+    bpy.data.images.remove(result)
+    # Written under a temporary name so a half-written frame never looks merged
+    os.replace(tmp, output)
+
+
+def merge(tiles_root, count, out_dir, start=None, end=None, cols=1, settings=None):
+    tile_grid(count, cols)
+    os.makedirs(out_dir, exist_ok=True)
+    ready, pending = merge_plan(tiles_root, count, out_dir, start, end)
+    failed = 0
+    for frame, paths, output in ready:
+        try:
+            merge_frame(paths, output, cols, settings)
+            print(f"Saved: '{output}'", flush=True)
+        except (RuntimeError, ValueError) as e:
+            print(f"[ERROR] Frame {frame}: {e}", file=sys.stderr, flush=True)
+            failed += 1
+    print(f"[TILES] {len(ready) - failed} frames merged, {len(pending) + failed} pending", flush=True)
+    return 0 if not pending and not failed else MERGE_PENDING
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if not argv or argv[0] != "merge":
+        # Loaded with --python before -a: only set this node's region
+        apply_region_from_env()
+        return 0
+
+    parser = argparse.ArgumentParser(description="Merge tile renders into full frames")
+    parser.add_argument("--tiles", required=True, help="folder with tile_0 ... tile_N-1")
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--cols", type=int, default=1, help="TILE_COLS of the render")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--start", type=int)
+    parser.add_argument("--end", type=int)
+    parser.add_argument("--profile", default=os.environ.get("OUTPUT_PROFILE"),
+                        help="OUTPUT_PROFILE the tiles were rendered with")
+    args = parser.parse_args(argv[1:])
+    settings = resolve_profile(args.profile, os.environ.get("OUTPUT_EXR_CODEC"), os.environ.get("OUTPUT_COLOR_DEPTH"))
+    return merge(args.tiles, args.count, args.out, args.start, args.end, args.cols, settings)
+
+
+if __name__ == "__main__":
+    code = main()
+    if code:
+        sys.exit(code)
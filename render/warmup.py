@@ -0,0 +1,40 @@
+"""Tiny GPU render that loads the Cycles kernels before the real scene arrives.
+
+Runs inside Blender on the factory startup scene, one process per GPU, while
+onstart.sh is still downloading the scene. Loading the cubins, JIT-compiling
+PTX for GPUs without one and building the OptiX pipeline happen here, and the
+results stay in the driver caches (CUDA_CACHE_PATH, the OptiX cache) for the
+real render.
+
+    CUDA_VISIBLE_DEVICES=0 blender -b --factory-startup --python-exit-code 1 --python warmup.py -- --device OPTIX
+
+OptiX specialises its pipeline on scene features (hair, motion blur, ...), so
+a scene using them may still compile a few extra modules on its first frame.
+"""
+import os
+import sys
+import time
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from blender_worker import setup_scene  # noqa: E402
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    device = argv[argv.index("--device") + 1] if "--device" in argv else os.environ.get("CYCLES_DEVICE", "CUDA")
+
+    scene = setup_scene(os.path.join(bpy.app.tempdir, "warmup_####"), device)
+    scene.render.engine = "CYCLES"
+    scene.render.resolution_x = 64
+    scene.render.resolution_y = 64
+    scene.cycles.samples = 1
+    scene.cycles.use_denoising = False
+
+    started = time.monotonic()
+    bpy.ops.render.render(write_still=False)
+    print(f"[WARMUP] Cycles {device} ready in {time.monotonic() - started:.1f}s", flush=True)
+
+
+main()
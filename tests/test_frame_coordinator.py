@@ -0,0 +1,198 @@
+"""Leases, telemetry summary and go/no-go gate of render/frame_coordinator.py."""
+import os
+import sys
+import socket
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "render"))
+
+from frame_coordinator import (FrameJob, Coordinator, post, UNREACHABLE, EXPIRED_KEEP_LEASES,  # noqa: E402
+                               GATE_HELD, GATE_GO, GATE_NO_GO)
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FrameJobTest(unittest.TestCase):
+    def setUp(self):
+        self.job = FrameJob("job", 1, 10, chunk=5, lease_seconds=100)
+
+    def test_chunks_are_handed_out_once(self):
+        first = self.job.claim("a", 0)
+        second = self.job.claim("b", 0)
+        self.assertEqual({(first["start"], first["end"]), (second["start"], second["end"])}, {(1, 5), (6, 10)})
+        self.assertIsNone(self.job.claim("c", 0))
+
+    def test_renew_keeps_the_lease(self):
+        lease = self.job.claim("a", 0)
+        self.job.claim("b", 0)
+        self.assertTrue(self.job.renew(lease["lease"], 90))
+        self.job.expire_leases(150)
+        self.assertIn(lease["lease"], self.job.leases)
+        self.assertFalse(self.job.renew("unknown", 150))
+
+    def test_expired_lease_is_reassigned(self):
+        lease = self.job.claim("a", 0)
+        self.job.claim("b", 50)
+        again = self.job.claim("c", 120)
+        self.assertEqual((again["start"], again["end"]), (lease["start"], lease["end"]))
+        self.assertFalse(self.job.renew(lease["lease"], 120))
+
+    def test_late_complete_still_counts(self):
+        lease = self.job.claim("a", 0)
+        self.job.expire_leases(120)
+        self.assertTrue(self.job.complete(lease["lease"]))
+        self.assertEqual(self.job.frames_by_node, {"a": 5})
+        # The chunk went back to the queue but is done now: it is not handed out again
+        other = self.job.claim("b", 120)
+        self.assertNotEqual(other["start"], lease["start"])
+        self.assertIsNone(self.job.claim("c", 120))
+
+    def test_expired_lease_is_forgotten_once_another_node_finishes_the_chunk(self):
+        leases = [self.job.claim("a", 0), self.job.claim("b", 0)]
+        again = self.job.claim("c", 120)
+        lease = next(l for l in leases if l["start"] == again["start"])
+        self.assertTrue(self.job.complete(again["lease"]))
+        self.assertNotIn(lease["lease"], self.job.expired)
+        self.assertFalse(self.job.complete(lease["lease"]))
+        self.assertEqual(self.job.frames_by_node, {"c": 5})
+
+    def test_expired_leases_are_dropped_after_a_while(self):
+        lease = self.job.claim("a", 0)
+        self.job.expire_leases(120)
+        self.assertIn(lease["lease"], self.job.expired)
+        self.job.expire_leases(100 + EXPIRED_KEEP_LEASES * 100 + 1)
+        self.assertEqual(self.job.expired, {})
+
+    def test_state_round_trip(self):
+        lease = self.job.claim("a", 0)
+        self.job.complete(lease["lease"])
+        restored = FrameJob.from_dict(self.job.to_dict())
+        self.assertEqual(restored.done, self.job.done)
+        claimed = restored.claim("b", 0)
+        self.assertNotEqual(claimed["start"], lease["start"])
+
+
+class CoordinatorTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.coordinator = Coordinator(clock=self.clock)
+        self.params = {"start": 1, "end": 4, "chunk": 2, "lease_seconds": 60}
+
+    def test_claim_states(self):
+        state, first = self.coordinator.claim("job", "a", self.params)
+        self.assertEqual(state, "lease")
+        state, second = self.coordinator.claim("job", "b", self.params)
+        self.assertEqual(state, "lease")
+        self.assertEqual(self.coordinator.claim("job", "c", self.params)[0], "wait")
+        self.assertTrue(self.coordinator.complete("job", first["lease"]))
+        self.assertTrue(self.coordinator.complete("job", second["lease"]))
+        self.assertEqual(self.coordinator.claim("job", "c", self.params)[0], "done")
+
+    def test_unknown_job_needs_a_range(self):
+        with self.assertRaises(KeyError):
+            self.coordinator.claim("other", "a", {})
+
+    def test_state_file_keeps_done_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.json")
+            coordinator = Coordinator(path, clock=self.clock)
+            _, lease = coordinator.claim("job", "a", self.params)
+            coordinator.complete("job", lease["lease"])
+            restarted = Coordinator(path, clock=self.clock)
+            self.assertEqual(restarted.jobs["job"].done, {0})
+
+
+class TelemetrySummaryTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock(1000.0)
+        self.coordinator = Coordinator(clock=self.clock)
+
+    def report(self, node, spf, done=0, total=10, **extra):
+        data = {"seconds_per_frame": spf, "frames_done": done, "frames_total": total,
+                "eta_seconds": (total - done) * spf, "gpus": 1}
+        data.update(extra)
+        self.coordinator.report("job", node, data)
+
+    def test_slow_node_is_flagged(self):
+        self.report("a", 10.0)
+        self.report("b", 11.0)
+        self.report("c", 30.0)
+        nodes = {n["node"]: n for n in self.coordinator.telemetry_summary("job")["nodes"]}
+        self.assertEqual([name for name, n in sorted(nodes.items()) if n["slow"]], ["c"])
+
+    def test_static_ranges_finish_with_the_slowest_node(self):
+        self.report("a", 10.0, done=5)
+        self.report("b", 20.0, done=2)
+        summary = self.coordinator.telemetry_summary("job")
+        self.assertEqual(summary["frames_done"], 7)
+        self.assertEqual(summary["frames_remaining"], 13)
+        self.assertEqual(summary["eta_seconds"], 160)
+        self.assertFalse(summary["finished"])
+
+    def test_stale_nodes_do_not_count(self):
+        self.report("a", 10.0)
+        self.clock.now += 3600
+        self.report("b", 20.0)
+        summary = self.coordinator.telemetry_summary("job")
+        self.assertAlmostEqual(summary["frames_per_second"], 0.05)
+
+    def test_complete_needs_every_node(self):
+        self.report("a", 10.0, done=10, finished=True, complete=True)
+        self.report("b", 10.0, done=8)
+        self.assertFalse(self.coordinator.telemetry_summary("job")["complete"])
+        self.report("b", 10.0, done=10, finished=True, complete=True)
+        summary = self.coordinator.telemetry_summary("job")
+        self.assertTrue(summary["complete"])
+        self.assertTrue(summary["finished"])
+
+
+class GateTest(unittest.TestCase):
+    def setUp(self):
+        self.coordinator = Coordinator(clock=Clock())
+
+    def test_gate_starts_held(self):
+        self.assertEqual(self.coordinator.gate_state("job"), {"state": None})
+        self.assertEqual(self.coordinator.gate("job")["state"], GATE_HELD)
+        self.assertEqual(self.coordinator.gate_state("job")["state"], GATE_HELD)
+
+    def test_preview_then_go(self):
+        gate = self.coordinator.preview("job", "a", {"frames": [1, 11], "remote": "drive:p"})
+        self.assertEqual(gate["state"], GATE_HELD)
+        self.assertEqual(gate["preview"]["frames"], [1, 11])
+        self.assertEqual(self.coordinator.gate("job", True)["state"], GATE_GO)
+        # Asking again does not change the decision
+        self.assertEqual(self.coordinator.gate("job")["state"], GATE_GO)
+
+    def test_no_go_keeps_the_note(self):
+        gate = self.coordinator.gate("job", False, "wrong camera")
+        self.assertEqual((gate["state"], gate["note"]), (GATE_NO_GO, "wrong camera"))
+
+    def test_claims_ignore_the_gate(self):
+        # Nodes poll the gate before claiming; the claim itself never waits on it
+        self.coordinator.gate("job")
+        state, lease = self.coordinator.claim("job", "a", {"start": 1, "end": 10})
+        self.assertEqual(state, "lease")
+        self.assertEqual(self.coordinator.gate_state("job")["state"], GATE_HELD)
+
+    def test_gate_shows_in_the_summary(self):
+        self.coordinator.preview("job", "a", {"failed": True, "frames": []})
+        self.assertTrue(self.coordinator.telemetry_summary("job")["gate"]["preview"]["failed"])
+
+
+class PostTest(unittest.TestCase):
+    def test_unreachable_server(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self.assertEqual(post(f"http://127.0.0.1:{port}", None, "/jobs/x/claim", {}, timeout=5), (UNREACHABLE, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
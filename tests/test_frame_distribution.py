@@ -0,0 +1,69 @@
+"""Reparto de frames proporcional a la velocidad de cada máquina."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ui.mvc.models.frame_distribution import plan_distribution, estimate_fps, format_duration  # noqa: E402
+
+
+class PlanDistributionTest(unittest.TestCase):
+    def test_faster_machine_gets_more_frames(self):
+        offers = {"a": {"gpu_name": "RTX 4090"}, "b": {"gpu_name": "RTX 3090"}}
+        # 10 s/frame frente a 30 s/frame: 3 de cada 4 frames a la primera
+        plans = plan_distribution(1, 100, ["a", "b"], offers, {"RTX 4090": 10.0, "RTX 3090": 30.0})
+        self.assertEqual([p.frames for p in plans], [75, 25])
+        self.assertEqual([(p.start, p.end) for p in plans], [(1, 75), (76, 100)])
+        self.assertFalse(any(p.estimated for p in plans))
+
+    def test_heap_minimises_the_finish_time(self):
+        offers = {"a": {"gpu_name": "A"}, "b": {"gpu_name": "B"}, "c": {"gpu_name": "C"}}
+        history = {"A": 7.0, "B": 11.0, "C": 13.0}
+        plans = plan_distribution(1, 50, ["a", "b", "c"], offers, history)
+        finish = max(p.eta_seconds for p in plans)
+        # Pasar un frame de la máquina que acaba última a cualquier otra no adelanta el final
+        last = max(plans, key=lambda p: p.eta_seconds)
+        for other in plans:
+            if other is not last:
+                self.assertGreaterEqual((other.frames + 1) / other.fps, finish)
+        self.assertEqual(sum(p.frames for p in plans), 50)
+
+    def test_ranges_are_contiguous(self):
+        offers = {m: {"gpu_name": "X", "dlperf": d} for m, d in [("a", 50), ("b", 100), ("c", 200)]}
+        plans = plan_distribution(10, 40, ["a", "b", "c"], offers)
+        self.assertEqual(plans[0].start, 10)
+        for prev, nxt in zip(plans, plans[1:]):
+            self.assertEqual(nxt.start, prev.end + 1)
+        self.assertEqual(plans[-1].end, 40)
+        self.assertTrue(all(p.estimated for p in plans))
+
+    def test_every_machine_gets_a_frame_when_there_are_enough(self):
+        offers = {"a": {"dlperf": 1000}, "b": {"dlperf": 1}}
+        plans = plan_distribution(1, 10, ["a", "b"], offers)
+        self.assertEqual(plans[1].frames, 1)
+
+    def test_more_machines_than_frames(self):
+        offers = {m: {"dlperf": d} for m, d in [("a", 100), ("b", 300), ("c", 200)]}
+        plans = plan_distribution(1, 2, ["a", "b", "c"], offers)
+        self.assertEqual([p.frames for p in plans], [0, 1, 1])
+        self.assertIsNone(plans[0].start)
+
+    def test_dlperf_is_calibrated_against_the_history(self):
+        offers = [{"gpu_name": "Known", "dlperf": 100, "num_gpus": 2}, {"gpu_name": "New", "dlperf": 50}]
+        (known, _), (new, estimated) = estimate_fps(offers, {"Known": 10.0})
+        self.assertAlmostEqual(known, 0.2)
+        # Misma dlperf por GPU que la conocida (dlperf es de la máquina entera): misma velocidad por GPU
+        self.assertAlmostEqual(new, 0.1)
+        self.assertTrue(estimated)
+
+
+class FormatDurationTest(unittest.TestCase):
+    def test_format(self):
+        self.assertEqual(format_duration(59.6), "1m00s")
+        self.assertEqual(format_duration(3725), "1h02m05s")
+        self.assertEqual(format_duration(float('inf')), "∞")
+
+
+if __name__ == "__main__":
+    unittest.main()
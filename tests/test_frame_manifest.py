@@ -0,0 +1,61 @@
+"""Frame checkpoint of render/frame_manifest.py."""
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "render"))
+
+from frame_manifest import (frame_number, load_manifest, add_to_manifest, missing_ranges,  # noqa: E402
+                            read_remote_list, record)
+
+
+class MissingRangesTest(unittest.TestCase):
+    def test_gaps_become_ranges(self):
+        self.assertEqual(missing_ranges(1, 10, {3, 4, 8}), [(1, 2), (5, 7), (9, 10)])
+        self.assertEqual(missing_ranges(1, 3, {1, 2, 3}), [])
+        self.assertEqual(missing_ranges(5, 6, set()), [(5, 6)])
+
+    def test_frame_number(self):
+        self.assertEqual(frame_number("/out/frame_0042.exr\n"), 42)
+        self.assertIsNone(frame_number("/out/frame_0042.exr.part"))
+
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manifest = os.path.join(self.tmp.name, ".render_manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_missing_manifest_is_empty(self):
+        self.assertEqual(load_manifest(self.manifest), set())
+
+    def test_writers_merge(self):
+        add_to_manifest(self.manifest, [1, 2])
+        add_to_manifest(self.manifest, [2, 5])
+        self.assertEqual(load_manifest(self.manifest), {1, 2, 5})
+
+    def test_record_only_counts_saved_frames(self):
+        log = ("Fra:1 Mem:10M | Rendering\n"
+               "Saved: '/out/frame_0001.exr'\n"
+               "Time: 00:01.00 (Saving: 00:00.10)\n"
+               "Saved: '/out/frame_0002.exr'\n")
+        echo = io.StringIO()
+        done = record(self.manifest, io.StringIO(log), echo)
+        self.assertEqual(done, {1, 2})
+        self.assertEqual(load_manifest(self.manifest), {1, 2})
+        self.assertEqual(echo.getvalue(), log)
+
+    def test_remote_list(self):
+        path = os.path.join(self.tmp.name, "remote.txt")
+        with open(path, "w") as f:
+            f.write("frame_0001.exr\nframe_0003.exr\nnotes.txt\n")
+        self.assertEqual(read_remote_list(path), {1, 3})
+        self.assertEqual(read_remote_list(os.path.join(self.tmp.name, "none.txt")), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
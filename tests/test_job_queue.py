@@ -0,0 +1,86 @@
+"""Reglas de conflicto y fusión de la cola de trabajos (necesita PySide2)."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+try:
+    from PySide2.QtCore import QCoreApplication
+    from ui.mvc.controllers.job_queue import JobScheduler, CONFLICTS, modes_conflict
+except ImportError:
+    QCoreApplication = None
+
+
+if QCoreApplication is not None:
+    class RecordingScheduler(JobScheduler):
+        """No arranca hilos: solo anota qué trabajos empezarían"""
+
+        def __init__(self):
+            super().__init__()
+            self.started = []
+
+        def start(self, job):
+            self.running[job.job_id] = job
+            self.started.append(job.mode)
+
+        def finish(self, job_id):
+            del self.running[job_id]
+            self.start_pending()
+
+
+@unittest.skipIf(QCoreApplication is None, "PySide2 no está instalado")
+class JobSchedulerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.jobs = RecordingScheduler()
+
+    def test_conflicts_are_symmetric(self):
+        for mode, others in CONFLICTS.items():
+            for other in others:
+                self.assertTrue(modes_conflict(other, mode), (mode, other))
+        self.assertFalse(modes_conflict('search', 'show_instances'))
+        self.assertFalse(modes_conflict('search', 'search'))
+
+    def test_independent_jobs_run_together(self):
+        self.jobs.submit('search')
+        self.jobs.submit('show_instances')
+        self.jobs.submit('ssh_url')
+        self.assertEqual(self.jobs.started, ['search', 'show_instances', 'ssh_url'])
+
+    def test_conflicting_job_waits(self):
+        rent = self.jobs.submit('rent')
+        self.jobs.submit('destroy')
+        self.assertEqual(self.jobs.started, ['rent'])
+        self.jobs.finish(rent)
+        self.assertEqual(self.jobs.started, ['rent', 'destroy'])
+
+    def test_queue_order_is_kept_against_waiting_conflicts(self):
+        rent = self.jobs.submit('rent')
+        self.jobs.submit('set_api_key')
+        # No choca con rent, pero sí con set_api_key que ya esperaba
+        self.jobs.submit('search')
+        self.assertEqual(self.jobs.started, ['rent'])
+        self.jobs.finish(rent)
+        self.assertEqual(self.jobs.started, ['rent', 'set_api_key'])
+
+    def test_same_key_is_merged(self):
+        first = self.jobs.submit('show_instances', key='show_instances')
+        calls = []
+        second = self.jobs.submit('show_instances', setup=calls.append, key='show_instances')
+        self.assertEqual(first, second)
+        self.assertEqual(calls, [])
+        self.assertEqual(self.jobs.started, ['show_instances'])
+
+    def test_key_is_free_again_after_finishing(self):
+        first = self.jobs.submit('telemetry', key='telemetry')
+        self.jobs.finish(first)
+        self.assertNotEqual(self.jobs.submit('telemetry', key='telemetry'), first)
+        self.assertTrue(self.jobs.is_running('telemetry'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Caché de búsquedas: cuándo una búsqueda anterior cubre la nueva y el tope de resultados."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ui.mvc.models.offer_cache import SearchParams, OfferCache  # noqa: E402
+
+
+def params(gpu="Cualquiera", price=1.0, disk=20, region="", cuda=""):
+    return SearchParams(gpu, price, disk, region, cuda)
+
+
+def offer(offer_id, gpu="RTX 4090", price=0.5, disk=100, geo="Texas, US", cuda=12.0):
+    return {"id": offer_id, "gpu_name": gpu, "dph_total": price, "disk_space": disk,
+            "geolocation": geo, "cuda_max_good": cuda}
+
+
+class CoversTest(unittest.TestCase):
+    def test_stricter_filters_are_covered(self):
+        wide = params()
+        self.assertTrue(wide.covers(params(gpu="RTX 4090", price=0.5, disk=50, region="US", cuda="12")))
+        self.assertTrue(wide.covers(wide))
+
+    def test_looser_filters_are_not(self):
+        base = params(gpu="RTX 4090", price=0.5, disk=50, region="US,DE", cuda="12")
+        self.assertFalse(base.covers(params(gpu="RTX 4090", price=0.6, disk=50, region="US", cuda="12")))
+        self.assertFalse(base.covers(params(gpu="RTX 4090", price=0.5, disk=40, region="US", cuda="12")))
+        self.assertFalse(base.covers(params(gpu="Cualquiera", price=0.5, disk=50, region="US", cuda="12")))
+        self.assertFalse(base.covers(params(gpu="RTX 4090", price=0.5, disk=50, region="US,FR", cuda="12")))
+        self.assertFalse(base.covers(params(gpu="RTX 4090", price=0.5, disk=50, region="", cuda="12")))
+        self.assertFalse(base.covers(params(gpu="RTX 4090", price=0.5, disk=50, region="US", cuda="11.8")))
+
+    def test_bad_cuda_means_no_filter(self):
+        self.assertIsNone(params(cuda="abc").cuda)
+
+
+class OfferCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.offers = [
+            offer(1, price=0.3),
+            offer(2, gpu="RTX 3090", price=0.2, geo="Bavaria, DE"),
+            offer(3, price=0.9, disk=10),
+            offer(4, price=0.4, cuda=11.0),
+        ]
+
+    def test_filters_locally(self):
+        cache = OfferCache(ttl=60, limit=100)
+        cache.store(params(), self.offers)
+        self.assertEqual([o["id"] for o in cache.lookup(params(gpu="RTX 4090"))], [1, 4])
+        self.assertEqual([o["id"] for o in cache.lookup(params(price=0.35))], [1, 2])
+        self.assertEqual([o["id"] for o in cache.lookup(params(region="DE"))], [2])
+        self.assertEqual([o["id"] for o in cache.lookup(params(cuda="12"))], [1, 2])
+        self.assertEqual([o["id"] for o in cache.lookup(params(disk=50))], [1, 2, 4])
+
+    def test_wider_search_goes_to_the_api(self):
+        cache = OfferCache(ttl=60, limit=100)
+        cache.store(params(price=0.5), self.offers)
+        self.assertIsNone(cache.lookup(params(price=1.0)))
+
+    def test_truncated_search_goes_to_the_api(self):
+        # Con tantas ofertas como el tope pueden faltar las que pide el filtro nuevo
+        cache = OfferCache(ttl=60, limit=len(self.offers))
+        cache.store(params(), self.offers)
+        self.assertIsNone(cache.lookup(params(gpu="RTX 4090")))
+        cache = OfferCache(ttl=60, limit=len(self.offers) + 1)
+        cache.store(params(), self.offers)
+        self.assertIsNotNone(cache.lookup(params(gpu="RTX 4090")))
+
+    def test_disabled_or_invalidated(self):
+        cache = OfferCache(ttl=0, limit=100)
+        cache.store(params(), self.offers)
+        self.assertIsNone(cache.lookup(params()))
+        cache = OfferCache(ttl=60, limit=100)
+        cache.store(params(), self.offers)
+        cache.invalidate()
+        self.assertIsNone(cache.lookup(params()))
+
+
+if __name__ == "__main__":
+    unittest.main()
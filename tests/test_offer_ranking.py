@@ -0,0 +1,74 @@
+"""Coste por frame y propuesta de máquinas para un plazo."""
+import os
+import sys
+import math
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ui.mvc.models.offer_ranking import OfferScores, DEFAULT_MAX_MACHINES, offer_reliability  # noqa: E402
+
+
+def offer(offer_id, dph=0.5, dlperf=100, gpus=1, down=1000, up=1000, reliability=1.0):
+    return {"id": offer_id, "dph_total": dph, "dlperf": dlperf, "num_gpus": gpus,
+            "inet_down": down, "inet_up": up, "reliability2": reliability}
+
+
+class OfferScoresTest(unittest.TestCase):
+    def test_cost_per_frame_orders_offers(self):
+        scores = OfferScores([offer(1, dph=1.0), offer(2, dph=0.5)], 100)
+        rows = scores.annotate()
+        self.assertLess(rows[1]["cost_per_frame"], rows[0]["cost_per_frame"])
+        self.assertEqual(scores.select().ids, ["2"])
+
+    def test_slow_upload_limits_the_speed(self):
+        fast, slow = OfferScores([offer(1), offer(2, up=0.1)], 100).fps
+        self.assertLess(slow, fast)
+
+    def test_deadline_takes_the_cheapest_that_arrive(self):
+        offers = [offer(i, dph=0.1 * (i + 1)) for i in range(5)]
+        scores = OfferScores(offers, 300)
+        selection = scores.select(deadline=4 * 3600)
+        self.assertTrue(selection.feasible)
+        self.assertLessEqual(selection.finish_seconds, 4 * 3600)
+        # Las más baratas primero, sin máquinas de sobra
+        needed = len(selection.ids)
+        self.assertGreater(needed, 1)
+        self.assertEqual(selection.ids, [str(i) for i in range(needed)])
+        self.assertGreater(scores.plan(range(needed - 1)).finish_seconds, 4 * 3600)
+
+    def test_zero_reliability_is_not_taken_as_perfect(self):
+        self.assertEqual(offer_reliability({"reliability2": 0.0, "reliability": 0.9}), 0.0)
+        self.assertEqual(offer_reliability({"reliability2": None, "reliability": 0.0}), 0.0)
+        self.assertEqual(offer_reliability({"reliability": 0.9}), 0.9)
+        self.assertEqual(offer_reliability({}), 1.0)
+        scores = OfferScores([offer(1, reliability=0.0), offer(2, dph=2.0)], 100)
+        self.assertEqual(scores.fps[0], 0.0)
+        self.assertEqual(scores.select().ids, ["2"])
+
+    def test_max_machines_is_respected(self):
+        scores = OfferScores([offer(i) for i in range(20)], 100000)
+        selection = scores.select(max_machines=3, deadline=3600)
+        self.assertEqual(len(selection.ids), 3)
+        self.assertFalse(selection.feasible)
+
+    def test_unreachable_deadline_is_capped_without_max_machines(self):
+        scores = OfferScores([offer(i) for i in range(50)], 100000)
+        selection = scores.select(deadline=3600)
+        self.assertEqual(len(selection.ids), DEFAULT_MAX_MACHINES)
+        self.assertFalse(selection.feasible)
+        self.assertIn("no llega al plazo", selection.describe())
+
+    def test_no_usable_offer(self):
+        selection = OfferScores([], 10).select(deadline=3600)
+        self.assertEqual(selection.ids, [])
+        self.assertFalse(selection.feasible)
+
+    def test_finish_time_with_no_frames(self):
+        scores = OfferScores([offer(1)], 0)
+        self.assertEqual(scores.finish_time([0]), 0.0)
+        self.assertTrue(math.isinf(OfferScores([offer(1)], 10).finish_time([])))
+
+
+if __name__ == "__main__":
+    unittest.main()
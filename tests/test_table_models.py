@@ -0,0 +1,67 @@
+"""Actualización por diferencias de los modelos de tabla (necesita PySide2)."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+try:
+    from PySide2.QtCore import QCoreApplication, Qt
+    from ui.mvc.models.table_models import OfferTableModel, SORT_ROLE
+except ImportError:
+    QCoreApplication = None
+
+
+def offer(offer_id, gpu="RTX 4090", dph=0.5):
+    return {"id": offer_id, "gpu_name": gpu, "num_gpus": 1, "dph_total": dph,
+            "dlperf": 100, "reliability2": 0.99}
+
+
+@unittest.skipIf(QCoreApplication is None, "PySide2 no está instalado")
+class RecordTableModelTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.model = OfferTableModel()
+        self.model.update([offer(1), offer(2), offer(3)])
+        self.events = []
+        self.model.rowsRemoved.connect(lambda parent, first, last: self.events.append(('removed', first, last)))
+        self.model.rowsInserted.connect(lambda parent, first, last: self.events.append(('inserted', first, last)))
+        self.model.dataChanged.connect(lambda top, bottom: self.events.append(('changed', top.row())))
+
+    def column(self, field):
+        return [c.field for c in self.model.COLUMNS].index(field)
+
+    def test_same_data_emits_nothing(self):
+        self.model.update([offer(1), offer(2), offer(3)])
+        self.assertEqual(self.events, [])
+
+    def test_only_the_differences_are_applied(self):
+        self.model.update([offer(3), offer(1, dph=0.7), offer(4)])
+        self.assertEqual(self.events, [('removed', 1, 1), ('changed', 0), ('inserted', 2, 2)])
+        self.assertEqual(self.model.keys, ['1', '3', '4'])
+        self.assertEqual(self.model.row_of, {'1': 0, '3': 1, '4': 2})
+        price = self.model.index(0, self.column('dph_total'))
+        self.assertEqual(self.model.data(price), "0.700")
+        self.assertEqual(self.model.data(price, SORT_ROLE), 0.7)
+
+    def test_record_by_key(self):
+        self.model.update([offer(2, gpu="RTX 3090")])
+        self.assertEqual(self.model.record(2)["gpu_name"], "RTX 3090")
+        self.assertIsNone(self.model.record(1))
+        self.assertEqual(self.model.rowCount(), 1)
+
+    def test_missing_and_bad_values_use_the_default(self):
+        self.model.update([{"id": 9, "dph_total": "abc"}])
+        row = self.model.row_of['9']
+        self.assertEqual(self.model.data(self.model.index(row, self.column('gpu_name'))), "Unknown")
+        self.assertEqual(self.model.data(self.model.index(row, self.column('dph_total')), SORT_ROLE), 0)
+        self.assertEqual(self.model.data(self.model.index(row, self.column('cost_per_frame'))), "—")
+        self.assertEqual(self.model.data(self.model.index(row, 0), Qt.TextAlignmentRole),
+                         int(Qt.AlignRight | Qt.AlignVCenter))
+
+
+if __name__ == "__main__":
+    unittest.main()
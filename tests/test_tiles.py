@@ -0,0 +1,92 @@
+"""Tile rectangles, margins and the merge plan of render/tiles.py (no Blender needed)."""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "render"))
+
+from tiles import tile_grid, tile_region, padded_region, region_pixels, tile_dir, merge_plan, merge_settings  # noqa: E402
+from output_profile import resolve_profile  # noqa: E402
+
+
+class TileRegionTest(unittest.TestCase):
+    def test_grid_must_divide(self):
+        self.assertEqual(tile_grid(6, 2), (2, 3))
+        with self.assertRaises(ValueError):
+            tile_grid(5, 2)
+        with self.assertRaises(ValueError):
+            tile_region(4, 4)
+
+    def test_tile_zero_is_the_top_strip(self):
+        # Blender's y axis points up
+        self.assertEqual(tile_region(0, 4), (0.0, 1.0, 0.75, 1.0))
+        self.assertEqual(tile_region(3, 4), (0.0, 1.0, 0.0, 0.25))
+        self.assertEqual(tile_region(1, 4, cols=2), (0.5, 1.0, 0.5, 1.0))
+
+    def test_pixel_regions_cover_the_frame_once(self):
+        for count, cols, width, height in [(4, 1, 1920, 1080), (6, 2, 1919, 1079), (3, 3, 100, 7), (5, 1, 64, 64)]:
+            covered = [[0] * width for _ in range(height)]
+            for index in range(count):
+                x0, x1, y0, y1 = region_pixels(tile_region(index, count, cols), width, height)
+                for y in range(y0, y1):
+                    for x in range(x0, x1):
+                        covered[y][x] += 1
+            self.assertTrue(all(c == 1 for row in covered for c in row), (count, cols, width, height))
+
+    def test_margin_grows_the_border_inside_the_frame(self):
+        region = tile_region(1, 4)
+        min_x, max_x, min_y, max_y = padded_region(region, 1920, 1080, 27)
+        self.assertEqual((min_x, max_x), (0.0, 1.0))
+        self.assertAlmostEqual(min_y, 0.5 - 27 / 1080)
+        self.assertAlmostEqual(max_y, 0.75 + 27 / 1080)
+        self.assertEqual(padded_region(tile_region(0, 4), 1920, 1080, 27)[3], 1.0)
+        self.assertEqual(padded_region(region, 1920, 1080, 0), region)
+
+    def test_margin_contains_the_region_pixels(self):
+        # Centre tile of a 3x3 grid: the margin applies on every side
+        region = tile_region(4, 9, cols=3)
+        inner = region_pixels(region, 1000, 600)
+        outer = region_pixels(padded_region(region, 1000, 600, 16), 1000, 600)
+        self.assertLessEqual(outer[0], inner[0] - 16)
+        self.assertGreaterEqual(outer[1], inner[1] + 16)
+        self.assertLessEqual(outer[2], inner[2] - 16)
+        self.assertGreaterEqual(outer[3], inner[3] + 16)
+
+
+class MergePlanTest(unittest.TestCase):
+    def test_ready_pending_and_already_merged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tiles, out = os.path.join(tmp, "tiles"), os.path.join(tmp, "out")
+            os.makedirs(out)
+            for index, frames in enumerate([(1, 2, 3), (1, 3)]):
+                os.makedirs(tile_dir(tiles, index))
+                for frame in frames:
+                    open(os.path.join(tile_dir(tiles, index), f"frame_{frame:04d}.exr"), "w").close()
+            open(os.path.join(out, "frame_0003.exr"), "w").close()
+
+            ready, pending = merge_plan(tiles, 2, out, 1, 4)
+            self.assertEqual([frame for frame, _, _ in ready], [1])
+            self.assertEqual(pending, [2, 4])
+            frame, paths, output = ready[0]
+            self.assertEqual([os.path.basename(os.path.dirname(p)) for p in paths], ["tile_0", "tile_1"])
+            self.assertEqual(output, os.path.join(out, "frame_0001.exr"))
+
+
+class MergeSettingsTest(unittest.TestCase):
+    def test_profile_decides_the_merged_format(self):
+        settings = merge_settings("OPEN_EXR", resolve_profile("exr-dwaa"))
+        self.assertEqual((settings["color_depth"], settings["exr_codec"]), ("16", "DWAA"))
+        settings = merge_settings("OPEN_EXR", resolve_profile("exr-zip", depth="32"))
+        self.assertEqual((settings["color_depth"], settings["exr_codec"]), ("32", "ZIP"))
+        self.assertEqual(merge_settings("PNG", resolve_profile("png"))["color_depth"], "8")
+
+    def test_scene_profile_keeps_the_tile_format_lossless(self):
+        self.assertEqual(merge_settings("OPEN_EXR", resolve_profile("scene")),
+                         {"file_format": "OPEN_EXR", "color_depth": "32", "exr_codec": "ZIP"})
+        self.assertEqual(merge_settings("PNG", resolve_profile()), {"file_format": "PNG"})
+        self.assertEqual(merge_settings("OPEN_EXR", resolve_profile(codec="dwaa"))["exr_codec"], "DWAA")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+"""RestBackend contra un servidor HTTP local que imita la API de Vast.ai."""
+import os
+import sys
+import json
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ui.mvc.models import vast_api  # noqa: E402
+from ui.mvc.models.vast_api import (RestBackend, CliBackend, CliFallback, VastApiError,  # noqa: E402
+                                    VastUnavailableError, rent_succeeded, save_api_key, with_cli_fallback)
+
+
+class StubVastHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+    # Cierra el socket tras responder sin avisar (conexión keep-alive caducada)
+    drop_after_response = False
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if type(self).drop_after_response:
+            self.close_connection = True
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def do_GET(self):
+        type(self).requests.append(("GET", self.path, None))
+        if self.path.startswith("/api/v0/bundles/"):
+            self.reply(200, {"offers": [{"id": 1, "gpu_name": "RTX 4090"}, {"id": 2, "gpu_name": "RTX 3090"}]})
+        elif self.path.startswith("/api/v0/instances/"):
+            # La API caída: la CLI tiene que tomar el relevo
+            self.reply(503, {"error": "service unavailable"})
+        elif self.path.startswith("/api/v0/users/current/"):
+            self.reply(401, {"error": "invalid api key"})
+        else:
+            self.reply(404, {"error": "not found"})
+
+    def do_PUT(self):
+        body = self.read_body()
+        type(self).requests.append(("PUT", self.path, body))
+        if self.path == "/api/v0/asks/500/":
+            self.reply(500, {"error": "internal"})
+        elif self.path == "/api/v0/asks/42/":
+            self.reply(200, {"success": True, "new_contract": 9001})
+        else:
+            self.reply(200, {"success": False, "error": "invalid_id"})
+
+    def do_DELETE(self):
+        type(self).requests.append(("DELETE", self.path, self.read_body()))
+        ok = self.path == "/api/v0/instances/9001/"
+        self.reply(200, {"success": ok, "msg": "" if ok else "no such instance"})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class CountingBackend(RestBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+
+    def new_connection(self):
+        self.connections += 1
+        return super().new_connection()
+
+
+class RestBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = type("Handler", (StubVastHandler,), {"requests": [], "drop_after_response": False})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.backend = CountingBackend("test-key", base_url=f"http://127.0.0.1:{self.server.server_port}/api/v0")
+
+    def tearDown(self):
+        self.backend.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_search_offers(self):
+        offers = self.backend.search_offers([("gpu_name", "=", "RTX 4090"), ("dph", "<", 2.5)])
+        self.assertEqual([o["id"] for o in offers], [1, 2])
+        method, path, _ = self.handler.requests[0]
+        self.assertEqual(method, "GET")
+        self.assertIn("dph_total", path)
+
+    def test_create_instance(self):
+        result = self.backend.create_instance(42, "img:v1", 20, "onstart.sh", "-e START_FRAME=1 -e END_FRAME=10")
+        self.assertTrue(rent_succeeded(result))
+        _, _, body = self.handler.requests[0]
+        self.assertEqual(body["env"], {"START_FRAME": "1", "END_FRAME": "10"})
+        self.assertEqual(body["onstart"], "onstart.sh")
+
+    def test_create_instance_failure_is_not_a_rental(self):
+        # "invalid_id" contiene "id": antes se contaba como alquilada
+        result = self.backend.create_instance(7, "img:v1", 20, "", "")
+        self.assertFalse(rent_succeeded(result))
+
+    def test_destroy_instance(self):
+        self.backend.destroy_instance(9001)
+        self.assertEqual(self.handler.requests[0][:2], ("DELETE", "/api/v0/instances/9001/"))
+        with self.assertRaises(VastApiError):
+            self.backend.destroy_instance(1)
+
+    def test_stale_keep_alive_connection_is_retried(self):
+        self.handler.drop_after_response = True
+        self.backend.search_offers([])
+        # La conexión del pool ya está cerrada por el servidor; la segunda llamada reintenta
+        offers = self.backend.search_offers([])
+        self.assertEqual(len(offers), 2)
+        self.assertEqual(len(self.handler.requests), 2)
+        self.assertEqual(self.backend.connections, 2)
+
+    def test_keep_alive_connection_is_reused(self):
+        self.backend.search_offers([])
+        self.backend.search_offers([])
+        self.assertEqual(self.backend.connections, 1)
+
+
+class StubCli(CliBackend):
+    """CLI instalada que responde sin lanzar procesos"""
+
+    def __init__(self):
+        self.calls = []
+
+    def is_available(self):
+        return True
+
+    def show_instances(self):
+        self.calls.append("show_instances")
+        return [{"id": 9001}]
+
+    def show_user(self):
+        self.calls.append("show_user")
+        return {"id": 7}
+
+    def create_instance(self, offer_id, image, disk, onstart, env_str):
+        self.calls.append("create_instance")
+        return "Started. {'success': True, 'new_contract': 9002}"
+
+
+class CliFallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), type("Handler", (StubVastHandler,), {"requests": []}))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.rest = RestBackend("test-key", base_url=f"http://127.0.0.1:{self.server.server_port}/api/v0",
+                                cli_fallback=True)
+        self.cli = StubCli()
+        self.logs = []
+        self.backend = CliFallback(self.rest, self.logs.append, cli=self.cli)
+
+    def tearDown(self):
+        self.rest.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_server_error_goes_to_cli(self):
+        self.assertEqual(self.backend.show_instances(), [{"id": 9001}])
+        self.assertEqual(self.cli.calls, ["show_instances"])
+        self.assertEqual(len(self.logs), 1)
+
+    def test_rejected_key_goes_to_cli(self):
+        self.assertEqual(self.backend.show_user(), {"id": 7})
+
+    def test_rent_is_not_repeated_after_a_server_error(self):
+        # El servidor pudo alquilarla antes de fallar: repetirla alquilaría dos
+        with self.assertRaises(VastUnavailableError):
+            self.backend.create_instance(500, "img:v1", 20, "", "")
+        self.assertEqual(self.cli.calls, [])
+
+    def test_rent_is_repeated_when_the_api_is_unreachable(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        rest = RestBackend("test-key", base_url=f"http://127.0.0.1:{port}/api/v0", cli_fallback=True)
+        backend = CliFallback(rest, self.logs.append, cli=self.cli)
+        self.assertTrue(rent_succeeded(backend.create_instance(42, "img:v1", 20, "", "")))
+        self.assertEqual(self.cli.calls, ["create_instance"])
+
+    def test_other_errors_are_not_retried(self):
+        with self.assertRaises(VastApiError):
+            self.backend.destroy_instance(1)
+        self.assertEqual(self.cli.calls, [])
+
+    def test_forced_rest_has_no_fallback(self):
+        rest = RestBackend("test-key")
+        self.assertIs(with_cli_fallback(rest), rest)
+        self.assertIsInstance(with_cli_fallback(self.rest), CliFallback)
+
+
+class RentSucceededTest(unittest.TestCase):
+    def test_cli_output(self):
+        self.assertTrue(rent_succeeded("Started. {'success': True, 'new_contract': 123}"))
+        self.assertTrue(rent_succeeded('Started. {"success": true, "new_contract": 123}'))
+        self.assertFalse(rent_succeeded("failed with error 500"))
+
+    def test_cli_failure_mentioning_id(self):
+        self.assertFalse(rent_succeeded("failed with error: {'success': False, 'error': 'invalid_id'}"))
+        self.assertFalse(rent_succeeded("invalid_id: offer no longer available"))
+        self.assertFalse(rent_succeeded("Started. {'success': True}"))
+
+
+class SaveApiKeyTest(unittest.TestCase):
+    def test_key_file_is_private(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "vastai", "vast_api_key")
+            os.makedirs(os.path.dirname(path))
+            with open(path, "w") as f:
+                f.write("old")
+            os.chmod(path, 0o644)
+            with mock.patch.object(vast_api, "API_KEY_PATHS", [path]):
+                save_api_key("new-key")
+            with open(path) as f:
+                self.assertEqual(f.read(), "new-key")
+            if os.name == "posix":
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+from PySide2.QtCore import QObject, Signal
+from ..models.vast_service import VastWorker
+
+# Pares de operaciones que no pueden ejecutarse a la vez (la relación es simétrica).
+# Todo lo demás corre en paralelo: una búsqueda no espera a un refresco de instancias.
+CONFLICTS = {
+    'rent': {'destroy', 'set_api_key'},
+    'destroy': {'rent', 'set_api_key'},
+    'set_api_key': {'search', 'rent', 'show_instances', 'destroy', 'ssh_url', 'check_connection'},
+}
+
+
+def modes_conflict(a, b):
+    return b in CONFLICTS.get(a, ()) or a in CONFLICTS.get(b, ())
+
+
+class Job:
+    def __init__(self, job_id, mode, key, worker):
+        self.job_id = job_id
+        self.mode = mode
+        self.key = key
+        self.worker = worker
+
+
+class JobScheduler(QObject):
+    """Cola de trabajos para VastWorker.
+
+    Cada trabajo recibe un ID. Si llega una petición con la misma clave que otra
+    en curso o en espera se reutiliza esa (no se lanzan dos refrescos a la vez).
+    Los trabajos que chocan según CONFLICTS esperan a que termine el otro.
+    """
+    job_started = Signal(int, str)   # job_id, mode
+    job_finished = Signal(int, str)  # job_id, mode
+
+    def __init__(self):
+        super().__init__()
+        self.next_id = 1
+        self.running = {}   # job_id -> Job
+        self.pending = []   # Jobs en orden de llegada
+
+    def submit(self, mode, setup=None, key=None, **kwargs):
+        """Encola una operación y devuelve su ID.
+
+        setup(worker) conecta las señales antes de arrancar; no se llama si la
+        petición se fusiona con un trabajo existente.
+        """
+        if key is not None:
+            existing = self.find(key)
+            if existing:
+                return existing.job_id
+
+        worker = VastWorker(mode=mode, **kwargs)
+        if setup:
+            setup(worker)
+        worker.finished.connect(self.on_worker_finished)
+
+        job = Job(self.next_id, mode, key, worker)
+        self.next_id += 1
+
+        if self.can_start(job, self.pending):
+            self.start(job)
+        else:
+            self.pending.append(job)
+        return job.job_id
+
+    def find(self, key):
+        for job in list(self.running.values()) + self.pending:
+            if job.key == key:
+                return job
+        return None
+
+    def can_start(self, job, queued_before):
+        # También se respeta el orden frente a trabajos en conflicto que ya esperaban
+        for other in list(self.running.values()) + list(queued_before):
+            if modes_conflict(job.mode, other.mode):
+                return False
+        return True
+
+    def start(self, job):
+        self.running[job.job_id] = job
+        job.worker.start()
+        self.job_started.emit(job.job_id, job.mode)
+
+    def on_worker_finished(self):
+        worker = self.sender()
+        for job_id, job in list(self.running.items()):
+            if job.worker is worker:
+                del self.running[job_id]
+                worker.deleteLater()
+                self.job_finished.emit(job_id, job.mode)
+                break
+        self.start_pending()
+
+    def start_pending(self):
+        waiting = []
+        for job in list(self.pending):
+            if self.can_start(job, waiting):
+                self.pending.remove(job)
+                self.start(job)
+            else:
+                waiting.append(job)
+
+    def is_running(self, mode):
+        return any(job.mode == mode for job in self.running.values())
+
+    def shutdown(self):
+        """Descarta lo pendiente y espera a los hilos en curso (al cerrar la ventana)"""
+        self.pending = []
+        for job in list(self.running.values()):
+            job.worker.quit()
+            job.worker.wait()
+        self.running = {}
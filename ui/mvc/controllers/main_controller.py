@@ -1,12 +1,65 @@
-from PySide2.QtCore import QObject
+from PySide2.QtCore import QObject, QTimer
 from ..views.main_window import VastGui
-from ..models.vast_service import VastWorker
+from .job_queue import JobScheduler
+from ..models.offer_cache import OfferCache, SearchParams
+from ..models.frame_distribution import plan_distribution, describe_plan, load_throughput_history
+from ..models.offer_ranking import OfferScores
+from ..models.telemetry import (TELEMETRY_POLL_MS, merge_telemetry, describe_summary,
+                                describe_preview, update_throughput_history, nodes_by_id)
+
+# Margen extra del vigilante de la GUI sobre el de la instancia: normalmente la
+# instancia ya se habrá destruido sola y la GUI solo actúa si eso falló
+AUTO_DESTROY_WATCHER_MARGIN = 60
+
+# Refresco automático de instancias: rápido mientras alguna arranca o se detiene,
+# lento cuando todas están corriendo y muy lento si no hay ninguna
+INSTANCES_POLL_FAST_MS = 10000
+INSTANCES_POLL_SLOW_MS = 60000
+INSTANCES_POLL_IDLE_MS = 300000
+TRANSITIONAL_STATES = {'loading', 'created', 'creating', 'scheduling', 'starting'}
+
+
+def instances_poll_interval(instances):
+    if not instances:
+        return INSTANCES_POLL_IDLE_MS
+    for instance in instances:
+        actual = instance.get('actual_status')
+        if not actual or actual in TRANSITIONAL_STATES:
+            return INSTANCES_POLL_FAST_MS
+        if actual == 'running' and instance.get('intended_status') == 'stopped':
+            return INSTANCES_POLL_FAST_MS
+    return INSTANCES_POLL_SLOW_MS
 
 class MainController(QObject):
     def __init__(self):
         super().__init__()
         self.view = VastGui()
-        self.worker = None
+        # Varias operaciones pueden ir en paralelo; el scheduler serializa solo las que chocan
+        self.jobs = JobScheduler()
+        self.jobs.job_finished.connect(self.on_job_finished)
+        self.loading_jobs = set()
+        # Última búsqueda indexada: los filtros más estrictos se resuelven sin llamar a la API
+        self.offer_cache = OfferCache()
+        # Búsquedas distintas corren en paralelo: solo se muestra la última pedida
+        self.latest_search = None
+
+        # Telemetría del render: se consulta el colector mientras el trabajo no termina
+        self.instances = []
+        self.telemetry = None
+        self.telemetry_failing = False
+        self.slow_nodes = set()
+        self.telemetry_finished = False
+        self.gate_announced = False
+        self.destroy_scheduled = set()
+        self.pending_auto_destroy = set()
+        self.telemetry_timer = QTimer(self)
+        self.telemetry_timer.setInterval(TELEMETRY_POLL_MS)
+        self.telemetry_timer.timeout.connect(self.poll_telemetry)
+
+        # Sondeo de instancias con intervalo adaptativo (se reprograma tras cada refresco)
+        self.instances_timer = QTimer(self)
+        self.instances_timer.setSingleShot(True)
+        self.instances_timer.timeout.connect(self.poll_instances)
 
         # Conectar señales de la vista
         self.view.search_requested.connect(self.handle_search)
@@ -17,47 +70,98 @@ class MainController(QObject):
         self.view.instances_requested.connect(self.handle_show_instances)
         self.view.destroy_requested.connect(self.handle_destroy_instance)
         self.view.ssh_requested.connect(self.handle_ssh_connect)
+        self.view.distribution_preview_requested.connect(self.handle_distribution_preview)
+        self.view.selection_proposal_requested.connect(self.handle_selection_proposal)
+        self.view.gate_decision_requested.connect(self.handle_gate_decision)
 
         # Verificar conexión al inicio
         self.check_connection()
 
     def show(self):
         self.view.show()
-        # Hook close event to stop worker
+        # Hook close event to stop workers
         self.view.closeEvent = self.on_close
 
     def on_close(self, event):
-        self.ensure_worker_stopped()
+        self.telemetry_timer.stop()
+        self.instances_timer.stop()
+        self.jobs.shutdown()
         event.accept()
 
-    def ensure_worker_stopped(self):
-        if self.worker and self.worker.isRunning():
-            self.worker.quit()
-            self.worker.wait()
-        self.worker = None
+    def track_loading(self, job_id):
+        # La barra de progreso sigue visible mientras quede algún trabajo que la pidió
+        self.loading_jobs.add(job_id)
+        self.view.set_loading(True)
+
+    def on_job_finished(self, job_id, mode):
+        if mode == 'show_instances':
+            # Cualquier refresco (manual o automático, con o sin error) reinicia la espera
+            self.instances_timer.start(instances_poll_interval(self.instances))
+        if job_id in self.loading_jobs:
+            self.loading_jobs.discard(job_id)
+            if not self.loading_jobs:
+                self.view.set_loading(False)
 
     def handle_search(self, gpu, price, disk, region, cuda):
-        self.ensure_worker_stopped()
-        self.view.set_loading(True)
-        self.view.table.setRowCount(0)
-        
-        self.worker = VastWorker(
-            mode='search', 
+        params = SearchParams(gpu, price, disk, region, cuda)
+        key = ('search', gpu, price, disk, region, cuda)
+        self.latest_search = key
+        self.offer_cache.ttl = self.view.get_cache_ttl()
+        cached = self.offer_cache.lookup(params)
+        if cached is not None:
+            self.view.append_log(f"[+] Filtrado local sobre la última búsqueda: {len(cached)} máquinas (sin consultar la API).")
+            self.show_offers(cached)
+            return
+
+        def on_data(data):
+            # Una búsqueda anterior más lenta no pisa la tabla ni la caché de la última
+            if key != self.latest_search:
+                return
+            # La tabla no se vacía: populate_table aplica solo las diferencias
+            self.show_offers(data)
+            self.offer_cache.store(params, data)
+
+        def setup(worker):
+            worker.data_ready.connect(on_data)
+            worker.log_message.connect(self.view.append_log)
+            worker.error_occurred.connect(lambda err: self.view.append_log(f"ERROR: {err}"))
+
+        job_id = self.jobs.submit(
+            'search',
+            setup=setup,
+            key=key,
             gpu_name=gpu, 
             max_price=price, 
             disk_space=disk,
             region=region,
             cuda_vers=cuda
         )
-        self.worker.data_ready.connect(self.view.populate_table)
-        self.worker.log_message.connect(self.view.append_log)
-        self.worker.error_occurred.connect(lambda err: self.view.append_log(f"ERROR: {err}"))
-        self.worker.finished.connect(lambda: self.view.set_loading(False))
-        self.worker.start()
+        self.track_loading(job_id)
+
+    def score_offers(self, offers):
+        return OfferScores(offers, self.view.get_job_frames(), load_throughput_history())
+
+    def show_offers(self, offers):
+        # Coste por frame y tiempo de fin para el rango de frames configurado
+        self.view.populate_table(self.score_offers(offers).annotate())
+
+    def handle_selection_proposal(self, deadline_hours, max_machines):
+        model = self.view.offers_model
+        offers = [model.record(key) for key in model.keys]
+        if not offers:
+            self.view.show_error("Primero busca ofertas.")
+            return
+        # Se recalcula por si cambió el rango de frames desde la búsqueda
+        scores = self.score_offers(offers)
+        self.view.populate_table(scores.annotate())
+        selection = scores.select(max_machines or None, deadline_hours * 3600 if deadline_hours else None)
+        self.view.append_log(f"[*] Propuesta para {scores.frames} frames: {selection.describe()}")
+        if selection.ids:
+            self.view.select_offers(selection.ids)
+        if not selection.feasible:
+            self.view.show_error(selection.describe())
 
     def handle_rent(self, machine_ids, image, disk, onstart, env_base):
-        self.ensure_worker_stopped()
-        self.view.set_loading(True)
         
         # Lógica de Render Distribuido
         # Parsear env_base para encontrar START_FRAME y END_FRAME si existen
@@ -79,78 +183,299 @@ class MainController(QObject):
         # Preparamos un diccionario de configs por máquina si hay más de una y hay rango
         instances_config = {}
         
-        if num_machines > 1 and start_match and end_match:
-            total_frames = end_frame - start_frame + 1
-            frames_per_machine = total_frames // num_machines
-            remainder = total_frames % num_machines
-            
-            current_start = start_frame
-            
-            for i, m_id in enumerate(machine_ids):
-                # Distribuir el resto entre las primeras máquinas
-                extra = 1 if i < remainder else 0
-                count = frames_per_machine + extra
-                
-                current_end = current_start + count - 1
-                
+        if 'TILE_SPLIT=1' in env_base and num_machines > 1:
+            # Reparto por regiones: todas renderizan el rango completo, cada una su franja
+            # (render/tiles.py); la región 0 une las franjas en frames completos
+            self.view.append_log(f"[*] Render por regiones: cada frame se divide en {num_machines} franjas, "
+                                 f"una por máquina. La máquina {machine_ids[0]} une el resultado.")
+            for index, m_id in enumerate(machine_ids):
+                instances_config[m_id] = f"{env_base} -e TILE_INDEX={index} -e TILE_COUNT={num_machines}"
+        elif 'COORDINATOR_URL=' in env_base:
+            # Reparto dinámico: todas reciben el rango completo y piden bloques al coordinador
+            self.view.append_log(f"[*] Distribución dinámica vía coordinador entre {num_machines} máquina(s).")
+            for m_id in machine_ids:
+                instances_config[m_id] = env_base
+        elif num_machines > 1 and start_match and end_match:
+            # Rangos proporcionales a la velocidad de cada máquina (dlperf, num_gpus, histórico)
+            plans = self.plan_frames(machine_ids, start_frame, end_frame)
+
+            for plan in plans:
+                m_id = plan.machine_id
+                if not plan.frames:
+                    # Hay más máquinas que frames: alquilarla solo costaría dinero
+                    self.view.append_log(f"[!] Máquina {m_id} sin frames asignados; no se alquila.")
+                    continue
+
                 # Reemplazar en el string de entorno
                 # Usamos regex para reemplazar los valores originales por los calculados
-                my_env = re.sub(r'START_FRAME=\d+', f'START_FRAME={current_start}', env_base)
-                my_env = re.sub(r'END_FRAME=\d+', f'END_FRAME={current_end}', my_env)
+                my_env = re.sub(r'START_FRAME=\d+', f'START_FRAME={plan.start}', env_base)
+                my_env = re.sub(r'END_FRAME=\d+', f'END_FRAME={plan.end}', my_env)
                 
                 instances_config[m_id] = my_env
-                
-                self.view.append_log(f"[*] Distribución: Máquina {m_id} -> Frames {current_start} a {current_end}")
-                
-                current_start = current_end + 1
+            
+            for line in describe_plan(plans):
+                self.view.append_log(f"[*] Distribución: {line}")
+
+            machine_ids = [m_id for m_id in machine_ids if m_id in instances_config]
         else:
             # Caso simple: misma config para todos
             for m_id in machine_ids:
                 instances_config[m_id] = env_base
 
-        self.worker = VastWorker(
-            mode='rent', 
+        if 'PREVIEW_GATE=1' in env_base and machine_ids:
+            # La previsualización cubre el trabajo entero aunque la máquina tenga solo un tramo
+            first = machine_ids[0]
+            instances_config[first] += f" -e PREVIEW=1 -e PREVIEW_START={start_frame} -e PREVIEW_END={end_frame}"
+            self.view.append_log(f"[*] La máquina {first} renderiza la previsualización; el resto espera "
+                                 f"a que la apruebes en la pestaña de instancias.")
+
+        def setup(worker):
+            worker.log_message.connect(self.view.append_log)
+            worker.error_occurred.connect(lambda err: self.view.append_log(f"ERROR ALQUILER: {err}"))
+            worker.finished_action.connect(self.on_rent_finished)
+
+        job_id = self.jobs.submit(
+            'rent', 
+            setup=setup,
+            # Pulsar dos veces sobre las mismas ofertas no alquila dos veces
+            key=('rent', tuple(sorted(machine_ids))),
             ids=machine_ids, 
             image=image, 
             disk=disk, 
             onstart=onstart,
-            instances_config=instances_config # Pasamos el dict de configs
+            instances_config=instances_config, # Pasamos el dict de configs
+            max_parallel=self.view.get_max_parallel()
         )
-        self.worker.log_message.connect(self.view.append_log)
-        self.worker.error_occurred.connect(lambda err: self.view.append_log(f"ERROR ALQUILER: {err}"))
-        self.worker.finished_action.connect(self.on_rent_finished)
-        self.worker.finished.connect(lambda: self.view.set_loading(False))
-        self.worker.start()
+        self.track_loading(job_id)
+
+    def plan_frames(self, machine_ids, start_frame, end_frame):
+        offers = {m_id: self.view.offers_model.record(m_id) for m_id in machine_ids}
+        return plan_distribution(start_frame, end_frame, machine_ids, offers, load_throughput_history())
+
+    def handle_distribution_preview(self, machine_ids, start_frame, end_frame):
+        # Dry-run: no alquila nada, solo muestra el reparto y el fin previsto por nodo
+        plans = self.plan_frames(machine_ids, start_frame, end_frame)
+        lines = describe_plan(plans)
+        for line in lines:
+            self.view.append_log(f"[*] Vista previa: {line}")
+        self.view.show_success("\n".join(lines))
 
     def on_rent_finished(self, status):
+        # Resultados parciales: llegan uno por oferta a medida que terminan
+        if status.startswith("RENTED:"):
+            self.view.append_log(f"[+] Oferta {status.split(':', 1)[1]} alquilada.")
+            return
+        if status.startswith("RENT_FAILED:"):
+            self.view.append_log(f"[-] Oferta {status.split(':', 1)[1]} no se pudo alquilar.")
+            return
+
         if status.startswith("SUCCESS"):
+            # Las ofertas alquiladas ya no están disponibles
+            self.offer_cache.invalidate()
             count = status.split(":")[1] if ":" in status else "1"
             self.view.show_success(f"{count} Máquina(s) desplegada(s) correctamente.\nRevisa la pestaña 'Instancias Creadas'.")
             # Auto refresh instances
             self.handle_show_instances()
+            self.start_telemetry()
+
+    def handle_show_instances(self, poll=False):
+        def setup(worker):
+            if not poll:
+                self.view.append_log("[*] Actualizando lista de instancias...")
+            worker.data_ready.connect(self.on_instances_ready)
+            worker.log_message.connect(self.view.append_log)
+            worker.error_occurred.connect(lambda err: self.view.append_log(f"ERROR: {err}"))
+
+        # Si ya hay un refresco en vuelo se reutiliza
+        self.jobs.submit('show_instances', setup=setup, key='show_instances', poll=poll)
+
+    def poll_instances(self):
+        if self.view.isMinimized():
+            # Nadie mira la tabla: se espera sin llamar a la API
+            self.instances_timer.start(INSTANCES_POLL_SLOW_MS)
+            return
+        self.handle_show_instances(poll=True)
+
+    def on_instances_ready(self, data):
+        # Solo se anotan los cambios de estado; la tabla aplica el diff por fila
+        previous = {str(i.get('id')): i.get('actual_status') for i in self.instances}
+        if previous:
+            for instance in data:
+                instance_id = str(instance.get('id'))
+                status = instance.get('actual_status')
+                if instance_id in previous and previous[instance_id] != status:
+                    self.view.append_log(f"[*] Instancia {instance_id}: {previous[instance_id]} -> {status}")
+        self.instances = data
+        self.view.populate_instances_table(merge_telemetry(data, self.telemetry))
+
+        if self.pending_auto_destroy:
+            # Las que ya se destruyeron solas no aparecen en la lista
+            alive = [node_id for node_id in self.pending_auto_destroy
+                     if node_id in {str(i.get('id')) for i in data}]
+            self.pending_auto_destroy = set()
+            if alive:
+                self.view.append_log(f"[*] Auto-destrucción desde la GUI: {', '.join(alive)}")
+                self.handle_destroy_instance(alive)
+
+    def start_telemetry(self):
+        source = self.view.get_telemetry_source()
+        if not source:
+            return
+        self.telemetry = None
+        self.telemetry_failing = False
+        self.telemetry_finished = False
+        self.gate_announced = False
+        self.view.set_gate_pending(False)
+        self.slow_nodes = set()
+        self.view.append_log(f"[*] Siguiendo el progreso de {source[1]} en {source[0]}")
+        self.telemetry_timer.start()
+        self.poll_telemetry()
+
+    def poll_telemetry(self):
+        source = self.view.get_telemetry_source()
+        if not source:
+            self.telemetry_timer.stop()
+            return
+
+        def setup(worker):
+            worker.data_ready.connect(lambda data: self.on_telemetry(data[0]))
+            worker.error_occurred.connect(self.on_telemetry_error)
+
+        url, job = source
+        self.jobs.submit('telemetry', setup=setup, key='telemetry', url=url, job=job)
+
+    def on_telemetry_error(self, err):
+        # Solo el primer fallo seguido: el colector puede tardar en estar accesible
+        if not self.telemetry_failing:
+            self.view.append_log(f"[-] {err}")
+        self.telemetry_failing = True
+
+    def on_telemetry(self, summary):
+        self.telemetry_failing = False
+        self.telemetry = summary
+        self.view.set_render_summary(describe_summary(summary))
+        self.view.populate_instances_table(merge_telemetry(self.instances, summary))
+
+        for node in summary.get('nodes', []):
+            if node.get('slow') and node.get('node') not in self.slow_nodes:
+                self.slow_nodes.add(node.get('node'))
+                self.view.append_log(f"[!] Nodo {node.get('node')} lento: {node.get('seconds_per_frame')} s/frame "
+                                     f"frente al resto. Considera destruirlo y repartir sus frames.")
+
+        self.watch_gate(summary.get('gate'))
+        self.watch_completed_nodes(summary)
+
+        if summary.get('finished') and not self.telemetry_finished:
+            self.telemetry_finished = True
+            self.view.append_log(f"[+] {describe_summary(summary)}")
+            # La velocidad medida mejora el próximo reparto por GPU
+            for gpu_name, spf in update_throughput_history(summary, self.instances).items():
+                self.view.append_log(f"[*] Histórico actualizado: {gpu_name} = {spf} s/frame por GPU")
+
+        # Se sigue consultando hasta que todos los nodos confirman la subida
+        if summary.get('complete'):
+            self.telemetry_timer.stop()
+
+    def watch_gate(self, gate):
+        # Se puede decidir aunque la previsualización no llegue (p. ej. si falló el nodo)
+        pending = bool(gate and gate.get('state') == 'held')
+        self.view.set_gate_pending(pending)
+        if pending and gate.get('preview') and not self.gate_announced:
+            self.gate_announced = True
+            self.view.append_log(f"[*] {describe_preview(gate)}. Decide con "
+                                 f"'Aprobar render' o 'Cancelar render'.")
+
+    def handle_gate_decision(self, go):
+        source = self.view.get_telemetry_source()
+        if not source:
+            self.view.show_error("No hay ningún render con coordinador en curso.")
+            return
+        self.view.set_gate_pending(False)
+
+        def setup(worker):
+            worker.finished_action.connect(lambda status: self.on_gate_decided(status, go))
+
+        url, job = source
+        self.jobs.submit('gate', setup=setup, key='gate', url=url, job=job, go=go)
+
+    def on_gate_decided(self, status, go):
+        if status.startswith("SUCCESS"):
+            if go:
+                self.view.append_log("[+] Previsualización aprobada: las máquinas empiezan el render completo.")
+            else:
+                self.view.append_log("[*] Render cancelado: las máquinas terminan sin renderizar.")
+        else:
+            # Se puede volver a intentar en el siguiente sondeo
+            self.gate_announced = False
+            self.view.append_log(f"[-] No se pudo enviar la decisión al coordinador: {status}")
+
+    def watch_completed_nodes(self, summary):
+        enabled, grace = self.view.get_render_auto_destroy()
+        if not enabled:
+            return
+        for node in summary.get('nodes', []):
+            node_id = str(node.get('node'))
+            if not node.get('complete') or node_id in self.destroy_scheduled:
+                continue
+            self.destroy_scheduled.add(node_id)
+            if not node.get('verified'):
+                self.view.append_log(f"[!] Nodo {node_id} terminó sin verificar la subida; no se destruye.")
+                continue
+            if node.get('keep_alive'):
+                self.view.append_log(f"[*] Nodo {node_id} marcado como keep-alive; no se destruye.")
+                continue
+            self.view.append_log(f"[*] Nodo {node_id} terminado y verificado; se destruirá en "
+                                 f"{grace + AUTO_DESTROY_WATCHER_MARGIN}s si sigue activo.")
+            QTimer.singleShot((grace + AUTO_DESTROY_WATCHER_MARGIN) * 1000,
+                              lambda node_id=node_id: self.destroy_completed_node(node_id))
+
+    def destroy_completed_node(self, node_id):
+        # La instancia mira el keep-alive tras el margen: se vuelve a leer su telemetría
+        source = self.view.get_telemetry_source()
+        if not source:
+            return
+
+        def on_data(summary):
+            self.on_telemetry(summary)
+            node = nodes_by_id(summary).get(node_id, {})
+            if node.get('keep_alive'):
+                self.view.append_log(f"[*] Nodo {node_id} marcado como keep-alive; no se destruye.")
+                return
+            # Se decide con la lista recién refrescada (ver on_instances_ready)
+            self.pending_auto_destroy.add(node_id)
+            self.handle_show_instances()
 
-    def handle_show_instances(self):
-        self.ensure_worker_stopped()
-        self.view.append_log("[*] Actualizando lista de instancias...")
-        self.worker = VastWorker(mode='show_instances')
-        self.worker.data_ready.connect(self.view.populate_instances_table)
-        self.worker.log_message.connect(self.view.append_log)
-        self.worker.error_occurred.connect(lambda err: self.view.append_log(f"ERROR: {err}"))
-        self.worker.start()
+        def setup(worker):
+            worker.data_ready.connect(lambda data: on_data(data[0]))
+            worker.error_occurred.connect(
+                lambda err: self.view.append_log(f"[-] Nodo {node_id} no destruido: sin telemetría ({err})"))
+
+        url, job = source
+        self.jobs.submit('telemetry', setup=setup, key=f'telemetry-{node_id}', url=url, job=job)
 
     def handle_destroy_instance(self, instance_ids):
         # instance_ids is now a list
-        self.ensure_worker_stopped()
         if isinstance(instance_ids, str):
             instance_ids = [instance_ids]
             
         count = len(instance_ids)
-        self.view.append_log(f"[*] Destruyendo {count} instancia(s)...")
-        
-        self.worker = VastWorker(mode='destroy', instance_ids=instance_ids)
-        self.worker.finished_action.connect(self.on_destroy_finished)
-        self.worker.log_message.connect(self.view.append_log)
-        self.worker.start()
+
+        def setup(worker):
+            self.view.append_log(f"[*] Destruyendo {count} instancia(s)...")
+            worker.finished_action.connect(self.on_destroy_finished)
+            worker.log_message.connect(self.view.append_log)
+            worker.error_occurred.connect(lambda err: self.view.append_log(f"ERROR: {err}"))
+
+        if self.jobs.is_running('rent'):
+            self.view.append_log("[*] Hay un alquiler en curso; la destrucción esperará a que termine.")
+
+        self.jobs.submit(
+            'destroy',
+            setup=setup,
+            key=('destroy', tuple(sorted(instance_ids))),
+            instance_ids=instance_ids,
+            max_parallel=self.view.get_max_parallel()
+        )
 
     def on_destroy_finished(self, result):
         if result.startswith("SUCCESS"):
@@ -162,14 +487,22 @@ class MainController(QObject):
 
     def handle_ssh_connect(self, instance_ids):
         # instance_ids is now a list
-        self.ensure_worker_stopped()
         if isinstance(instance_ids, str):
             instance_ids = [instance_ids]
 
-        self.view.append_log(f"[*] Obteniendo acceso SSH para {len(instance_ids)} instancia(s)...")
-        self.worker = VastWorker(mode='ssh_url', instance_ids=instance_ids)
-        self.worker.finished_action.connect(self.on_ssh_ready)
-        self.worker.start()
+        def setup(worker):
+            self.view.append_log(f"[*] Obteniendo acceso SSH para {len(instance_ids)} instancia(s)...")
+            worker.finished_action.connect(self.on_ssh_ready)
+            worker.log_message.connect(self.view.append_log)
+            worker.error_occurred.connect(lambda err: self.view.append_log(f"ERROR: {err}"))
+
+        self.jobs.submit(
+            'ssh_url',
+            setup=setup,
+            key=('ssh_url', tuple(sorted(instance_ids))),
+            instance_ids=instance_ids,
+            max_parallel=self.view.get_max_parallel()
+        )
 
     def on_ssh_ready(self, ssh_command):
         if ssh_command.startswith("ssh://"):
@@ -195,24 +528,28 @@ class MainController(QObject):
             self.view.append_log(f"[-] No se pudo obtener SSH: {ssh_command}")
 
     def check_connection(self):
-        self.ensure_worker_stopped()
-        self.worker = VastWorker(mode='check_connection')
-        self.worker.finished_action.connect(self.on_connection_checked)
-        self.worker.start()
+        def setup(worker):
+            worker.finished_action.connect(self.on_connection_checked)
+
+        self.jobs.submit('check_connection', setup=setup, key='check_connection')
 
     def on_connection_checked(self, result):
         if result.startswith("CONNECTED"):
             _, email, balance = result.split(":")
             self.view.update_status(True, email, float(balance))
+            # Primera carga de la pestaña de instancias; luego sigue el sondeo adaptativo
+            if not self.instances_timer.isActive():
+                self.handle_show_instances(poll=True)
         else:
             self.view.update_status(False)
 
     def handle_set_api_key(self, api_key):
-        self.ensure_worker_stopped()
         self.view.append_log("[*] Configurando API Key...")
-        self.worker = VastWorker(mode='set_api_key', api_key=api_key)
-        self.worker.finished_action.connect(self.on_api_key_set)
-        self.worker.start()
+
+        def setup(worker):
+            worker.finished_action.connect(self.on_api_key_set)
+
+        self.jobs.submit('set_api_key', setup=setup, api_key=api_key)
 
     def on_api_key_set(self, result):
         if result == "SUCCESS":
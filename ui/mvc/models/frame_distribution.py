@@ -0,0 +1,132 @@
+import os
+import json
+import heapq
+
+# Estimación base cuando no hay histórico: una GPU con DLPERF_REFERENCE de dlperf
+# tarda DEFAULT_SECONDS_PER_FRAME por frame. Solo afecta a los tiempos mostrados,
+# no al reparto (que depende de la velocidad relativa entre máquinas).
+DLPERF_REFERENCE = 100.0
+DEFAULT_SECONDS_PER_FRAME = 60.0
+
+# Histórico opcional: {"RTX 4090": segundos_por_frame_en_una_gpu, ...}
+THROUGHPUT_HISTORY_FILE = os.path.join(os.path.expanduser("~"), ".vast_render_throughput.json")
+
+
+def load_throughput_history(path=THROUGHPUT_HISTORY_FILE):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return {str(k): float(v) for k, v in data.items() if float(v) > 0}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+class NodePlan:
+    def __init__(self, machine_id, gpu_name, fps, estimated):
+        self.machine_id = machine_id
+        self.gpu_name = gpu_name
+        self.fps = fps              # frames por segundo previstos para la máquina entera
+        self.estimated = estimated  # True si la velocidad sale de dlperf y no del histórico
+        self.frames = 0
+        self.start = None
+        self.end = None
+
+    @property
+    def eta_seconds(self):
+        return self.frames / self.fps if self.fps > 0 else float('inf')
+
+
+def estimate_fps(offers, history, base_spf=DEFAULT_SECONDS_PER_FRAME):
+    """Frames/segundo por máquina a partir del histórico por GPU o, si falta, de dlperf.
+
+    dlperf en Vast.ai es el total de la máquina, así que se divide entre num_gpus
+    para obtener la velocidad por GPU y poder calibrarla contra el histórico.
+    """
+    def per_gpu_dlperf(offer):
+        return float(offer.get('dlperf') or 0) / max(1, int(offer.get('num_gpus') or 1))
+
+    # Calibración dlperf -> frames/s con las GPUs que sí tienen histórico
+    ratios = sorted(
+        (1.0 / history[o.get('gpu_name')]) / per_gpu_dlperf(o)
+        for o in offers if o.get('gpu_name') in history and per_gpu_dlperf(o) > 0
+    )
+    if ratios:
+        scale = ratios[len(ratios) // 2]
+    else:
+        scale = 1.0 / (base_spf * DLPERF_REFERENCE)
+
+    result = []
+    for offer in offers:
+        gpus = max(1, int(offer.get('num_gpus') or 1))
+        gpu_name = offer.get('gpu_name')
+        if gpu_name in history:
+            result.append((gpus / history[gpu_name], False))
+        else:
+            dlperf = per_gpu_dlperf(offer) or DLPERF_REFERENCE
+            result.append((gpus * dlperf * scale, True))
+    return result
+
+
+def plan_distribution(start_frame, end_frame, machine_ids, offers, history=None,
+                      base_spf=DEFAULT_SECONDS_PER_FRAME):
+    """Reparte [start_frame, end_frame] en rangos contiguos proporcionales a la velocidad.
+
+    offers es {machine_id: dict de la oferta}. Los frames se asignan de uno en uno a
+    la máquina que terminaría antes con uno más, lo que minimiza el tiempo total.
+    Devuelve una lista de NodePlan en el mismo orden que machine_ids.
+    """
+    history = history or {}
+    records = [offers.get(m_id) or {} for m_id in machine_ids]
+    plans = [NodePlan(m_id, rec.get('gpu_name', 'Unknown'), fps, estimated)
+             for m_id, rec, (fps, estimated) in zip(machine_ids, records, estimate_fps(records, history, base_spf))]
+
+    total = end_frame - start_frame + 1
+    if not plans or total <= 0:
+        return plans
+
+    # Todas las máquinas alquiladas reciben al menos un frame si alcanza
+    remaining = total
+    if total >= len(plans):
+        for plan in plans:
+            plan.frames = 1
+        remaining -= len(plans)
+
+    heap = [((plan.frames + 1) / plan.fps, i) for i, plan in enumerate(plans)]
+    heapq.heapify(heap)
+    for _ in range(remaining):
+        _, i = heapq.heappop(heap)
+        plans[i].frames += 1
+        heapq.heappush(heap, ((plans[i].frames + 1) / plans[i].fps, i))
+
+    current = start_frame
+    for plan in plans:
+        if plan.frames > 0:
+            plan.start = current
+            plan.end = current + plan.frames - 1
+            current = plan.end + 1
+    return plans
+
+
+def format_duration(seconds):
+    if seconds == float('inf'):
+        return "∞"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{secs:02d}s" if hours else f"{minutes}m{secs:02d}s"
+
+
+def describe_plan(plans):
+    """Líneas de texto para el log / la vista previa"""
+    lines = []
+    for plan in plans:
+        source = "dlperf" if plan.estimated else "histórico"
+        if plan.frames:
+            lines.append(f"Máquina {plan.machine_id} ({plan.gpu_name}): frames {plan.start}-{plan.end} "
+                         f"({plan.frames}) -> fin estimado {format_duration(plan.eta_seconds)} [{source}]")
+        else:
+            lines.append(f"Máquina {plan.machine_id} ({plan.gpu_name}): sin frames asignados")
+    if plans:
+        makespan = max(p.eta_seconds for p in plans if p.frames) if any(p.frames for p in plans) else 0
+        lines.append(f"Tiempo total estimado: {format_duration(makespan)}")
+    return lines
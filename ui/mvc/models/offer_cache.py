@@ -0,0 +1,117 @@
+import time
+import bisect
+import threading
+
+from .vast_api import SEARCH_RESULT_LIMIT
+
+# Segundos que una búsqueda sirve para responder filtros más estrictos sin volver a la API
+OFFER_CACHE_TTL = 120
+
+
+def offer_country(offer):
+    # geolocation viene como "Texas, US"; la query filtra por el código de país
+    geo = offer.get('geolocation') or ''
+    return geo.rsplit(',', 1)[-1].strip().upper()
+
+
+class SearchParams:
+    """Filtros de la pestaña de búsqueda, normalizados para poder compararlos"""
+
+    def __init__(self, gpu, max_price, disk, region, cuda):
+        self.gpu = gpu if gpu and gpu != "Cualquiera" else None
+        self.max_price = float(max_price)
+        self.disk = float(disk)
+        regions = [r.strip().upper() for r in (region or '').split(',') if r.strip()]
+        self.regions = frozenset(regions) if regions else None
+        try:
+            self.cuda = float(cuda) if cuda else None
+        except ValueError:
+            self.cuda = None
+
+    def covers(self, other):
+        """True si todo lo que pide `other` está dentro de lo que devolvió esta búsqueda"""
+        if other.max_price > self.max_price or other.disk < self.disk:
+            return False
+        if self.gpu is not None and other.gpu != self.gpu:
+            return False
+        if self.regions is not None and (other.regions is None or not other.regions <= self.regions):
+            return False
+        if self.cuda is not None and (other.cuda is None or other.cuda < self.cuda):
+            return False
+        return True
+
+
+class OfferIndex:
+    """Snapshot de ofertas con índices secundarios (GPU, región, CUDA y precio ordenado)"""
+
+    def __init__(self, offers, params):
+        self.offers = offers
+        self.params = params
+        self.created_at = time.monotonic()
+
+        self.by_gpu = {}
+        self.by_region = {}
+        for i, offer in enumerate(offers):
+            self.by_gpu.setdefault(offer.get('gpu_name'), []).append(i)
+            self.by_region.setdefault(offer_country(offer), []).append(i)
+
+        self.price_order = sorted(range(len(offers)), key=lambda i: offers[i].get('dph_total') or 0.0)
+        self.prices = [offers[i].get('dph_total') or 0.0 for i in self.price_order]
+        self.cuda_order = sorted(range(len(offers)), key=lambda i: offers[i].get('cuda_max_good') or 0.0)
+        self.cudas = [offers[i].get('cuda_max_good') or 0.0 for i in self.cuda_order]
+
+    def age(self):
+        return time.monotonic() - self.created_at
+
+    def query(self, params):
+        # Cada filtro indexado reduce el conjunto; se intersecta empezando por el más pequeño
+        candidate_sets = [self.price_order[:bisect.bisect_left(self.prices, params.max_price)]]
+        if params.gpu is not None:
+            candidate_sets.append(self.by_gpu.get(params.gpu, []))
+        if params.regions is not None:
+            candidate_sets.append([i for r in params.regions for i in self.by_region.get(r, [])])
+        if params.cuda is not None:
+            candidate_sets.append(self.cuda_order[bisect.bisect_left(self.cudas, params.cuda):])
+
+        candidate_sets.sort(key=len)
+        result = set(candidate_sets[0])
+        for other in candidate_sets[1:]:
+            if not result:
+                break
+            result.intersection_update(other)
+
+        # El disco no está indexado: se comprueba sobre lo que queda. Se conserva el orden de la API.
+        return [self.offers[i] for i in sorted(result)
+                if (self.offers[i].get('disk_space') or 0) > params.disk]
+
+
+class OfferCache:
+    """Guarda la última búsqueda y responde en memoria las que sean más estrictas"""
+
+    def __init__(self, ttl=OFFER_CACHE_TTL, limit=SEARCH_RESULT_LIMIT):
+        self.ttl = ttl
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def lookup(self, params):
+        """Ofertas filtradas localmente, o None si hay que consultar la API"""
+        with self.lock:
+            snapshot = self.snapshot
+        if snapshot is None or self.ttl <= 0 or snapshot.age() > self.ttl:
+            return None
+        if not snapshot.params.covers(params):
+            return None
+        # Una búsqueda que llegó al tope puede haber dejado fuera ofertas del filtro nuevo
+        if len(snapshot.offers) >= self.limit:
+            return None
+        return snapshot.query(params)
+
+    def store(self, params, offers):
+        index = OfferIndex(offers, params)
+        with self.lock:
+            self.snapshot = index
+
+    def invalidate(self):
+        with self.lock:
+            self.snapshot = None
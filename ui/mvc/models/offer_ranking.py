@@ -0,0 +1,141 @@
+import math
+from array import array
+from itertools import accumulate
+
+from .frame_distribution import estimate_fps, format_duration
+
+# Arranque de una instancia (descarga de la imagen, boot) antes de bajar la escena
+STARTUP_SECONDS = 180.0
+# Tamaños por defecto para estimar transferencias cuando el usuario no los indica
+DEFAULT_SCENE_GB = 2.0
+DEFAULT_FRAME_MB = 20.0
+# Tope de la propuesta cuando el plazo no se cumple y no se indicó un máximo de máquinas
+DEFAULT_MAX_MACHINES = 10
+
+
+def offer_reliability(offer):
+    """reliability2, o reliability si falta; 1.0 solo si no hay ninguno (0.0 es un valor válido)"""
+    for field in ('reliability2', 'reliability'):
+        if offer.get(field) is not None:
+            return float(offer[field])
+    return 1.0
+
+
+class OfferScores:
+    """Columnas calculadas para un lote de ofertas, en el mismo orden que `offers`.
+
+    Todo se guarda en arrays tipados y se calcula columna a columna: con miles de
+    ofertas la selección se reduce a una ordenación y una suma acumulada.
+    """
+
+    def __init__(self, offers, frames, history=None, scene_gb=DEFAULT_SCENE_GB,
+                 frame_mb=DEFAULT_FRAME_MB, startup=STARTUP_SECONDS):
+        self.offers = offers
+        self.frames = max(0, int(frames))
+        self.ids = [str(o.get('id')) for o in offers]
+
+        fps = array('d', (f for f, _ in estimate_fps(offers, history or {})))
+        dph = array('d', (float(o.get('dph_total') or 0) for o in offers))
+        down = array('d', (float(o.get('inet_down') or 0) for o in offers))
+        up = array('d', (float(o.get('inet_up') or 0) for o in offers))
+        reliability = array('d', (offer_reliability(o) for o in offers))
+
+        # Mbps -> segundos: escena al arrancar y cada frame subido (en paralelo al render)
+        self.startup = array('d', (startup + (scene_gb * 8000.0 / d if d > 0 else 0) for d in down))
+        upload_per_frame = array('d', (frame_mb * 8.0 / u if u > 0 else 0 for u in up))
+        # Frames/s efectivos: limita el más lento de render y subida; se descuenta la fiabilidad
+        self.fps = array('d', (
+            r / max(1.0 / f, t) if f > 0 else 0.0
+            for f, t, r in zip(fps, upload_per_frame, reliability)
+        ))
+        self.dph = dph
+        self.cost_per_frame = array('d', (
+            p / 3600.0 / f if f > 0 else math.inf for p, f in zip(dph, self.fps)
+        ))
+        # Una sola máquina haciendo todo el trabajo
+        self.finish_alone = array('d', (
+            s + self.frames / f if f > 0 else math.inf for s, f in zip(self.startup, self.fps)
+        ))
+
+    def annotate(self):
+        """Copia de las ofertas con los campos que muestra la tabla"""
+        return [dict(o, cost_per_frame=c, finish_seconds=t)
+                for o, c, t in zip(self.offers, self.cost_per_frame, self.finish_alone)]
+
+    def capacity(self, deadline):
+        """Frames que cada máquina alcanza a hacer antes del plazo (en segundos)"""
+        return array('d', (max(0.0, deadline - s) * f for s, f in zip(self.startup, self.fps)))
+
+    def finish_time(self, rows):
+        """Fin del trabajo repartiendo dinámicamente entre `rows` (cada una empieza al acabar su arranque)"""
+        pairs = sorted((self.startup[i], self.fps[i]) for i in rows if self.fps[i] > 0)
+        if not pairs or not self.frames:
+            return 0.0 if not self.frames else math.inf
+        # Se añaden máquinas por orden de arranque mientras empiecen antes del fin calculado
+        total_fps = weighted = 0.0
+        finish = math.inf
+        for start, fps in pairs:
+            if start >= finish:
+                break
+            total_fps += fps
+            weighted += fps * start
+            finish = (self.frames + weighted) / total_fps
+        return finish
+
+    def plan(self, rows):
+        finish = self.finish_time(rows)
+        # Con auto-destrucción cada máquina se factura hasta el final del trabajo
+        cost = sum(self.dph[i] for i in rows) * finish / 3600.0
+        return Selection([self.ids[i] for i in rows], finish, cost)
+
+    def select(self, max_machines=None, deadline=None):
+        """Conjunto barato de hasta max_machines ofertas que termine antes de deadline (segundos).
+
+        Heurística voraz: se toman ofertas por coste/frame creciente hasta cubrir
+        los frames dentro del plazo. Si con max_machines no alcanza, se prueban
+        las de mayor capacidad (como mucho DEFAULT_MAX_MACHINES si no hay máximo) y
+        la selección queda como no factible. Sin plazo, las max_machines (o 1) más
+        baratas por frame.
+        """
+        n = len(self.ids)
+        usable = [i for i in range(n) if self.fps[i] > 0]
+        by_cost = sorted(usable, key=self.cost_per_frame.__getitem__)
+        limit = max_machines or n
+
+        if deadline is None:
+            return self.plan(by_cost[:max_machines or 1])
+
+        capacity = self.capacity(deadline)
+        cumulative = list(accumulate(capacity[i] for i in by_cost))
+        needed = next((k + 1 for k, total in enumerate(cumulative) if total >= self.frames), None)
+        if needed is not None and needed <= limit:
+            selection = self.plan(by_cost[:needed])
+        else:
+            # Las más baratas no llegan: las de más capacidad antes del plazo, sin
+            # proponer alquilar todo el mercado cuando el usuario no puso un máximo
+            cap = max_machines or DEFAULT_MAX_MACHINES
+            by_capacity = sorted(usable, key=capacity.__getitem__, reverse=True)[:cap]
+            selection = self.plan(by_capacity)
+        selection.deadline = deadline
+        return selection
+
+
+class Selection:
+    def __init__(self, ids, finish_seconds, cost):
+        self.ids = ids
+        self.finish_seconds = finish_seconds
+        self.cost = cost
+        self.deadline = None
+
+    @property
+    def feasible(self):
+        return bool(self.ids) and (self.deadline is None or self.finish_seconds <= self.deadline)
+
+    def describe(self):
+        if not self.ids:
+            return "Ninguna oferta tiene rendimiento estimable."
+        text = (f"{len(self.ids)} máquina(s): fin estimado {format_duration(self.finish_seconds)}, "
+                f"coste estimado ${self.cost:.2f}")
+        if self.deadline is not None and not self.feasible:
+            text += f" (no llega al plazo de {format_duration(self.deadline)})"
+        return text
@@ -0,0 +1,192 @@
+from array import array
+from PySide2.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from .frame_distribution import format_duration
+
+# Rol con el valor nativo (float/int/str) que usa el proxy para ordenar
+SORT_ROLE = Qt.UserRole
+
+# Tipo de almacenamiento por columna: arrays tipados para números, listas para texto
+TYPECODES = {'int': 'q', 'float': 'd'}
+
+
+def to_number(value, kind):
+    try:
+        return int(value) if kind == 'int' else float(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class Column:
+    def __init__(self, header, field, kind='str', fmt=None, default=''):
+        self.header = header
+        self.field = field
+        self.kind = kind
+        self.fmt = fmt or str
+        self.default = default
+
+    def new_store(self):
+        if self.kind in TYPECODES:
+            return array(TYPECODES[self.kind])
+        return []
+
+    def extract(self, record):
+        value = record.get(self.field, self.default)
+        if self.kind in TYPECODES:
+            return to_number(value, self.kind)
+        return str(value) if value is not None else str(self.default)
+
+
+class RecordTableModel(QAbstractTableModel):
+    """Modelo columnar para listas de dicts de Vast.ai, con clave en 'id'.
+
+    Cada columna vive en su propio array (números) o lista (texto), sin un objeto
+    por celda. update() aplica solo las diferencias respecto a los datos actuales.
+    """
+    COLUMNS = []
+    KEY_FIELD = 'id'
+
+    def __init__(self):
+        super().__init__()
+        self.keys = []
+        self.row_of = {}
+        self.records = []
+        self.store = [col.new_store() for col in self.COLUMNS]
+
+    # --- API de Qt ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.COLUMNS):
+            return self.COLUMNS[section].header
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        col = self.COLUMNS[index.column()]
+        value = self.store[index.column()][index.row()]
+        if role == Qt.DisplayRole:
+            return col.fmt(value)
+        if role == SORT_ROLE:
+            return value
+        if role == Qt.TextAlignmentRole and col.kind in TYPECODES:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    # --- Datos ---
+    def record(self, key):
+        row = self.row_of.get(str(key))
+        return self.records[row] if row is not None else None
+
+    def key_at(self, row):
+        return self.keys[row]
+
+    def update(self, data):
+        wanted = {}
+        for record in data:
+            key = record.get(self.KEY_FIELD)
+            if key is not None:
+                wanted[str(key)] = record
+
+        # 1. Filas que ya no están (de abajo hacia arriba)
+        gone = sorted((self.row_of[key] for key in self.row_of if key not in wanted), reverse=True)
+        for row in gone:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.keys[row]
+            del self.records[row]
+            for store in self.store:
+                del store[row]
+            self.endRemoveRows()
+        if gone:
+            self.row_of = {key: row for row, key in enumerate(self.keys)}
+
+        # 2. Filas existentes: solo se notifica si cambió algún valor
+        new_keys = []
+        last_col = len(self.COLUMNS) - 1
+        for key, record in wanted.items():
+            row = self.row_of.get(key)
+            if row is None:
+                new_keys.append(key)
+                continue
+            self.records[row] = record
+            changed = False
+            for col, store in zip(self.COLUMNS, self.store):
+                value = col.extract(record)
+                if store[row] != value:
+                    store[row] = value
+                    changed = True
+            if changed:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_col))
+
+        # 3. Filas nuevas al final; el proxy las coloca según el orden activo
+        if new_keys:
+            first = len(self.keys)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_keys) - 1)
+            for key in new_keys:
+                record = wanted[key]
+                self.row_of[key] = len(self.keys)
+                self.keys.append(key)
+                self.records.append(record)
+                for col, store in zip(self.COLUMNS, self.store):
+                    store.append(col.extract(record))
+            self.endInsertRows()
+
+
+def format_price(value):
+    return f"{value:.3f}"
+
+
+def format_reliability(value):
+    return f"{value*100:.1f}%" if value else "N/A"
+
+
+def format_cost_per_frame(value):
+    return f"${value:.4f}" if value != float('inf') else "—"
+
+
+def format_eta(value):
+    # -1 = sin telemetría para esa instancia
+    return format_duration(value) if value >= 0 else "—"
+
+
+class OfferTableModel(RecordTableModel):
+    COLUMNS = [
+        Column("ID", 'id', 'int'),
+        Column("GPU", 'gpu_name', default='Unknown'),
+        Column("Cant.", 'num_gpus', 'int', default=1),
+        Column("Precio/Hr", 'dph_total', 'float', format_price, 0.0),
+        Column("DLPerf", 'dlperf', 'float', lambda v: f"{v:.1f}", 0),
+        Column("Fiabilidad", 'reliability2', 'float', format_reliability, 0),
+        # Campos calculados por offer_ranking para el trabajo configurado
+        Column("$/frame", 'cost_per_frame', 'float', format_cost_per_frame, float('inf')),
+        Column("Fin (sola)", 'finish_seconds', 'float', format_duration, float('inf')),
+    ]
+
+
+class InstanceTableModel(RecordTableModel):
+    COLUMNS = [
+        Column("ID", 'id', 'int'),
+        Column("Estado", 'actual_status', default='Unknown'),
+        Column("GPU", 'gpu_name', default='Unknown'),
+        Column("Precio/Hr", 'dph_total', 'float', format_price, 0.0),
+        Column("SSH Port", 'ssh_port', default='N/A'),
+        Column("Imagen", 'image_uuid', default='N/A'),
+        # Campos render_* añadidos desde la telemetría del colector
+        Column("Progreso", 'render_progress', default='—'),
+        Column("s/frame", 'render_spf', 'float', lambda v: f"{v:.1f}" if v else "—", 0.0),
+        Column("ETA", 'render_eta', 'float', format_eta, -1),
+        Column("Subida pend.", 'render_backlog', 'int', default=0),
+        Column("MB/frame", 'render_frame_mb', 'float', lambda v: f"{v:.1f}" if v else "—", 0.0),
+    ]
+
+
+def make_sort_proxy(model):
+    """Proxy que ordena por el valor nativo (SORT_ROLE) en vez del texto formateado"""
+    proxy = QSortFilterProxyModel()
+    proxy.setSourceModel(model)
+    proxy.setSortRole(SORT_ROLE)
+    return proxy
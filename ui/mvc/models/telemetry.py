@@ -0,0 +1,116 @@
+import os
+import json
+import urllib.request
+
+from .frame_distribution import THROUGHPUT_HISTORY_FILE, load_throughput_history, format_duration
+
+# Cada cuánto la GUI consulta el colector (frame_coordinator.py serve)
+TELEMETRY_POLL_MS = 15000
+REQUEST_TIMEOUT = 10
+# Peso de la medida nueva al actualizar el histórico de velocidad por GPU
+HISTORY_WEIGHT = 0.5
+
+
+def fetch_telemetry(url, job, token=None, timeout=REQUEST_TIMEOUT):
+    """Resumen del trabajo en el colector: nodos, frames restantes y ETA."""
+    request = urllib.request.Request(f"{url.rstrip('/')}/jobs/{job}/telemetry")
+    token = token or os.environ.get("COORDINATOR_TOKEN")
+    if token:
+        request.add_header("X-Coordinator-Token", token)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read() or b"{}")
+
+
+def post_gate_decision(url, job, go, note=None, token=None, timeout=REQUEST_TIMEOUT):
+    """Aprueba (go=True) o cancela el render retenido tras la previsualización."""
+    body = json.dumps({"go": bool(go), "note": note}).encode("utf-8")
+    request = urllib.request.Request(f"{url.rstrip('/')}/jobs/{job}/gate", data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+    token = token or os.environ.get("COORDINATOR_TOKEN")
+    if token:
+        request.add_header("X-Coordinator-Token", token)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read() or b"{}")
+
+
+def describe_preview(gate):
+    """Texto para el log cuando el primer nodo sube la previsualización (o falla)."""
+    preview = (gate or {}).get('preview')
+    if not preview:
+        return "Previsualización todavía sin renderizar"
+    if preview.get('failed'):
+        return f"La previsualización falló en el nodo {preview.get('node')}; revisa su log"
+    frames = preview.get('frames') or []
+    shown = ", ".join(str(f) for f in frames[:8]) + (" ..." if len(frames) > 8 else "")
+    return f"Previsualización lista ({len(frames)} frames: {shown}) en {preview.get('remote')}"
+
+
+def nodes_by_id(summary):
+    # Cada instancia informa con CONTAINER_ID, que coincide con el 'id' de Vast.ai
+    return {str(node.get('node')): node for node in (summary or {}).get('nodes', [])}
+
+
+def merge_telemetry(instances, summary):
+    """Copia de las instancias con los campos render_* que muestra la tabla."""
+    nodes = nodes_by_id(summary)
+    merged = []
+    for instance in instances:
+        row = dict(instance)
+        node = nodes.get(str(instance.get('id')))
+        if node:
+            done = node.get('frames_done', 0)
+            total = node.get('frames_total')
+            row['render_progress'] = f"{done}/{total}" if total else str(done)
+            if node.get('finished'):
+                row['render_progress'] += " ✔"
+            elif node.get('slow'):
+                row['render_progress'] += " ⚠"
+            row['render_spf'] = node.get('seconds_per_frame') or 0.0
+            eta = node.get('eta_seconds')
+            row['render_eta'] = eta if eta is not None else -1
+            row['render_backlog'] = node.get('upload_backlog', 0)
+            # Tamaño medio de salida: compara perfiles de OUTPUT_PROFILE
+            row['render_frame_mb'] = node.get('frame_mb') or 0.0
+        merged.append(row)
+    return merged
+
+
+def describe_summary(summary):
+    if not summary:
+        return ""
+    text = f"Render {summary.get('job')}: {summary.get('frames_done', 0)} frames hechos"
+    remaining = summary.get('frames_remaining')
+    if remaining:
+        text += f", {remaining} pendientes"
+    if summary.get('finished'):
+        return text + " · terminado"
+    eta = summary.get('eta_seconds')
+    return text + (f" · ETA {format_duration(eta)}" if eta is not None else " · ETA —")
+
+
+def update_throughput_history(summary, instances, path=THROUGHPUT_HISTORY_FILE):
+    """Guarda los segundos/frame por GPU medidos en el histórico que usa el reparto.
+
+    Se promedia con el valor anterior para que un nodo atípico no lo desplace de golpe.
+    """
+    records = {str(i.get('id')): i for i in instances}
+    history = load_throughput_history(path)
+    updated = {}
+    for node_id, node in nodes_by_id(summary).items():
+        instance = records.get(node_id)
+        spf = node.get('seconds_per_frame')
+        if not instance or not spf:
+            continue
+        gpus = node.get('gpus') or max(1, int(instance.get('num_gpus') or 1))
+        gpu_name = instance.get('gpu_name')
+        if not gpu_name:
+            continue
+        per_gpu = spf * gpus
+        if gpu_name in history:
+            per_gpu = HISTORY_WEIGHT * per_gpu + (1 - HISTORY_WEIGHT) * history[gpu_name]
+        history[gpu_name] = round(per_gpu, 2)
+        updated[gpu_name] = history[gpu_name]
+    if updated:
+        with open(path, 'w') as f:
+            json.dump(history, f, indent=2)
+    return updated
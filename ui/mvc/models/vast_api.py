@@ -0,0 +1,571 @@
+import os
+import abc
+import ast
+import json
+import time
+import shlex
+import queue
+import shutil
+import threading
+import subprocess
+import http.client
+import urllib.parse
+
+# Backends para hablar con Vast.ai: API REST en proceso (por defecto si hay API key)
+# o la CLI `vastai` como respaldo. Este módulo no depende de Qt.
+
+VAST_API_URL = os.environ.get("VAST_API_URL", "https://console.vast.ai/api/v0")
+VAST_CLI = "vastai"
+
+# Dónde guarda la CLI la API key (la ruta nueva primero, luego la antigua)
+API_KEY_PATHS = [
+    os.path.join(os.path.expanduser("~"), ".config", "vastai", "vast_api_key"),
+    os.path.join(os.path.expanduser("~"), ".vast_api_key"),
+]
+
+# Máximo de ofertas que se piden por búsqueda (igual en REST y CLI). Una respuesta
+# con exactamente este número puede estar truncada
+SEARCH_RESULT_LIMIT = 1000
+
+# Conexiones keep-alive que el pool mantiene abiertas entre llamadas
+MAX_IDLE_CONNECTIONS = 8
+REQUEST_TIMEOUT = 30
+
+# Cuánto se confía en el resultado de buscar la CLI (segundos). Un fallo se
+# recuerda menos tiempo para notar enseguida si el usuario la instala.
+CLI_PROBE_TTL = 3600
+CLI_PROBE_NEGATIVE_TTL = 30
+
+# Códigos de salida del shell cuando el ejecutable no existe (sh / cmd.exe)
+NOT_FOUND_EXIT_CODES = (127, 9009)
+
+# Traducción de operadores de la query textual de la CLI al JSON de la API
+QUERY_OPERATORS = {
+    '<': 'lt',
+    '<=': 'lte',
+    '>': 'gt',
+    '>=': 'gte',
+    '=': 'eq',
+    '!=': 'neq',
+    'in': 'in',
+}
+
+# Alias que la CLI resuelve por su cuenta y que la API no entiende
+FIELD_ALIASES = {
+    'cuda_vers': 'cuda_max_good',
+    'dph': 'dph_total',
+    'reliability': 'reliability2',
+    'dlperf_usd': 'dlperf_per_dphtotal',
+    'flops_usd': 'flops_per_dphtotal',
+}
+
+
+class VastApiError(Exception):
+    """Error devuelto por la API de Vast.ai o por la CLI"""
+
+
+class VastUnavailableError(VastApiError):
+    """La API no respondió (red, 5xx) o rechazó la key: la CLI puede intentarlo.
+
+    processed es False solo cuando el servidor seguro que no ejecutó la petición
+    (no hubo conexión o la rechazó por autenticación).
+    """
+
+    def __init__(self, message, processed=True):
+        super().__init__(message)
+        self.processed = processed
+
+
+def load_api_key():
+    key = os.environ.get("VAST_API_KEY")
+    if key:
+        return key.strip()
+    for path in API_KEY_PATHS:
+        try:
+            with open(path) as f:
+                key = f.read().strip()
+            if key:
+                return key
+        except OSError:
+            continue
+    return None
+
+
+def save_api_key(api_key):
+    """Guarda la key donde la leen la CLI y load_api_key, legible solo por el usuario"""
+    path = API_KEY_PATHS[0]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(api_key)
+    # O_CREAT no cambia los permisos de un fichero que ya existía
+    os.chmod(path, 0o600)
+
+
+def parse_response_dict(text):
+    """Primer dict de una respuesta: JSON de la API o el dict que imprime la CLI.
+
+    La CLI escribe texto alrededor ("Started. {'success': True, ...}") y a veces
+    el repr de Python en vez de JSON. Devuelve None si no hay un dict legible.
+    """
+    text = text or ""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        return None
+    chunk = text[start:end + 1]
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            data = parse(chunk)
+        except (ValueError, SyntaxError, TypeError):
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def rent_succeeded(result):
+    """¿La respuesta de crear instancia indica un alquiler hecho?
+
+    Vale lo mismo para REST y CLI: hace falta {"success": true, "new_contract": N}.
+    Un fallo puede traer "id" en el texto ({"success": false, "error": "invalid_id"}),
+    así que una salida que no se puede leer cuenta como fallo.
+    """
+    data = parse_response_dict(result)
+    return bool(data and data.get("success")) and data.get("new_contract") is not None
+
+
+def format_query(conditions):
+    """[(campo, op, valor), ...] -> "campo op valor ..." tal como la espera la CLI"""
+    parts = []
+    for field, op, value in conditions:
+        if op == 'in':
+            value = "[" + ",".join(str(v) for v in value) + "]"
+        elif isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, str):
+            value = value.replace(' ', '_')
+        parts.append(f"{field} {op} {value}")
+    return " ".join(parts)
+
+
+def build_query(conditions):
+    """[(campo, op, valor), ...] -> dict JSON para /bundles/"""
+    query = {
+        "verified": {"eq": True},
+        "external": {"eq": False},
+        "rentable": {"eq": True},
+        "rented": {"eq": False},
+    }
+    for field, op, value in conditions:
+        field = FIELD_ALIASES.get(field, field)
+        query.setdefault(field, {})[QUERY_OPERATORS[op]] = value
+    query["order"] = [["score", "desc"]]
+    query["type"] = "on-demand"
+    query["limit"] = SEARCH_RESULT_LIMIT
+    return query
+
+
+def parse_env(env_str):
+    """"-e VAR=VAL -e VAR2=VAL2 -p 80:80" -> dict como lo arma la CLI"""
+    env = {}
+    tokens = shlex.split(env_str or "")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in ('-e', '-p') and i + 1 < len(tokens):
+            value = tokens[i + 1]
+            if token == '-e' and '=' in value:
+                name, val = value.split('=', 1)
+                env[name] = val
+            else:
+                # Los puertos van como clave "-p 80:80" igual que en la CLI
+                env[f"{token} {value}"] = "1"
+            i += 2
+        else:
+            i += 1
+    return env
+
+
+class CliProbe:
+    """Caché de proceso de la CLI: ruta en el PATH y una sola prueba de `--version`.
+
+    El resultado vale durante el TTL; solo se invalida antes si una llamada falla
+    porque el ejecutable ya no se encuentra.
+    """
+
+    def __init__(self, ttl=CLI_PROBE_TTL, negative_ttl=CLI_PROBE_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.path = None
+        self.version = None
+        self.checked_at = None
+
+    def resolve(self):
+        """Devuelve la ruta de la CLI o None si no está disponible"""
+        with self.lock:
+            if self.checked_at is not None:
+                ttl = self.ttl if self.path else self.negative_ttl
+                if time.monotonic() - self.checked_at < ttl:
+                    return self.path
+
+            path = shutil.which(VAST_CLI)
+            version = None
+            if path:
+                try:
+                    version = subprocess.check_output(f'"{path}" --version', shell=True,
+                                                      stderr=subprocess.DEVNULL).decode('utf-8').strip()
+                except (subprocess.CalledProcessError, OSError):
+                    path = None
+
+            self.path = path
+            self.version = version
+            self.checked_at = time.monotonic()
+            return self.path
+
+    def invalidate(self):
+        with self.lock:
+            self.checked_at = None
+            self.path = None
+            self.version = None
+
+
+cli_probe = CliProbe()
+
+
+def is_not_found_error(error):
+    if isinstance(error, FileNotFoundError):
+        return True
+    if isinstance(error, subprocess.CalledProcessError):
+        return error.returncode in NOT_FOUND_EXIT_CODES
+    return "not found" in str(error).lower()
+
+
+class VastBackend(abc.ABC):
+    """Interfaz común. Todas las operaciones lanzan excepción si fallan.
+
+    La API key no pasa por el backend: se guarda con save_api_key.
+    """
+    name = "base"
+
+    @abc.abstractmethod
+    def is_available(self):
+        pass
+
+    @abc.abstractmethod
+    def search_offers(self, conditions):
+        pass
+
+    @abc.abstractmethod
+    def show_instances(self):
+        pass
+
+    @abc.abstractmethod
+    def create_instance(self, offer_id, image, disk, onstart, env_str):
+        pass
+
+    @abc.abstractmethod
+    def destroy_instance(self, instance_id):
+        pass
+
+    @abc.abstractmethod
+    def get_ssh_url(self, instance_id):
+        pass
+
+    @abc.abstractmethod
+    def show_user(self):
+        pass
+
+
+class CliBackend(VastBackend):
+    """Respaldo: lanza la CLI `vastai` por cada operación"""
+    name = "cli"
+
+    def command(self, args):
+        path = cli_probe.resolve()
+        if not path:
+            raise FileNotFoundError("Vast.ai CLI no encontrada")
+        return f'"{path}" {args}'
+
+    def run(self, args, quiet=False):
+        try:
+            # shell=True es necesario en Windows si vastai es un .bat/.cmd
+            if quiet:
+                subprocess.check_call(self.command(args), shell=True,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                return ""
+            return subprocess.check_output(self.command(args), shell=True).decode('utf-8')
+        except (subprocess.CalledProcessError, OSError) as e:
+            if is_not_found_error(e):
+                cli_probe.invalidate()
+            raise
+
+    def is_available(self):
+        return cli_probe.resolve() is not None
+
+    def search_offers(self, conditions):
+        return json.loads(self.run(f"search offers \"{format_query(conditions)}\" --limit {SEARCH_RESULT_LIMIT} --raw"))
+
+    def show_instances(self):
+        return json.loads(self.run("show instances --raw"))
+
+    def create_instance(self, offer_id, image, disk, onstart, env_str):
+        args = f"create instance {offer_id} --image {image} --disk {disk}"
+        if env_str:
+            args += f" --env \"{env_str}\""
+        if onstart:
+            args += f" --onstart \"{onstart}\""
+        return self.run(args)
+
+    def destroy_instance(self, instance_id):
+        self.run(f"destroy instance {instance_id}", quiet=True)
+
+    def get_ssh_url(self, instance_id):
+        return self.run(f"ssh-url {instance_id}").strip()
+
+    def show_user(self):
+        return json.loads(self.run("show user --raw"))
+
+
+class RestBackend(VastBackend):
+    """Cliente HTTP en proceso con un pool de conexiones keep-alive.
+
+    base_url permite apuntar a un servidor local de pruebas (http://127.0.0.1:PORT).
+    Es seguro usarlo desde varios hilos: cada petición toma su propia conexión del pool.
+    Con cli_fallback, with_cli_fallback repite por la CLI lo que la API no atiende.
+    """
+    name = "rest"
+
+    def __init__(self, api_key, base_url=None, max_idle=MAX_IDLE_CONNECTIONS, timeout=REQUEST_TIMEOUT,
+                 cli_fallback=False):
+        self.api_key = api_key
+        self.cli_fallback = cli_fallback
+        self.base_url = (base_url or VAST_API_URL).rstrip('/')
+        parsed = urllib.parse.urlparse(self.base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self.pool = queue.LifoQueue(maxsize=max_idle)
+        # GET condicional: url -> (ETag, respuesta) para reenviar If-None-Match
+        self.etags = {}
+
+    def new_connection(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self):
+        try:
+            return self.pool.get_nowait(), True
+        except queue.Empty:
+            return self.new_connection(), False
+
+    def release(self, conn):
+        try:
+            self.pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def request(self, method, path, params=None, body=None):
+        url = f"{self.base_path}{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Accept": "application/json",
+        }
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers["Content-Type"] = "application/json"
+        cached = self.etags.get(url) if method == "GET" else None
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        conn, reused = self.acquire()
+        try:
+            try:
+                response, raw = self.send(conn, method, url, payload, headers)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # El servidor cerró una conexión ociosa del pool: reintentar con una nueva
+                conn.close()
+                if not reused:
+                    raise
+                conn = self.new_connection()
+                response, raw = self.send(conn, method, url, payload, headers)
+        except VastApiError:
+            conn.close()
+            raise
+        except (OSError, http.client.HTTPException) as e:
+            # Enviada, pero sin respuesta: el servidor pudo ejecutarla
+            conn.close()
+            raise VastUnavailableError(f"Sin respuesta de {self.host} en {method} {path}: {e}") from e
+
+        if response.will_close:
+            conn.close()
+        else:
+            self.release(conn)
+
+        if response.status == 304 and cached:
+            # Sin cambios desde la última consulta: no se transfiere ni se parsea nada
+            return cached[1]
+        text = raw.decode('utf-8') if raw else ""
+        if response.status in (401, 403):
+            raise VastUnavailableError(f"HTTP {response.status} en {method} {path}: API key rechazada",
+                                       processed=False)
+        if response.status >= 500:
+            raise VastUnavailableError(f"HTTP {response.status} en {method} {path}: {text[:200]}")
+        if response.status >= 400:
+            raise VastApiError(f"HTTP {response.status} en {method} {path}: {text[:200]}")
+        data = json.loads(text) if text else {}
+        etag = response.getheader("ETag")
+        if method == "GET" and etag:
+            self.etags[url] = (etag, data)
+        return data
+
+    def send(self, conn, method, url, payload, headers):
+        if conn.sock is None:
+            # Sin conexión la petición seguro que no llegó al servidor
+            try:
+                conn.connect()
+            except OSError as e:
+                raise VastUnavailableError(f"No se pudo conectar con {self.host}: {e}", processed=False) from e
+        conn.request(method, url, body=payload, headers=headers)
+        response = conn.getresponse()
+        return response, response.read()
+
+    def is_available(self):
+        return bool(self.api_key)
+
+    def search_offers(self, conditions):
+        data = self.request("GET", "/bundles/", params={"q": json.dumps(build_query(conditions))})
+        return data.get("offers", [])
+
+    def show_instances(self):
+        data = self.request("GET", "/instances/", params={"owner": "me"})
+        return data.get("instances", [])
+
+    def create_instance(self, offer_id, image, disk, onstart, env_str):
+        body = {
+            "client_id": "me",
+            "image": image,
+            "disk": float(disk),
+            "env": parse_env(env_str),
+            "runtype": "ssh",
+        }
+        if onstart:
+            body["onstart"] = onstart
+        # Se devuelve como texto para que el log sea igual que con la CLI
+        return json.dumps(self.request("PUT", f"/asks/{offer_id}/", body=body))
+
+    def destroy_instance(self, instance_id):
+        data = self.request("DELETE", f"/instances/{instance_id}/", body={})
+        if not data.get("success", True):
+            raise VastApiError(data.get("msg", f"No se pudo destruir {instance_id}"))
+
+    def get_ssh_url(self, instance_id):
+        data = self.request("GET", f"/instances/{instance_id}/", params={"owner": "me"})
+        inst = data.get("instances", data)
+        ports = (inst.get("ports") or {}).get("22/tcp")
+        if ports and inst.get("public_ipaddr"):
+            host, port = inst["public_ipaddr"], ports[0].get("HostPort")
+        else:
+            host, port = inst.get("ssh_host"), inst.get("ssh_port")
+        if not host or not port:
+            raise VastApiError(f"La instancia {instance_id} todavía no expone SSH")
+        return f"ssh://root@{host}:{port}"
+
+    def show_user(self):
+        return self.request("GET", "/users/current/")
+
+
+class CliFallback(VastBackend):
+    """RestBackend compartido que repite por la CLI las llamadas que la API no atiende.
+
+    Se crea uno por trabajo (with_cli_fallback) para que el aviso llegue a su log;
+    el pool de conexiones sigue siendo el del backend compartido. Alquilar no se
+    repite si el servidor pudo haberlo hecho: se alquilaría dos veces.
+    """
+
+    def __init__(self, backend, log=None, cli=None):
+        self.backend = backend
+        self.cli = cli or CliBackend()
+        self.log = log or (lambda msg: None)
+        self.name = backend.name
+
+    def call(self, method, *args, replay=True):
+        try:
+            return getattr(self.backend, method)(*args)
+        except VastUnavailableError as e:
+            if (e.processed and not replay) or not self.cli.is_available():
+                raise
+            self.log(f"[!] API REST no disponible ({e}); se repite con la CLI")
+            return getattr(self.cli, method)(*args)
+
+    def is_available(self):
+        return self.backend.is_available() or self.cli.is_available()
+
+    def search_offers(self, conditions):
+        return self.call("search_offers", conditions)
+
+    def show_instances(self):
+        return self.call("show_instances")
+
+    def create_instance(self, offer_id, image, disk, onstart, env_str):
+        return self.call("create_instance", offer_id, image, disk, onstart, env_str, replay=False)
+
+    def destroy_instance(self, instance_id):
+        return self.call("destroy_instance", instance_id)
+
+    def get_ssh_url(self, instance_id):
+        return self.call("get_ssh_url", instance_id)
+
+    def show_user(self):
+        return self.call("show_user")
+
+
+def with_cli_fallback(backend, log=None):
+    """backend envuelto en CliFallback si admite respaldo (REST elegido en modo auto)"""
+    if getattr(backend, "cli_fallback", False):
+        return CliFallback(backend, log)
+    return backend
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Backend compartido por todo el proceso (así el pool de conexiones se reutiliza).
+
+    VAST_BACKEND=cli|rest fuerza uno; por defecto REST si hay API key (con la CLI
+    de respaldo, ver with_cli_fallback) y la CLI si no.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            mode = os.environ.get("VAST_BACKEND", "auto").lower()
+            api_key = load_api_key()
+            if mode == "rest" or (mode == "auto" and api_key):
+                _backend = RestBackend(api_key, cli_fallback=(mode == "auto"))
+            else:
+                _backend = CliBackend()
+        return _backend
+
+
+def reset_backend():
+    """Descarta el backend actual (p.ej. tras cambiar la API key)"""
+    global _backend
+    with _backend_lock:
+        if isinstance(_backend, RestBackend):
+            _backend.close()
+        _backend = None
@@ -1,7 +1,12 @@
-import subprocess
-import json
 import random
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PySide2.QtCore import QThread, Signal
+from .vast_api import get_backend, reset_backend, with_cli_fallback, save_api_key, format_query, rent_succeeded
+from .telemetry import fetch_telemetry, post_gate_decision
+
+# Máximo de comandos vastai simultáneos por operación en lote
+MAX_PARALLEL_REQUESTS = 8
 
 class VastWorker(QThread):
     """Hilo secundario para ejecutar comandos de vastai sin congelar la UI"""
@@ -12,10 +17,13 @@ class VastWorker(QThread):
 
     def __init__(self, mode, **kwargs):
         super().__init__()
-        self.mode = mode  # 'search', 'rent', 'check_connection', 'set_api_key', 'show_instances', 'destroy', 'ssh_url'
+        self.mode = mode  # 'search', 'rent', 'check_connection', 'set_api_key', 'show_instances', 'destroy', 'ssh_url', 'telemetry', 'gate'
         self.kwargs = kwargs
 
     def run(self):
+        # REST en proceso si hay API key; la CLI queda como respaldo (también si REST falla)
+        self.backend = with_cli_fallback(get_backend(), self.log_message.emit)
+
         if self.mode == 'search':
             self.search_offers()
         elif self.mode == 'rent':
@@ -30,6 +38,26 @@ class VastWorker(QThread):
             self.destroy_instance()
         elif self.mode == 'ssh_url':
             self.get_ssh_url()
+        elif self.mode == 'telemetry':
+            self.poll_telemetry()
+        elif self.mode == 'gate':
+            self.send_gate_decision()
+
+    def poll_telemetry(self):
+        # No usa Vast.ai: consulta el colector de progreso del render
+        try:
+            summary = fetch_telemetry(self.kwargs['url'], self.kwargs['job'])
+            self.data_ready.emit([summary])
+        except Exception as e:
+            self.error_occurred.emit(f"Telemetría no disponible: {e}")
+
+    def send_gate_decision(self):
+        # Tampoco usa Vast.ai: libera o cancela el trabajo retenido en el coordinador
+        try:
+            gate = post_gate_decision(self.kwargs['url'], self.kwargs['job'], self.kwargs['go'])
+            self.finished_action.emit(f"SUCCESS:{gate.get('state')}")
+        except Exception as e:
+            self.finished_action.emit(f"FAILED: {e}")
 
     def set_api_key(self):
         api_key = self.kwargs.get('api_key')
@@ -38,24 +66,18 @@ class VastWorker(QThread):
             return
 
         try:
-            # vastai set api-key <key>
-            cmd = f"vastai set api-key {api_key}"
-            # No usamos check_output porque no devuelve JSON, solo éxito/error
-            subprocess.check_call(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            # Se escribe directamente: sin CLI instalada es la única forma de activar REST
+            save_api_key(api_key)
+            # La próxima operación vuelve a elegir backend con la key nueva
+            reset_backend()
             self.finished_action.emit("SUCCESS")
-        except subprocess.CalledProcessError:
-            self.finished_action.emit("FAILED: Command execution failed")
         except Exception as e:
             self.finished_action.emit(f"FAILED: {str(e)}")
 
     def check_vast_installed(self):
-        """Verifica si vastai está en el PATH"""
-        try:
-            # shell=True es necesario en Windows si vastai es un .bat/.cmd
-            subprocess.check_call(["vastai", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, shell=True)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        """Verifica que el backend puede usarse (CLI en el PATH o API key cargada).
+        Con la CLI el resultado sale de la caché de proceso, no lanza un subproceso por llamada."""
+        return self.backend.is_available()
 
     def search_offers(self):
         gpu_name = self.kwargs.get('gpu_name', '')
@@ -64,28 +86,31 @@ class VastWorker(QThread):
         region = self.kwargs.get('region', '')
         cuda_vers = self.kwargs.get('cuda_vers', '')
 
-        # Construir query para vastai
-        query_parts = [
-            f"dph < {max_price}",
-            "verified=true",
-            f"disk_space > {disk_space}",
-            "reliability > 0.99",
-            "num_gpus >= 1"
+        # Construir query para vastai como (campo, operador, valor)
+        conditions = [
+            ("dph", "<", float(max_price)),
+            ("verified", "=", True),
+            ("disk_space", ">", float(disk_space)),
+            ("reliability", ">", 0.99),
+            ("num_gpus", ">=", 1)
         ]
 
         if gpu_name and gpu_name != "Cualquiera":
-            query_parts.append(f"gpu_name = {gpu_name.replace(' ', '_')}")
+            conditions.append(("gpu_name", "=", gpu_name))
 
         if region:
-            query_parts.append(f"geolocation in [{region}]")
+            conditions.append(("geolocation", "in", [r.strip() for r in region.split(",") if r.strip()]))
         
         if cuda_vers:
-            query_parts.append(f"cuda_vers >= {cuda_vers}")
+            try:
+                conditions.append(("cuda_vers", ">=", float(cuda_vers)))
+            except ValueError:
+                conditions.append(("cuda_vers", ">=", cuda_vers))
 
         # Hardcoded driver requirement from user request
-        query_parts.append("driver_version >= 560.00.00")
+        conditions.append(("driver_version", ">=", "560.00.00"))
 
-        query = " ".join(query_parts)
+        query = format_query(conditions)
 
         self.log_message.emit(f"[*] Buscando ofertas con query: {query}")
 
@@ -96,11 +121,8 @@ class VastWorker(QThread):
         
         # Ejecución Real
         try:
-            # shell=True para Windows
-            cmd = f"vastai search offers \"{query}\" --raw"
-            self.log_message.emit(f"[*] Ejecutando: {cmd}")
-            result = subprocess.check_output(cmd, shell=True).decode('utf-8')
-            data = json.loads(result)
+            self.log_message.emit(f"[*] Buscando vía {self.backend.name}...")
+            data = self.backend.search_offers(conditions)
             self.data_ready.emit(data)
             self.log_message.emit(f"[+] Búsqueda completada. {len(data)} máquinas encontradas.")
         except Exception as e:
@@ -122,53 +144,64 @@ class VastWorker(QThread):
             self.error_occurred.emit("Vast.ai CLI no encontrada")
             return
 
+        max_parallel = self.kwargs.get('max_parallel', MAX_PARALLEL_REQUESTS)
+        self.log_message.emit(f"[*] Alquilando {len(instance_ids)} máquina(s) en paralelo (máx. {max_parallel} simultáneas)...")
+
         success_count = 0
-        
-        for instance_id in instance_ids:
-            self.log_message.emit(f"[*] Intentando alquilar ID: {instance_id} con imagen: {image}...")
-            
-            # Obtener config específica para esta instancia
-            env_vars = instances_config.get(instance_id, "")
+        # Cada alquiler se resuelve en el pool y se informa en cuanto termina
+        for instance_id, ok, result in self.run_parallel(
+                lambda i: self.create_instance(i, image, disk, onstart, instances_config.get(i, "")),
+                instance_ids, max_parallel):
+            if ok:
+                self.log_message.emit(f"[+] Instancia {instance_id} creada. Respuesta: {result}")
+                self.finished_action.emit(f"RENTED:{instance_id}")
+                success_count += 1
+            else:
+                self.error_occurred.emit(f"Error al alquilar {instance_id}: {result}")
+                self.finished_action.emit(f"RENT_FAILED:{instance_id}")
 
-            try:
-                # Comando: vastai create instance <id> --image <image> --disk <disk> --onstart <cmd> --env <env>
-                cmd_str = f"vastai create instance {instance_id} --image {image} --disk {disk}"
-                
-                if env_vars:
-                    cmd_str += f" --env \"{env_vars}\""
-
-                if onstart:
-                    cmd_str += f" --onstart \"{onstart}\""
-
-                self.log_message.emit(f"[*] Ejecutando: {cmd_str}")
-                result = subprocess.check_output(cmd_str, shell=True).decode('utf-8')
-                
-                if "success" in result.lower() or "id" in result.lower():
-                    self.log_message.emit(f"[+] Instancia {instance_id} creada. Respuesta: {result}")
-                    success_count += 1
-                else:
-                    self.error_occurred.emit(f"Respuesta inesperada para {instance_id}: {result}")
-                    
-            except Exception as e:
-                self.error_occurred.emit(f"Error al alquilar {instance_id}: {str(e)}")
-        
         if success_count > 0:
             self.finished_action.emit(f"SUCCESS:{success_count}")
         else:
             self.finished_action.emit("FAILED")
 
+    def create_instance(self, instance_id, image, disk, onstart, env_vars):
+        """Alquila una oferta. Devuelve (ok, respuesta). Se ejecuta dentro del pool."""
+        self.log_message.emit(f"[*] Creando instancia {instance_id} con imagen {image} ({self.backend.name})...")
+        result = self.backend.create_instance(instance_id, image, disk, onstart, env_vars)
+
+        if rent_succeeded(result):
+            return True, result
+        return False, f"Respuesta inesperada: {result}"
+
+    def run_parallel(self, func, items, max_parallel=MAX_PARALLEL_REQUESTS):
+        """Ejecuta func(item) en un pool acotado y va devolviendo (item, ok, resultado)
+        a medida que cada llamada termina, no en el orden de entrada."""
+        if not items:
+            return
+        workers = max(1, min(int(max_parallel), len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(func, item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    ok, result = future.result()
+                except Exception as e:
+                    ok, result = False, str(e)
+                yield item, ok, result
+
     def show_instances(self):
         if not self.check_vast_installed():
             self.error_occurred.emit("Vast.ai CLI no encontrada")
             return
 
         try:
-            cmd = "vastai show instances --raw"
             # self.log_message.emit(f"[*] Obteniendo instancias...")
-            result = subprocess.check_output(cmd, shell=True).decode('utf-8')
-            data = json.loads(result)
+            data = self.backend.show_instances()
             self.data_ready.emit(data)
-            self.log_message.emit(f"[+] Lista de instancias actualizada. {len(data)} activas.")
+            # El refresco automático no llena el log; los cambios de estado los anota el controlador
+            if not self.kwargs.get('poll'):
+                self.log_message.emit(f"[+] Lista de instancias actualizada. {len(data)} activas.")
         except Exception as e:
             self.error_occurred.emit(f"Error obteniendo instancias: {str(e)}")
 
@@ -180,21 +213,40 @@ class VastWorker(QThread):
         if isinstance(instance_ids, str):
             instance_ids = [instance_ids]
 
-        success_count = 0
-        for instance_id in instance_ids:
-            try:
-                cmd = f"vastai destroy instance {instance_id}"
-                subprocess.check_call(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                self.log_message.emit(f"[+] Instancia {instance_id} destruida.")
-                success_count += 1
-            except Exception as e:
-                self.error_occurred.emit(f"Error destruyendo instancia {instance_id}: {str(e)}")
-        
+        if not self.check_vast_installed():
+            self.error_occurred.emit("Vast.ai CLI no encontrada")
+            self.finished_action.emit("FAILED")
+            return
+
+        max_parallel = self.kwargs.get('max_parallel', MAX_PARALLEL_REQUESTS)
+        total = len(instance_ids)
+        done = 0
+        failed = []
+        # Todas las destrucciones salen a la vez (acotadas por el pool) para cortar la facturación cuanto antes
+        for instance_id, ok, result in self.run_parallel(self.destroy_one, instance_ids, max_parallel):
+            done += 1
+            if ok:
+                self.log_message.emit(f"[+] Instancia {instance_id} destruida. ({done}/{total})")
+            else:
+                failed.append(instance_id)
+                self.error_occurred.emit(f"Error destruyendo instancia {instance_id}: {result}")
+                self.log_message.emit(f"[-] Instancia {instance_id} no destruida. ({done}/{total})")
+
+        success_count = total - len(failed)
+        summary = f"[*] Resumen destrucción: {success_count}/{total} correctas"
+        if failed:
+            summary += f", fallidas: {', '.join(str(i) for i in failed)}"
+        self.log_message.emit(summary)
+
         if success_count > 0:
             self.finished_action.emit(f"SUCCESS:{success_count}")
         else:
             self.finished_action.emit("FAILED")
 
+    def destroy_one(self, instance_id):
+        self.backend.destroy_instance(instance_id)
+        return True, None
+
     def get_ssh_url(self):
         instance_ids = self.kwargs.get('instance_ids')
         if not instance_ids:
@@ -203,27 +255,33 @@ class VastWorker(QThread):
         if isinstance(instance_ids, str):
             instance_ids = [instance_ids]
 
-        for instance_id in instance_ids:
-            try:
-                # vastai ssh-url <id>
-                cmd = f"vastai ssh-url {instance_id}"
-                url = subprocess.check_output(cmd, shell=True).decode('utf-8').strip()
-                
-                if url.startswith("ssh://"):
-                    import urllib.parse
-                    parsed = urllib.parse.urlparse(url)
-                    username = parsed.username
-                    hostname = parsed.hostname
-                    port = parsed.port
-                    
-                    ssh_cmd = f"ssh {username}@{hostname} -p {port}"
-                    # Emitimos uno por uno para que el controlador abra las ventanas
-                    self.finished_action.emit(f"SSH_CMD:{ssh_cmd}")
-                else:
-                    self.log_message.emit(f"[-] Invalid URL for {instance_id}: {url}")
-                    
-            except Exception as e:
-                self.error_occurred.emit(f"Error obteniendo SSH URL para {instance_id}: {str(e)}")
+        if not self.check_vast_installed():
+            self.error_occurred.emit("Vast.ai CLI no encontrada")
+            return
+
+        max_parallel = self.kwargs.get('max_parallel', MAX_PARALLEL_REQUESTS)
+        total = len(instance_ids)
+        done = 0
+        resolved = 0
+        for instance_id, ok, result in self.run_parallel(self.ssh_command_for, instance_ids, max_parallel):
+            done += 1
+            if ok:
+                resolved += 1
+                self.log_message.emit(f"[+] SSH de {instance_id} listo. ({done}/{total})")
+                # Emitimos uno por uno para que el controlador abra las ventanas
+                self.finished_action.emit(f"SSH_CMD:{result}")
+            else:
+                self.error_occurred.emit(f"Error obteniendo SSH URL para {instance_id}: {result}")
+
+        self.log_message.emit(f"[*] Resumen SSH: {resolved}/{total} instancias con acceso")
+
+    def ssh_command_for(self, instance_id):
+        url = self.backend.get_ssh_url(instance_id)
+        if not url.startswith("ssh://"):
+            return False, f"Invalid URL: {url}"
+
+        parsed = urllib.parse.urlparse(url)
+        return True, f"ssh {parsed.username}@{parsed.hostname} -p {parsed.port}"
 
     def check_connection_status(self):
         if not self.check_vast_installed():
@@ -231,10 +289,8 @@ class VastWorker(QThread):
             return
 
         try:
-            # vastai show user --raw devuelve JSON con info del usuario
-            cmd = "vastai show user --raw"
-            result = subprocess.check_output(cmd, shell=True).decode('utf-8')
-            data = json.loads(result)
+            # show user devuelve JSON con info del usuario
+            data = self.backend.show_user()
             
             # Si hay un email, asumimos éxito
             if "email" in data:
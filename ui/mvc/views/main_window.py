@@ -1,13 +1,15 @@
 from PySide2.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                                QHBoxLayout, QLabel, QLineEdit, QPushButton, 
-                               QTableWidget, QTableWidgetItem, QHeaderView, 
+                               QTableView, QHeaderView, 
                                QComboBox, QTextEdit, QGroupBox, QFormLayout,
                                QMessageBox, QProgressBar, QAbstractItemView,
-                               QInputDialog, QTabWidget, QMenu)
-from PySide2.QtCore import Signal, Qt
+                               QInputDialog, QTabWidget, QMenu, QCheckBox)
+from PySide2.QtCore import Signal, Qt, QItemSelectionModel
 from PySide2.QtGui import QIcon
 from datetime import datetime
 from .styles import DARK_STYLESHEET
+from ..models.table_models import OfferTableModel, InstanceTableModel, make_sort_proxy
+from ..models.vast_service import MAX_PARALLEL_REQUESTS
 
 class VastGui(QMainWindow):
     # Signals to Controller
@@ -19,6 +21,9 @@ class VastGui(QMainWindow):
     instances_requested = Signal()
     destroy_requested = Signal(list) # list of instance_ids
     ssh_requested = Signal(list) # list of instance_ids
+    distribution_preview_requested = Signal(list, int, int) # ids, start, end
+    selection_proposal_requested = Signal(float, int) # plazo en horas (0 = sin plazo), máquinas máx (0 = sin límite)
+    gate_decision_requested = Signal(bool) # True = aprobar la previsualización, False = cancelar el render
 
     def __init__(self):
         super().__init__()
@@ -27,6 +32,10 @@ class VastGui(QMainWindow):
         self.setStyleSheet(DARK_STYLESHEET)
         
         self.selected_machine_ids = []
+        # (url del colector, nombre del trabajo) del último alquiler con telemetría
+        self.render_job = None
+        # (activada, margen) de auto-destrucción con la que se alquiló ese render
+        self.render_auto_destroy = (False, 0)
         self.init_ui()
         self.append_log("Sistema iniciado. Listo para buscar máquinas.")
 
@@ -84,11 +93,15 @@ class VastGui(QMainWindow):
         self.cuda_input = QLineEdit("12.1")
         self.cuda_input.setPlaceholderText("Min CUDA Vers.")
 
+        self.cache_ttl_input = QLineEdit("120")
+        self.cache_ttl_input.setPlaceholderText("0 = consultar siempre")
+
         filter_layout.addRow("GPU Modelo:", self.gpu_combo)
         filter_layout.addRow("Precio Máx ($/hr):", self.price_input)
         filter_layout.addRow("Espacio Disco (GB):", self.disk_input)
         filter_layout.addRow("Región (Geo):", self.region_input)
         filter_layout.addRow("CUDA Versión:", self.cuda_input)
+        filter_layout.addRow("Caché ofertas (s):", self.cache_ttl_input)
 
         self.search_btn = QPushButton("Buscar Disponibles")
         self.search_btn.setIcon(QIcon.fromTheme("system-search"))
@@ -113,6 +126,26 @@ class VastGui(QMainWindow):
         self.rclone_conf = QLineEdit("TU_BASE64_ACA")
         self.rclone_conf.setEchoMode(QLineEdit.Password)
         self.rclone_conf.setPlaceholderText("RCLONE_CONF_B64")
+        self.coordinator_url = QLineEdit("")
+        self.coordinator_url.setPlaceholderText("http://host:8765 (vacío = rangos fijos)")
+        self.frame_chunk = QLineEdit("5")
+        self.telemetry_url = QLineEdit("")
+        self.telemetry_url.setPlaceholderText("vacío = URL del coordinador")
+        # Perfiles de render/output_profile.py ("scene" = lo que diga el .blend)
+        self.output_profile_combo = QComboBox()
+        self.output_profile_combo.addItems(["scene", "exr-dwaa", "exr-zip", "exr-zip-float",
+                                            "multilayer-dwaa", "multilayer-zip", "png"])
+        self.output_passes = QLineEdit("")
+        self.output_passes.setPlaceholderText("z,normal,denoising (vacío = los del .blend)")
+        self.tile_split_check = QCheckBox("Dividir cada frame en regiones (una por máquina)")
+        self.preview_check = QCheckBox("Previsualizar y aprobar antes del render completo")
+        self.preview_every = QLineEdit("10")
+        self.preview_every.setPlaceholderText("Un frame de cada N")
+        self.auto_destroy_check = QCheckBox("Destruir al terminar y verificar la subida")
+        self.auto_destroy_grace = QLineEdit("300")
+        self.auto_destroy_grace.setPlaceholderText("Segundos antes de destruir")
+        self.parallel_input = QLineEdit(str(MAX_PARALLEL_REQUESTS))
+        self.parallel_input.setPlaceholderText("Alquilar/destruir/SSH simultáneos")
 
         render_layout.addRow("Docker Image:", self.image_input)
         render_layout.addRow("On-Start Cmd:", self.onstart_input)
@@ -123,12 +156,27 @@ class VastGui(QMainWindow):
         render_layout.addRow("Start Frame:", self.start_frame)
         render_layout.addRow("End Frame:", self.end_frame)
         render_layout.addRow("Rclone B64:", self.rclone_conf)
+        render_layout.addRow("Formato salida:", self.output_profile_combo)
+        render_layout.addRow("Pases (multilayer):", self.output_passes)
+        render_layout.addRow("Coordinador URL:", self.coordinator_url)
+        render_layout.addRow("Frames por bloque:", self.frame_chunk)
+        render_layout.addRow("Telemetría URL:", self.telemetry_url)
+        render_layout.addRow("Regiones:", self.tile_split_check)
+        render_layout.addRow("Previsualización:", self.preview_check)
+        render_layout.addRow("Cada N frames:", self.preview_every)
+        render_layout.addRow("Auto-destruir:", self.auto_destroy_check)
+        render_layout.addRow("Margen (s):", self.auto_destroy_grace)
+        render_layout.addRow("Llamadas en paralelo:", self.parallel_input)
 
         self.rent_btn = QPushButton("ALQUILAR Y RENDERIZAR")
         self.rent_btn.setObjectName("rentButton")
         self.rent_btn.setEnabled(False)
         self.rent_btn.clicked.connect(self.on_rent_clicked)
 
+        self.preview_btn = QPushButton("Vista previa del reparto")
+        self.preview_btn.clicked.connect(self.on_preview_clicked)
+
+        render_layout.addRow(self.preview_btn)
         render_layout.addRow(self.rent_btn)
         render_group.setLayout(render_layout)
 
@@ -151,18 +199,30 @@ class VastGui(QMainWindow):
 
         self.result_label = QLabel("2. Selecciona una máquina de la lista:")
         self.result_label.setStyleSheet("font-weight: bold; font-size: 16px; margin-bottom: 10px;")
+
+        # Propuesta automática: las más baratas por frame que terminan antes del plazo
+        proposal_layout = QHBoxLayout()
+        self.deadline_input = QLineEdit("")
+        self.deadline_input.setPlaceholderText("Plazo (h), vacío = sin plazo")
+        self.max_machines_input = QLineEdit("")
+        self.max_machines_input.setPlaceholderText("Máquinas máx.")
+        self.propose_btn = QPushButton("Proponer selección")
+        self.propose_btn.clicked.connect(self.on_propose_clicked)
+        proposal_layout.addWidget(self.deadline_input)
+        proposal_layout.addWidget(self.max_machines_input)
+        proposal_layout.addWidget(self.propose_btn)
         
-        # Tabla
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["ID", "GPU", "Cant.", "Precio/Hr", "DLPerf", "Fiabilidad"])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        # Tabla (modelo columnar + proxy que ordena por valor numérico)
+        self.offers_model = OfferTableModel()
+        self.offers_proxy = make_sort_proxy(self.offers_model)
+        self.table = QTableView()
+        self.table.setModel(self.offers_proxy)
+        self.setup_table_view(self.table)
         self.table.setSortingEnabled(True)
-        self.table.itemSelectionChanged.connect(self.on_selection_changed)
+        self.table.selectionModel().selectionChanged.connect(self.on_selection_changed)
 
         right_layout.addWidget(self.result_label)
+        right_layout.addLayout(proposal_layout)
         right_layout.addWidget(self.table)
 
         # Barra de progreso (indeterminada)
@@ -184,34 +244,51 @@ class VastGui(QMainWindow):
         self.refresh_instances_btn.clicked.connect(lambda: self.instances_requested.emit())
         toolbar_layout.addWidget(self.refresh_instances_btn)
         toolbar_layout.addStretch()
+        # Progreso global del render según la telemetría de los nodos
+        self.render_summary_label = QLabel("")
+        self.render_summary_label.setStyleSheet("font-weight: bold;")
+        toolbar_layout.addWidget(self.render_summary_label)
+        # Go/no-go de la previsualización: se activan cuando el primer nodo la sube
+        self.gate_go_btn = QPushButton("Aprobar render")
+        self.gate_go_btn.clicked.connect(lambda: self.gate_decision_requested.emit(True))
+        self.gate_no_go_btn = QPushButton("Cancelar render")
+        self.gate_no_go_btn.clicked.connect(lambda: self.gate_decision_requested.emit(False))
+        for btn in (self.gate_go_btn, self.gate_no_go_btn):
+            btn.setEnabled(False)
+            toolbar_layout.addWidget(btn)
         layout.addLayout(toolbar_layout)
 
         # Tabla de Instancias
-        self.instances_table = QTableWidget()
-        self.instances_table.setColumnCount(7)
-        self.instances_table.setHorizontalHeaderLabels(["ID", "Estado", "GPU", "Precio/Hr", "SSH Port", "Imagen", "Acciones"])
-        self.instances_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.instances_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.instances_table.setSelectionMode(QAbstractItemView.ExtendedSelection) # Allow multi-select
+        self.instances_model = InstanceTableModel()
+        self.instances_proxy = make_sort_proxy(self.instances_model)
+        self.instances_table = QTableView()
+        self.instances_table.setModel(self.instances_proxy)
+        self.setup_table_view(self.instances_table)
         self.instances_table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.instances_table.customContextMenuRequested.connect(self.show_instance_context_menu)
         
         layout.addWidget(self.instances_table)
 
+    def setup_table_view(self, view):
+        view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Altura fija: la vista no mide filas y solo pinta las visibles
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        view.verticalHeader().hide()
+        view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+
+    def selected_ids(self, view, proxy, model):
+        ids = []
+        for index in view.selectionModel().selectedRows():
+            ids.append(model.key_at(proxy.mapToSource(index).row()))
+        return ids
+
     def show_instance_context_menu(self, pos):
-        # Get selected items
-        selected_rows = set()
-        for item in self.instances_table.selectedItems():
-            selected_rows.add(item.row())
+        instance_ids = self.selected_ids(self.instances_table, self.instances_proxy, self.instances_model)
         
-        if not selected_rows:
+        if not instance_ids:
             return
 
-        instance_ids = []
-        for row in selected_rows:
-            m_id = self.instances_table.item(row, 0).text()
-            instance_ids.append(m_id)
-        
         count = len(instance_ids)
         menu = QMenu(self)
         
@@ -240,22 +317,14 @@ class VastGui(QMainWindow):
         sb = self.log_console.verticalScrollBar()
         sb.setValue(sb.maximum())
 
-    def on_selection_changed(self):
-        selected_rows = set()
-        for item in self.table.selectedItems():
-            selected_rows.add(item.row())
-        
-        self.selected_machine_ids = []
-        if selected_rows:
-            for row in selected_rows:
-                m_id = self.table.item(row, 0).text()
-                self.selected_machine_ids.append(m_id)
-            
+    def on_selection_changed(self, *args):
+        self.selected_machine_ids = self.selected_ids(self.table, self.offers_proxy, self.offers_model)
+        if self.selected_machine_ids:
             count = len(self.selected_machine_ids)
             if count == 1:
-                row = list(selected_rows)[0]
-                gpu = self.table.item(row, 1).text()
-                price = self.table.item(row, 3).text()
+                offer = self.offers_model.record(self.selected_machine_ids[0])
+                gpu = offer.get('gpu_name', 'Unknown')
+                price = f"{offer.get('dph_total', 0.0):.3f}"
                 self.result_label.setText(f"Seleccionado: ID {self.selected_machine_ids[0]} ({gpu} a ${price}/hr)")
                 self.rent_btn.setText(f"ALQUILAR ID {self.selected_machine_ids[0]}")
             else:
@@ -279,6 +348,43 @@ class VastGui(QMainWindow):
         except ValueError:
             QMessageBox.warning(self, "Error", "El precio y el disco deben ser números válidos.")
 
+    def on_preview_clicked(self):
+        if not self.selected_machine_ids:
+            QMessageBox.warning(self, "Sin selección", "Selecciona una o más máquinas de la lista.")
+            return
+        try:
+            start = int(self.start_frame.text())
+            end = int(self.end_frame.text())
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Start/End Frame deben ser números enteros.")
+            return
+        self.distribution_preview_requested.emit(self.selected_machine_ids, start, end)
+
+    def on_propose_clicked(self):
+        try:
+            deadline = float(self.deadline_input.text()) if self.deadline_input.text() else 0.0
+            max_machines = int(self.max_machines_input.text()) if self.max_machines_input.text() else 0
+        except ValueError:
+            QMessageBox.warning(self, "Error", "El plazo y las máquinas máx. deben ser números.")
+            return
+        self.selection_proposal_requested.emit(deadline, max_machines)
+
+    def get_job_frames(self):
+        try:
+            return max(0, int(self.end_frame.text()) - int(self.start_frame.text()) + 1)
+        except ValueError:
+            return 0
+
+    def select_offers(self, ids):
+        selection = self.table.selectionModel()
+        selection.clearSelection()
+        for key in ids:
+            row = self.offers_model.row_of.get(str(key))
+            if row is None:
+                continue
+            index = self.offers_proxy.mapFromSource(self.offers_model.index(row, 0))
+            selection.select(index, QItemSelectionModel.Select | QItemSelectionModel.Rows)
+
     def on_rent_clicked(self):
         if not self.selected_machine_ids:
             return
@@ -288,6 +394,10 @@ class VastGui(QMainWindow):
             QMessageBox.warning(self, "Falta Imagen", "Debes especificar una imagen de Docker.")
             return
 
+        if self.preview_check.isChecked() and not (self.telemetry_url.text() or self.coordinator_url.text()):
+            QMessageBox.warning(self, "Previsualización", "La aprobación de la previsualización necesita un coordinador o una URL de telemetría.")
+            return
+
         count = len(self.selected_machine_ids)
         msg = f"¿Estás seguro de alquilar {count} máquina(s)?\nIDs: {', '.join(self.selected_machine_ids)}\nEsto comenzará a cobrar créditos de tu cuenta Vast.ai."
 
@@ -310,69 +420,108 @@ class VastGui(QMainWindow):
             if self.scene_file.text(): env_parts.append(f"-e SCENE_FILE={self.scene_file.text()}")
             if self.output_remote.text(): env_parts.append(f"-e OUTPUT_REMOTE={self.output_remote.text()}")
             
+            # Formato de salida sin tocar el .blend: menos bytes que subir por frame
+            profile = self.output_profile_combo.currentText()
+            if profile != "scene": env_parts.append(f"-e OUTPUT_PROFILE={profile}")
+            if self.output_passes.text(): env_parts.append(f"-e OUTPUT_PASSES={self.output_passes.text().replace(' ', '')}")
+
             # Start/End frame se manejarán en el controlador para dividir carga
             if self.start_frame.text(): env_parts.append(f"-e START_FRAME={self.start_frame.text()}")
             if self.end_frame.text(): env_parts.append(f"-e END_FRAME={self.end_frame.text()}")
+
+            # Con coordinador cada máquina pide bloques de frames en vez de recibir un rango fijo
+            job_name = f"render-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            if self.coordinator_url.text():
+                env_parts.append(f"-e COORDINATOR_URL={self.coordinator_url.text()}")
+                if self.frame_chunk.text(): env_parts.append(f"-e FRAME_CHUNK={self.frame_chunk.text()}")
+
+            # Frames muy pesados: cada máquina renderiza una franja y la primera las une
+            if self.tile_split_check.isChecked():
+                env_parts.append("-e TILE_SPLIT=1")
+
+            # Los nodos envían su progreso al colector (por defecto, el propio coordinador).
+            # La puerta de la previsualización vive ahí también: onstart.sh la consulta en TELEMETRY_URL
+            collector = self.telemetry_url.text() or self.coordinator_url.text()
+            if self.telemetry_url.text():
+                env_parts.append(f"-e TELEMETRY_URL={self.telemetry_url.text()}")
+            if collector:
+                env_parts.append(f"-e COORDINATOR_JOB={job_name}")
+                self.render_job = (collector, job_name)
+
+            # El primer nodo renderiza la previsualización; nadie empieza el render completo sin aprobarla
+            if self.preview_check.isChecked():
+                env_parts.append("-e PREVIEW_GATE=1")
+                env_parts.append(f"-e PREVIEW_EVERY={self.get_preview_every()}")
+
+            # La instancia se destruye sola (CONTAINER_API_KEY) tras verificar la subida
+            enabled, grace = self.get_auto_destroy()
+            self.render_auto_destroy = (enabled, grace)
+            if enabled:
+                env_parts.append("-e AUTO_DESTROY=1")
+                env_parts.append(f"-e AUTO_DESTROY_GRACE={grace}")
             
             env_str = " ".join(env_parts)
             
             self.rent_requested.emit(self.selected_machine_ids, image, disk, self.onstart_input.text(), env_str)
 
+    def get_auto_destroy(self):
+        try:
+            grace = max(0, int(self.auto_destroy_grace.text()))
+        except ValueError:
+            grace = 300
+        return self.auto_destroy_check.isChecked(), grace
+
+    def get_preview_every(self):
+        try:
+            return max(1, int(self.preview_every.text()))
+        except ValueError:
+            return 10
+
+    def set_gate_pending(self, pending):
+        self.gate_go_btn.setEnabled(pending)
+        self.gate_no_go_btn.setEnabled(pending)
+
+    def get_telemetry_source(self):
+        return self.render_job
+
+    def get_render_auto_destroy(self):
+        # Lo que recibieron las instancias, aunque luego se cambie la casilla
+        return self.render_auto_destroy
+
+    def set_render_summary(self, text):
+        self.render_summary_label.setText(text)
+
+    def get_cache_ttl(self):
+        try:
+            return max(0.0, float(self.cache_ttl_input.text()))
+        except ValueError:
+            return 0.0
+
+    def get_max_parallel(self):
+        try:
+            return max(1, int(self.parallel_input.text()))
+        except ValueError:
+            return MAX_PARALLEL_REQUESTS
+
     def set_loading(self, loading):
         if loading:
             self.search_btn.setEnabled(False)
             self.rent_btn.setEnabled(False)
             self.progress.setRange(0, 0)
             self.progress.show()
-            self.table.setSortingEnabled(False)
         else:
             self.search_btn.setEnabled(True)
             if self.selected_machine_ids:
                 self.rent_btn.setEnabled(True)
             self.progress.hide()
-            self.table.setSortingEnabled(True)
 
     def populate_table(self, data):
-        self.table.setSortingEnabled(False)
-        self.table.setRowCount(len(data))
-        for row_idx, machine in enumerate(data):
-            m_id = str(machine.get('id', 'N/A'))
-            m_gpu = str(machine.get('gpu_name', 'Unknown'))
-            m_count = str(machine.get('num_gpus', 1))
-            m_price = f"{machine.get('dph_total', 0.0):.3f}"
-            m_dlperf = str(machine.get('dlperf', 0))
-            rel = machine.get('reliability2', 0)
-            m_rel = f"{rel*100:.1f}%" if rel else "N/A"
-
-            self.table.setItem(row_idx, 0, SortableTableWidgetItem(m_id))
-            self.table.setItem(row_idx, 1, QTableWidgetItem(m_gpu))
-            self.table.setItem(row_idx, 2, SortableTableWidgetItem(m_count))
-            self.table.setItem(row_idx, 3, SortableTableWidgetItem(m_price))
-            self.table.setItem(row_idx, 4, SortableTableWidgetItem(m_dlperf))
-            self.table.setItem(row_idx, 5, SortableTableWidgetItem(m_rel))
-        self.table.setSortingEnabled(True)
+        # El modelo aplica solo las diferencias; selección y orden se conservan
+        self.offers_model.update(data)
 
     def populate_instances_table(self, data):
-        self.instances_table.setRowCount(len(data))
-        for row_idx, inst in enumerate(data):
-            # Data structure from vastai show instances --raw
-            m_id = str(inst.get('id', 'N/A'))
-            status = str(inst.get('actual_status', 'Unknown'))
-            gpu = str(inst.get('gpu_name', 'Unknown'))
-            price = f"{inst.get('dph_total', 0.0):.3f}"
-            ssh_port = str(inst.get('ssh_port', 'N/A'))
-            image = str(inst.get('image_uuid', 'N/A'))
-
-            self.instances_table.setItem(row_idx, 0, QTableWidgetItem(m_id))
-            self.instances_table.setItem(row_idx, 1, QTableWidgetItem(status))
-            self.instances_table.setItem(row_idx, 2, QTableWidgetItem(gpu))
-            self.instances_table.setItem(row_idx, 3, QTableWidgetItem(price))
-            self.instances_table.setItem(row_idx, 4, QTableWidgetItem(ssh_port))
-            self.instances_table.setItem(row_idx, 5, QTableWidgetItem(image))
-            
-            # Action button placeholder if needed, but we use context menu
-            # btn = QPushButton("SSH")
-            # self.instances_table.setCellWidget(row_idx, 6, btn)
+        # Data structure from vastai show instances --raw
+        self.instances_model.update(data)
 
     def show_success(self, message):
         QMessageBox.information(self, "Éxito", message)
@@ -392,12 +541,3 @@ class VastGui(QMainWindow):
         text, ok = QInputDialog.getText(self, "Configurar API Key", "Introduce tu Vast.ai API Key:")
         if ok and text:
             self.set_api_key_requested.emit(text.strip())
-
-class SortableTableWidgetItem(QTableWidgetItem):
-    def __lt__(self, other):
-        try:
-            t1 = self.text().replace('%', '').replace('$', '')
-            t2 = other.text().replace('%', '').replace('$', '')
-            return float(t1) < float(t2)
-        except ValueError:
-            return super().__lt__(other)
@@ -53,12 +53,12 @@ QPushButton#rentButton {
 QPushButton#rentButton:hover {
     background-color: #388E3C;
 }
-QTableWidget {
+QTableView {
     background-color: #252526;
     gridline-color: #3d3d3d;
     border: 1px solid #3d3d3d;
 }
-QTableWidget::item:selected {
+QTableView::item:selected {
     background-color: #0D47A1;
 }
 QHeaderView::section {